@@ -1,7 +1,18 @@
 #!/usr/bin/env python
+import argparse
+
 from src.client import Client
 
 
 if __name__ == '__main__':
-    client = Client(use_mgl=True)
-    client.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--connect', help='the `host:port` of a server started with `python -m src.network`')
+    args = parser.parse_args()
+
+    server_address = None
+    if args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        server_address = (host, int(port))
+
+    client = Client(use_mgl=True, server_address=server_address)
+    client.run()
@@ -0,0 +1,3 @@
+from .search import *
+from .evaluation import *
+from .analysis import *
@@ -0,0 +1,117 @@
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from ..game_state import GameInstance
+from ..game_state.serialize import serialize_game, deserialize_game
+from .search import SearchAI, apply_turn
+
+
+class _Settings:
+    TABLE_SIZE = 1 << 20
+
+    # the table each worker process attaches to when it starts
+    worker_table = None
+
+
+class SharedTable:
+    """
+    a fixed size table of scored positions in shared memory, which every worker
+    reads and writes without locks. an entry holds its key xor'd with its data, so
+    an entry torn by two workers writing at once fails the key check instead of
+    returning the wrong score
+    """
+    DTYPE = np.dtype([('check', '<u8'), ('data', '<u8')])
+
+    def __init__(self, name: str = None, size: int = _Settings.TABLE_SIZE):
+        self.owner = name is None
+        self.size = size
+        self.shared_memory = SharedMemory(name=name, create=self.owner, size=size * SharedTable.DTYPE.itemsize)
+        self.name = self.shared_memory.name
+        self.entries = np.ndarray(size, SharedTable.DTYPE, buffer=self.shared_memory.buf)
+        if self.owner:
+            self.entries[:] = 0
+
+    def probe(self, key: int, depth: int):
+        """
+        the score of the position with this key if it was searched at least this deep
+        """
+        index = key % self.size
+        check, data = int(self.entries['check'][index]), int(self.entries['data'][index])
+        if check ^ data != key or data & 0xFF < depth:
+            return None
+        return struct.unpack('<f', struct.pack('<I', data >> 32))[0]
+
+    def store(self, key: int, depth: int, value: float):
+        data = struct.unpack('<I', struct.pack('<f', value))[0] << 32 | min(depth, 0xFF)
+        index = key % self.size
+        self.entries['check'][index] = key ^ data
+        self.entries['data'][index] = data
+
+    def close(self):
+        del self.entries
+        self.shared_memory.close()
+        if self.owner:
+            self.shared_memory.unlink()
+
+
+def _init_worker(table_name: str, table_size: int):
+    _Settings.worker_table = SharedTable(table_name, table_size)
+
+
+def _score_turn(data: bytes, turn: tuple, depth: int, seed: int):
+    np.random.seed(seed)
+    game_instance = deserialize_game(data)
+    apply_turn(game_instance, turn)
+    game_instance.end_turn()
+
+    search = SearchAI(max_depth=depth)
+    search.shared_table = _Settings.worker_table
+    value = -search.score(game_instance, depth - 1, 1)
+    return float(value), search.nodes + 1
+
+
+def analyse(
+    game_instance: GameInstance,
+    depth: int,
+    max_workers: int = None,
+    table_size: int = _Settings.TABLE_SIZE,
+    seed: int = 0
+) -> dict:
+    """
+    this function will score every turn of the side to move by searching the game
+    tree to the given depth, one process per turn at a time. workers are sent the
+    serialized game rather than the game itself, and share a table of positions
+    that have already been scored. random effects are seeded per turn so that the
+    results can be reproduced
+    """
+    turns = SearchAI()._turns(game_instance, None)
+    data = serialize_game(game_instance)
+    table = SharedTable(size=table_size)
+
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(table.name, table_size)) as executor:
+            futures = [
+                executor.submit(_score_turn, data, turn, depth, seed + i)
+                for i, turn in enumerate(turns)
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        table.close()
+    seconds = time.perf_counter() - start
+
+    nodes = sum(turn_nodes for _, turn_nodes in results)
+    scored_turns = sorted(
+        [dict(turn=turn, value=value) for turn, (value, _) in zip(turns, results)],
+        key=lambda scored_turn: -scored_turn['value']
+    )
+    return dict(
+        turns=scored_turns,
+        nodes=nodes,
+        seconds=seconds,
+        nodes_per_second=nodes / seconds if seconds > 0 else float('inf')
+    )
@@ -0,0 +1,183 @@
+import numpy as np
+
+from ..game_state import GameInstance
+from ..game_state.board import _Settings as _BoardSettings
+from ..game_state.hand import _Settings as _HandSettings
+
+
+def _build_debuff_penalties(penalties: dict) -> np.ndarray:
+    return np.array([penalties.get(debuff, 0) for debuff in _BoardSettings.DEBUFF_KINDS], np.float32)
+
+
+class _Settings:
+    # material in pawns, indexed by piece code. the king is not counted as losing
+    # it ends the game
+    PIECE_VALUES = np.array([0, 0, 9, 3, 3, 5, 1], np.float32)
+
+    # bonuses in pawns for where each piece stands, from white's side of the board
+    # (white starts on the bottom two rows). black pieces read the table upside down
+    PIECE_SQUARE_TABLES = np.array([
+        [0] * 64,
+        [ # king
+            -30,-40,-40,-50,-50,-40,-40,-30,
+            -30,-40,-40,-50,-50,-40,-40,-30,
+            -30,-40,-40,-50,-50,-40,-40,-30,
+            -30,-40,-40,-50,-50,-40,-40,-30,
+            -20,-30,-30,-40,-40,-30,-30,-20,
+            -10,-20,-20,-20,-20,-20,-20,-10,
+             20, 20,  0,  0,  0,  0, 20, 20,
+             20, 30, 10,  0,  0, 10, 30, 20,
+        ],
+        [ # queen
+            -20,-10,-10, -5, -5,-10,-10,-20,
+            -10,  0,  0,  0,  0,  0,  0,-10,
+            -10,  0,  5,  5,  5,  5,  0,-10,
+             -5,  0,  5,  5,  5,  5,  0, -5,
+              0,  0,  5,  5,  5,  5,  0, -5,
+            -10,  5,  5,  5,  5,  5,  0,-10,
+            -10,  0,  5,  0,  0,  0,  0,-10,
+            -20,-10,-10, -5, -5,-10,-10,-20,
+        ],
+        [ # bishop
+            -20,-10,-10,-10,-10,-10,-10,-20,
+            -10,  0,  0,  0,  0,  0,  0,-10,
+            -10,  0,  5, 10, 10,  5,  0,-10,
+            -10,  5,  5, 10, 10,  5,  5,-10,
+            -10,  0, 10, 10, 10, 10,  0,-10,
+            -10, 10, 10, 10, 10, 10, 10,-10,
+            -10,  5,  0,  0,  0,  0,  5,-10,
+            -20,-10,-10,-10,-10,-10,-10,-20,
+        ],
+        [ # knight
+            -50,-40,-30,-30,-30,-30,-40,-50,
+            -40,-20,  0,  0,  0,  0,-20,-40,
+            -30,  0, 10, 15, 15, 10,  0,-30,
+            -30,  5, 15, 20, 20, 15,  5,-30,
+            -30,  0, 15, 20, 20, 15,  0,-30,
+            -30,  5, 10, 15, 15, 10,  5,-30,
+            -40,-20,  0,  5,  5,  0,-20,-40,
+            -50,-40,-30,-30,-30,-30,-40,-50,
+        ],
+        [ # rook
+              0,  0,  0,  0,  0,  0,  0,  0,
+              5, 10, 10, 10, 10, 10, 10,  5,
+             -5,  0,  0,  0,  0,  0,  0, -5,
+             -5,  0,  0,  0,  0,  0,  0, -5,
+             -5,  0,  0,  0,  0,  0,  0, -5,
+             -5,  0,  0,  0,  0,  0,  0, -5,
+             -5,  0,  0,  0,  0,  0,  0, -5,
+              0,  0,  0,  5,  5,  0,  0,  0,
+        ],
+        [ # pawn
+              0,  0,  0,  0,  0,  0,  0,  0,
+             50, 50, 50, 50, 50, 50, 50, 50,
+             10, 10, 20, 30, 30, 20, 10, 10,
+              5,  5, 10, 25, 25, 10,  5,  5,
+              0,  0,  0, 20, 20,  0,  0,  0,
+              5, -5,-10,  0,  0,-10, -5,  5,
+              5, 10, 10,-20,-20, 10, 10,  5,
+              0,  0,  0,  0,  0,  0,  0,  0,
+        ],
+    ], np.float32) / 100
+    TILE_INDICES = np.arange(64)
+    MIRRORED_TILE_INDICES = np.arange(64) ^ 56
+
+    # the share of a piece's value lost (or gained, when negative) to each kind of
+    # debuff on its tile
+    DEBUFF_PENALTIES = _build_debuff_penalties(dict(
+        death=1.0,
+        dangerous1=0.5,
+        dangerous2=0.5,
+        control=0.5,
+        stationary=0.2,
+        shrink=0.1,
+        enlarge=-0.1,
+        shield=-0.05,
+    ))
+    DEBUFF_SHIFTS = np.arange(len(_BoardSettings.DEBUFF_KINDS), dtype=np.uint16)
+
+    CARD_IDS = list(_HandSettings.CARD_DATA.index)
+    CARD_INDICES = {card_id: i for i, card_id in enumerate(CARD_IDS)}
+    # filled in from the card data in play, see `card_values`
+    CARD_VALUES = None
+    CARD_VALUES_DATA = None
+
+
+def card_values() -> np.ndarray:
+    """
+    a card in hand is worth a quarter of a pawn at the most common rarity, and
+    more the rarer it is to draw. the values are rebuilt whenever the card data is
+    replaced with `_HandSettings.set_card_data`
+    """
+    card_data = _HandSettings.CARD_DATA
+    if _Settings.CARD_VALUES_DATA is not card_data:
+        _Settings.CARD_VALUES = (0.25 * card_data['rarity'].max() / card_data['rarity']).to_numpy(np.float32)
+        _Settings.CARD_VALUES_DATA = card_data
+    return _Settings.CARD_VALUES
+
+
+def encode_hand(cards: list) -> np.ndarray:
+    """
+    the number of each card in a hand, in the order of `card_data.csv`
+    """
+    counts = np.zeros(len(_Settings.CARD_IDS), np.int16)
+    for card_id in cards:
+        counts[_Settings.CARD_INDICES[card_id]] += 1
+    return counts
+
+
+def encode_games(game_instances: list[GameInstance]):
+    """
+    this function will stack games into the arrays `evaluate_batch` takes
+    """
+    boards = np.array([game_instance.board_manager.board_state for game_instance in game_instances], np.int8)
+    debuffs = np.array([game_instance.board_manager.board_debuffs.kinds for game_instance in game_instances], np.uint16)
+    hands = np.array([
+        [encode_hand(game_instance.hand_manager.hands[side].cards) for side in [1, -1]]
+        for game_instance in game_instances
+    ], np.int16).reshape(len(game_instances), 2, len(_Settings.CARD_IDS))
+    sides = np.array([game_instance.board_manager.side_to_move for game_instance in game_instances], np.int8)
+    return boards, debuffs, hands, sides
+
+
+def evaluate_batch(
+    boards: np.ndarray,
+    debuffs: np.ndarray = None,
+    hands: np.ndarray = None,
+    sides: np.ndarray = None
+) -> np.ndarray:
+    """
+    this function will score N positions at once, in pawns. boards are (N, 64)
+    piece codes, debuffs are (N, 64) debuff kind bitmasks as in `BoardDebuffs.kinds`
+    and hands are (N, 2, number of cards) card counts for white then black, see
+    `encode_hand`. scores are from white's point of view, or from the side to
+    move's when sides are given
+    """
+    boards = np.asarray(boards)
+    pieces = np.abs(boards)
+    tile_indices = np.where(boards > 0, _Settings.TILE_INDICES, _Settings.MIRRORED_TILE_INDICES)
+    values = _Settings.PIECE_VALUES[pieces] + _Settings.PIECE_SQUARE_TABLES[pieces, tile_indices]
+
+    if debuffs is not None:
+        debuff_bits = (np.asarray(debuffs)[..., None] >> _Settings.DEBUFF_SHIFTS) & 1
+        penalties = debuff_bits @ _Settings.DEBUFF_PENALTIES
+        values = values - _Settings.PIECE_VALUES[pieces] * penalties
+
+    scores = np.sum(values * np.sign(boards), axis=-1)
+
+    if hands is not None:
+        hands = np.asarray(hands, np.float32)
+        scores = scores + (hands[:, 0] - hands[:, 1]) @ card_values()
+
+    if sides is not None:
+        scores = scores * np.asarray(sides)
+    return scores
+
+
+def evaluate_games(game_instances: list[GameInstance]) -> np.ndarray:
+    """
+    the scores of the games from each side to move's point of view
+    """
+    if not game_instances:
+        return np.zeros(0, np.float32)
+    return evaluate_batch(*encode_games(game_instances))
@@ -0,0 +1,300 @@
+import time
+
+import numpy as np
+
+from ..game_state import GameInstance
+from ..game_state.board import _Settings as _BoardSettings
+from ..game_state.bitboard import _Settings as _BitboardSettings, indices_from_mask
+from ..game_state.hand import _Settings as _HandSettings
+from ..game_state.zobrist import hand_key
+from .evaluation import evaluate_games, _Settings as _EvaluationSettings
+
+
+class _Settings:
+    PIECE_VALUES = _EvaluationSettings.PIECE_VALUES
+
+    # scores at or past this are won or lost games, shifted by the number of turns
+    # it takes so that faster wins are preferred
+    WIN_SCORE = 1000
+
+    # who a spell is worth casting on, by the kind of debuff it leaves. spells that
+    # are missing have no effect on the board
+    CAST_TARGETS = {
+        'death': 'opponent',
+        'displace': 'opponent',
+        'shrink': 'opponent',
+        'stationary': 'opponent',
+        'control': 'opponent',
+        'dangerous1': 'opponent',
+        'dangerous2': 'opponent',
+        'destroy': 'around_king',
+        'enlarge': 'own',
+        'shield': 'own',
+    }
+    # apparition displaces a piece onto the tile it is already on
+    NO_EFFECT_DEBUFFS = ['displace anywhere']
+
+    MAX_TRANSPOSITIONS = 1 << 18
+    EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+def apply_turn(game_instance: GameInstance, turn: tuple):
+    """
+    this function will input a turn, given as (piece index, new piece index, card
+    index, target index), the same way a player would. -1 skips the move or the cast.
+    the turn is played once `GameInstance.end_turn` is called
+    """
+    piece_index, new_piece_index, card_index, target_index = turn
+    side = game_instance.hand_manager.side_to_play
+    if card_index != -1:
+        game_instance.hand_event({'side': side, 'card_index': card_index})
+        game_instance.hand_event({'side': side, 'board_index': target_index})
+    if piece_index != -1:
+        game_instance.board_event(piece_index)
+        game_instance.board_event(new_piece_index)
+
+
+def _cast_targets(board_state: np.ndarray, side: int, debuffs: str) -> np.ndarray:
+    if debuffs in _Settings.NO_EFFECT_DEBUFFS:
+        return np.array([], np.int64)
+    target = _Settings.CAST_TARGETS.get(_BoardSettings.debuff_kind(debuffs))
+    if target == 'opponent':
+        return np.flatnonzero(board_state * side < 0)
+    if target == 'own':
+        return np.flatnonzero(board_state * side > 0)
+    if target == 'around_king':
+        king_indices = np.flatnonzero(board_state == -side * _BoardSettings.PIECE_MAP['k'])
+        if king_indices.size == 0:
+            return np.array([], np.int64)
+        around_king = np.array(indices_from_mask(_BitboardSettings.KING_ATTACKS[king_indices[0]]), np.int64)
+        return around_king[board_state[around_king] == 0]
+    return np.array([], np.int64)
+
+
+class SearchAI:
+    """
+    a computer opponent. a turn is a piece move together with at most one spell,
+    and turns are searched with alpha beta and iterative deepening until the time
+    budget runs out. every turn is played out on a copy of the game with
+    `GameInstance.end_turn`, so casts, the move and debuffs resolve in the same
+    order as a real turn. random effects are sampled once per searched turn
+    """
+    def __init__(self, time_budget: float = 1.0, max_depth: int = 6):
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.transpositions = {}
+        self.deadline = 0
+        self.nodes = 0
+        self.best_turn = None
+        self.depth_reached = 0
+
+        # a table of scored positions shared with other searches, see `analysis.SharedTable`
+        self.shared_table = None
+
+    def choose_turn(self, game_instance: GameInstance) -> tuple:
+        """
+        this function will search the game from the side to move's point of view and
+        return the best turn found in the time budget. the game itself and the global
+        random state are left untouched
+        """
+        self.deadline = time.perf_counter() + self.time_budget
+        self.nodes = 0
+        self.best_turn = None
+        self.depth_reached = 0
+
+        best_turn = None
+        random_state = np.random.get_state()
+        try:
+            for depth in range(1, self.max_depth + 1):
+                try:
+                    value = self._search(game_instance, depth, -np.inf, np.inf, 0)
+                except _SearchTimeout:
+                    break
+                best_turn = self.best_turn
+                self.depth_reached = depth
+                if abs(value) >= _Settings.WIN_SCORE - self.max_depth:
+                    break
+        finally:
+            np.random.set_state(random_state)
+
+        if best_turn is None:
+            best_turn = self._turns(game_instance, None)[0]
+        return best_turn
+
+    def score(self, game_instance: GameInstance, depth: int, ply: int = 0) -> float:
+        """
+        this function will search the game to the given depth with no time limit and
+        return its score from the side to move's point of view
+        """
+        self.deadline = np.inf
+        return self._search(game_instance, depth, -np.inf, np.inf, ply)
+
+    def play_turn(self, game_instance: GameInstance) -> tuple:
+        turn = self.choose_turn(game_instance)
+        apply_turn(game_instance, turn)
+        return turn
+
+    def _key(self, game_instance: GameInstance):
+        hands = game_instance.hand_manager.hands
+        return game_instance.board_manager.zobrist_hash, tuple(sorted(hands[1].cards)), tuple(sorted(hands[-1].cards))
+
+    def _shared_key(self, game_instance: GameInstance) -> int:
+        hands = game_instance.hand_manager.hands
+        return game_instance.board_manager.zobrist_hash ^ hand_key(hands[1].cards, 1) ^ hand_key(hands[-1].cards, -1)
+
+    def _outcome(self, game_instance: GameInstance, ply: int):
+        """
+        the score of a finished game from the side to move's point of view, or None
+        if the game is still going
+        """
+        board_manager = game_instance.board_manager
+        side = board_manager.side_to_move
+        king = _BoardSettings.PIECE_MAP['k']
+        if not np.any(board_manager.board_state == side * king):
+            return -_Settings.WIN_SCORE + ply
+        if not np.any(board_manager.board_state == -side * king):
+            return _Settings.WIN_SCORE - ply
+        if not board_manager.has_legal_move():
+            return -_Settings.WIN_SCORE + ply if board_manager.in_check() else 0
+        return None
+
+    def _turns(self, game_instance: GameInstance, transposition_turn) -> list[tuple]:
+        """
+        this function will list the turns of the side to move, best first. every
+        move is tried without a spell, and every spell is tried together with the
+        best move found so far, which keeps the number of turns close to the number
+        of moves
+        """
+        board_manager = game_instance.board_manager
+        board_state = board_manager.board_state
+        side = board_manager.side_to_move
+
+        scored_turns = []
+        for piece_index, piece_move_indices in board_manager.get_legal_move_table().items():
+            attacker_value = _Settings.PIECE_VALUES[abs(board_state[piece_index])]
+            for new_piece_index in piece_move_indices:
+                captured_value = _Settings.PIECE_VALUES[abs(board_state[new_piece_index])]
+                score = captured_value * 10 - attacker_value if captured_value else -100
+                scored_turns.append((score, (piece_index, int(new_piece_index), -1, -1)))
+        if not scored_turns:
+            scored_turns.append((-100, (-1, -1, -1, -1)))
+        scored_turns.sort(key=lambda scored_turn: -scored_turn[0])
+
+        base_move = scored_turns[0][1][:2] if transposition_turn is None else transposition_turn[:2]
+        cast_card_ids = set()
+        for card_index, card_id in enumerate(game_instance.hand_manager.hands[side].cards):
+            if card_id in cast_card_ids:
+                continue
+            cast_card_ids.add(card_id)
+            debuffs = _HandSettings.CARD_PLAY_PARAMS[card_id]['debuffs']
+            for target_index in _cast_targets(board_state, side, debuffs):
+                target_value = _Settings.PIECE_VALUES[abs(board_state[target_index])]
+                score = target_value * 10 if debuffs == 'death' else -50
+                scored_turns.append((score, (*base_move, card_index, int(target_index))))
+
+        scored_turns.sort(key=lambda scored_turn: -scored_turn[0])
+        turns = [turn for _, turn in scored_turns]
+        if transposition_turn in turns:
+            turns.remove(transposition_turn)
+            turns.insert(0, transposition_turn)
+        return turns
+
+    def _score_leaves(self, game_instance: GameInstance, turns: list[tuple], ply: int) -> np.ndarray:
+        """
+        this function will play every turn and score the games they lead to from
+        this side's point of view. the games that have not finished are evaluated
+        together in one batch
+        """
+        values = np.zeros(len(turns))
+        leaves = []
+        leaf_indices = []
+        for i, turn in enumerate(turns):
+            self.nodes += 1
+            if time.perf_counter() > self.deadline:
+                raise _SearchTimeout()
+            child = game_instance.copy()
+            apply_turn(child, turn)
+            child.end_turn()
+            outcome = self._outcome(child, ply)
+            if outcome is not None:
+                values[i] = -outcome
+            else:
+                leaves.append(child)
+                leaf_indices.append(i)
+        values[leaf_indices] = -evaluate_games(leaves)
+        return values
+
+    def _search(self, game_instance: GameInstance, depth: int, alpha: float, beta: float, ply: int) -> float:
+        self.nodes += 1
+        if time.perf_counter() > self.deadline:
+            raise _SearchTimeout()
+
+        outcome = self._outcome(game_instance, ply)
+        if outcome is not None:
+            return outcome
+        if depth == 0:
+            return float(evaluate_games([game_instance])[0])
+
+        key = self._key(game_instance)
+        transposition_turn = None
+        if key in self.transpositions:
+            entry_depth, entry_value, entry_flag, transposition_turn = self.transpositions[key]
+            if entry_depth >= depth and ply > 0:
+                if entry_flag == _Settings.EXACT:
+                    return entry_value
+                if entry_flag == _Settings.LOWER_BOUND:
+                    alpha = max(alpha, entry_value)
+                elif entry_flag == _Settings.UPPER_BOUND:
+                    beta = min(beta, entry_value)
+                if alpha >= beta:
+                    return entry_value
+        if self.shared_table is not None and ply > 0:
+            shared_value = self.shared_table.probe(self._shared_key(game_instance), depth)
+            if shared_value is not None:
+                return shared_value
+
+        original_alpha = alpha
+        best_value = -np.inf
+        best_turn = None
+        turns = self._turns(game_instance, transposition_turn)
+        if depth == 1:
+            for turn, value in zip(turns, self._score_leaves(game_instance, turns, ply + 1)):
+                if value > best_value:
+                    best_value = value
+                    best_turn = turn
+        else:
+            for turn in turns:
+                child = game_instance.copy()
+                apply_turn(child, turn)
+                child.end_turn()
+                value = -self._search(child, depth - 1, -beta, -alpha, ply + 1)
+                if value > best_value:
+                    best_value = value
+                    best_turn = turn
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
+
+        if best_value <= original_alpha:
+            flag = _Settings.UPPER_BOUND
+        elif best_value >= beta:
+            flag = _Settings.LOWER_BOUND
+        else:
+            flag = _Settings.EXACT
+        if len(self.transpositions) >= _Settings.MAX_TRANSPOSITIONS:
+            self.transpositions.clear()
+        self.transpositions[key] = (depth, best_value, flag, best_turn)
+        # won and lost scores depend on the ply they were found at, so are not shared
+        if (
+            self.shared_table is not None and flag == _Settings.EXACT and
+            abs(best_value) < _Settings.WIN_SCORE - self.max_depth - 1
+        ):
+            self.shared_table.store(self._shared_key(game_instance), depth, best_value)
+
+        if ply == 0:
+            self.best_turn = best_turn
+        return best_value
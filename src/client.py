@@ -15,8 +15,9 @@ class _Settings:
 
 
 class Client:
-    def __init__(self, use_mgl: bool = False):
+    def __init__(self, use_mgl: bool = False, server_address: tuple = None):
         self.use_mgl = use_mgl
+        self.server_address = server_address
         self._pg_init()
         self.assets = self.Assets('./assets', self.resolution)
         self._setup_menus()
@@ -82,8 +83,13 @@ class Client:
         self.current_menu = 0
     
     def _setup_server(self):
-        from .server import Server
-        self.server = Server()
+        # play against a server over the network if one is given, otherwise host the game here
+        if self.server_address is not None:
+            from .network import RemoteServer
+            self.server = RemoteServer(*self.server_address)
+        else:
+            from .server import Server
+            self.server = Server()
 
     def _get_lobby_type(self):
         return self.menus[0].lobby_type
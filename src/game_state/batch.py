@@ -0,0 +1,279 @@
+import numpy as np
+
+from .board import _Settings as _BoardSettings
+
+
+def _build_step_table(offsets: list) -> np.ndarray:
+    """
+    this function will precompute, for every tile, the tile each offset lands on,
+    or -1 where the offset leaves the board
+    """
+    table = np.full((64, len(offsets)), -1, np.int64)
+    for index in range(64):
+        x, y = index % 8, index // 8
+        for i, (dx, dy) in enumerate(offsets):
+            if 0 <= x + dx < 8 and 0 <= y + dy < 8:
+                table[index, i] = (x + dx) + 8 * (y + dy)
+    return table
+
+
+def _build_ray_table(directions: list) -> np.ndarray:
+    """
+    this function will precompute, for every tile and direction, the tiles along
+    the ray leaving the tile in order, padded with -1 past the edge of the board
+    """
+    table = np.full((64, len(directions), 7), -1, np.int64)
+    for index in range(64):
+        for i, (dx, dy) in enumerate(directions):
+            x, y = index % 8, index // 8
+            for step in range(7):
+                x, y = x + dx, y + dy
+                if not (0 <= x < 8 and 0 <= y < 8):
+                    break
+                table[index, i, step] = x + 8 * y
+    return table
+
+
+class _Settings:
+    KING, QUEEN, BISHOP, KNIGHT, ROOK, PAWN = 1, 2, 3, 4, 5, 6
+
+    KING_STEPS = _build_step_table([[-1,-1],[0,-1],[1,-1],[-1,0],[1,0],[-1,1],[0,1],[1,1]])
+    KNIGHT_STEPS = _build_step_table([[-1,-2],[1,-2],[-2,-1],[2,-1],[-2,1],[2,1],[-1,2],[1,2]])
+    # pawns of side 1 capture towards index 0, pawns of side -1 towards index 63
+    PAWN_STEPS = {
+        1: _build_step_table([[-1,-1],[1,-1]]),
+        -1: _build_step_table([[1,1],[-1,1]]),
+    }
+    # the first four directions are straight, the last four diagonal
+    RAYS = _build_ray_table([[0,-1],[-1,0],[1,0],[0,1],[-1,-1],[1,-1],[-1,1],[1,1]])
+    DIAGONAL_RAYS = np.arange(8) >= 4
+
+    DEBUFF_BITS = _BoardSettings.DEBUFF_BITS
+
+
+def _gather(tiles: np.ndarray, rows: np.ndarray, table: np.ndarray):
+    """
+    looks up `table[rows, tiles]` for tiles padded with -1, returning the values
+    and which tiles were on the board
+    """
+    valid = tiles >= 0
+    rows = rows.reshape(rows.shape + (1,) * (tiles.ndim - rows.ndim))
+    return table[rows, np.where(valid, tiles, 0)], valid
+
+
+def squares_attacked(boards: np.ndarray, destroy: np.ndarray, squares: np.ndarray, sides: np.ndarray) -> np.ndarray:
+    """
+    this function will check, for each of M boards, if the pieces of `sides` can
+    capture on `squares`, looking outwards from the square as in
+    `BitboardPosition.is_square_attacked`. pawns only count where they can actually
+    capture a piece, and destroyed tiles block rays and cannot be captured on
+    """
+    rows = np.arange(boards.shape[0])
+    sides = np.asarray(sides)
+    attackers = boards * sides[:, None]
+    square_piece = boards[rows, squares] * sides
+    attackable = ~destroy[rows, squares] & (square_piece <= 0)
+
+    knights, valid = _gather(_Settings.KNIGHT_STEPS[squares], rows, attackers)
+    attacked = np.any(valid & (knights == _Settings.KNIGHT), axis=-1)
+    kings, valid = _gather(_Settings.KING_STEPS[squares], rows, attackers)
+    attacked |= np.any(valid & (kings == _Settings.KING), axis=-1)
+
+    # the pawns that capture on a tile stand where a pawn of the other side would capture from it
+    pawn_tiles = np.where(sides[:, None] == 1, _Settings.PAWN_STEPS[-1][squares], _Settings.PAWN_STEPS[1][squares])
+    pawns, valid = _gather(pawn_tiles, rows, attackers)
+    attacked |= (square_piece < 0) & np.any(valid & (pawns == _Settings.PAWN), axis=-1)
+
+    rays = _Settings.RAYS[squares]
+    blockers, valid = _gather(rays, rows, (boards != 0) | destroy)
+    blockers &= valid
+    first_blocker = np.take_along_axis(rays, np.argmax(blockers, axis=-1)[..., None], axis=-1)[..., 0]
+    sliders, _ = _gather(first_blocker, rows, attackers)
+    slider_type = np.where(_Settings.DIAGONAL_RAYS, _Settings.BISHOP, _Settings.ROOK)
+    attacked |= np.any(
+        np.any(blockers, axis=-1) & ((sliders == _Settings.QUEEN) | (sliders == slider_type)),
+        axis=-1
+    )
+    return attackable & attacked
+
+
+def _pseudo_legal_moves(boards, destroy, castling_privileges, en_passant, sides, board_indices, piece_indices):
+    """
+    this function will list the moves of every piece that can be picked up, as
+    (piece, new piece index) pairs, following `BitboardPosition.piece_moves`.
+    pieces are moved by the side to move of their board, including controlled ones
+    """
+    sides_p = sides[board_indices]
+    pieces = np.abs(boards[board_indices, piece_indices])
+    occupied = boards != 0
+    empty = ~occupied & ~destroy
+    blocked = (boards * sides[:, None] > 0) | destroy
+
+    move_pieces = []
+    move_tiles = []
+
+    def add(piece_numbers, tiles):
+        move_pieces.append(piece_numbers)
+        move_tiles.append(tiles)
+
+    # knights and kings step once
+    for piece, steps in [(_Settings.KNIGHT, _Settings.KNIGHT_STEPS), (_Settings.KING, _Settings.KING_STEPS)]:
+        tiles = steps[piece_indices]
+        is_blocked, valid = _gather(tiles, board_indices, blocked)
+        can_move = valid & ~is_blocked & (pieces == piece)[:, None]
+        piece_numbers, step = np.nonzero(can_move)
+        add(piece_numbers, tiles[piece_numbers, step])
+
+    # sliding pieces move up to and including the first blocker along each ray
+    rays = _Settings.RAYS[piece_indices]
+    ray_blockers, valid = _gather(rays, board_indices, occupied | destroy)
+    ray_blockers &= valid
+    behind_blocker = (np.cumsum(ray_blockers, axis=-1) - ray_blockers) > 0
+    is_blocked, _ = _gather(rays, board_indices, blocked)
+    slides = (
+        (pieces == _Settings.QUEEN)[:, None] |
+        ((pieces == _Settings.ROOK)[:, None] & ~_Settings.DIAGONAL_RAYS) |
+        ((pieces == _Settings.BISHOP)[:, None] & _Settings.DIAGONAL_RAYS)
+    )
+    can_move = valid & ~behind_blocker & ~is_blocked & slides[:, :, None]
+    piece_numbers, direction, step = np.nonzero(can_move)
+    add(piece_numbers, rays[piece_numbers, direction, step])
+
+    # pawn pushes, two tiles from the back two rows
+    is_pawn = pieces == _Settings.PAWN
+    y = piece_indices // 8
+    push = piece_indices - sides_p * 8
+    can_push = is_pawn & (y - sides_p >= 0) & (y - sides_p < 8)
+    can_push &= empty[board_indices, np.clip(push, 0, 63)]
+    add(np.flatnonzero(can_push), push[can_push])
+    double_push = push - sides_p * 8
+    can_double_push = can_push & (np.trunc((y - 3.5) / 2.5) == sides_p)
+    can_double_push &= empty[board_indices, np.clip(double_push, 0, 63)]
+    add(np.flatnonzero(can_double_push), double_push[can_double_push])
+
+    # pawn captures, including en passant
+    tiles = np.where(sides_p[:, None] == 1, _Settings.PAWN_STEPS[1][piece_indices], _Settings.PAWN_STEPS[-1][piece_indices])
+    targets, valid = _gather(tiles, board_indices, boards * -sides[:, None] > 0)
+    targets |= tiles == en_passant[board_indices][:, None]
+    is_destroyed, _ = _gather(tiles, board_indices, destroy)
+    can_capture = valid & targets & ~is_destroyed & is_pawn[:, None]
+    piece_numbers, step = np.nonzero(can_capture)
+    add(piece_numbers, tiles[piece_numbers, step])
+
+    # castling, through tiles the opponent cannot capture on
+    is_king = pieces == _Settings.KING
+    x = piece_indices % 8
+    privileges = castling_privileges[board_indices]
+    rows = np.arange(len(piece_indices))
+    for direction, privilege, path, checked_path in [
+        (1, -sides_p + 1, [1, 2], [1, 2]),
+        (-1, -sides_p + 2, [-1, -2, -3], [-1, -2]),
+    ]:
+        can_castle = is_king & privileges[rows, privilege]
+        can_castle &= (x + 3 < 8) if direction == 1 else (x - 4 >= 0)
+        for offset in path:
+            can_castle &= empty[board_indices, np.clip(piece_indices + offset, 0, 63)]
+        for offset in checked_path:
+            candidates = np.flatnonzero(can_castle)
+            can_castle[candidates] &= ~squares_attacked(
+                boards[board_indices[candidates]],
+                destroy[board_indices[candidates]],
+                piece_indices[candidates] + offset,
+                -sides_p[candidates]
+            )
+        add(np.flatnonzero(can_castle), piece_indices[can_castle] + 2 * direction)
+
+    return np.concatenate(move_pieces), np.concatenate(move_tiles)
+
+
+def calculate_batch_legal_moves(
+    boards: np.ndarray,
+    debuffs: np.ndarray,
+    en_passant: np.ndarray,
+    castling_privileges: np.ndarray,
+    sides: np.ndarray
+):
+    """
+    this function will calculate the legal moves of N boards at once. boards are
+    (N, 64) piece codes, debuffs are (N, 64) debuff kind bitmasks as in
+    `BoardDebuffs.kinds`, en passant is (N,), castling privileges are (N, 4) in the
+    order of KQkq and sides are the (N,) sides to move. it returns flat arrays of
+    the board, piece index and new piece index of every move, sorted by board, and
+    the (N + 1,) offsets of each board's moves in them
+    """
+    boards = np.asarray(boards, np.int8)
+    debuffs = np.asarray(debuffs, np.uint16)
+    en_passant = np.asarray(en_passant, np.int64)
+    castling_privileges = np.asarray(castling_privileges, np.bool_)
+    sides = np.asarray(sides, np.int64)
+    n_boards = boards.shape[0]
+
+    destroy = (debuffs & _Settings.DEBUFF_BITS['destroy']) != 0
+    control = (debuffs & _Settings.DEBUFF_BITS['control']) != 0
+    stationary = (debuffs & _Settings.DEBUFF_BITS['stationary']) != 0
+    shrink = (debuffs & _Settings.DEBUFF_BITS['shrink']) != 0
+
+    can_pickup = ((boards * sides[:, None] > 0) | control) & ~stationary
+    board_indices, piece_indices = np.nonzero(can_pickup)
+    piece_numbers, new_piece_indices = _pseudo_legal_moves(
+        boards, destroy, castling_privileges, en_passant, sides, board_indices, piece_indices
+    )
+    move_boards = board_indices[piece_numbers]
+    move_piece_indices = piece_indices[piece_numbers]
+
+    # play every move out and keep the ones that leave the king safe
+    rows = np.arange(move_boards.size)
+    new_boards = boards[move_boards]
+    new_destroy = destroy[move_boards]
+    move_sides = sides[move_boards]
+    pieces = np.abs(new_boards[rows, move_piece_indices])
+
+    def move_tile(move_rows, from_indices, to_indices):
+        new_boards[move_rows, to_indices] = new_boards[move_rows, from_indices]
+        new_boards[move_rows, from_indices] = 0
+        new_destroy[move_rows, to_indices] = new_destroy[move_rows, from_indices]
+        new_destroy[move_rows, from_indices] = False
+
+    move_tile(rows, move_piece_indices, new_piece_indices)
+    is_en_passant = (pieces == _Settings.PAWN) & (new_piece_indices == en_passant[move_boards])
+    captured_indices = en_passant[move_boards][is_en_passant] + move_sides[is_en_passant] * 8
+    new_boards[rows[is_en_passant], captured_indices] = 0
+    new_destroy[rows[is_en_passant], captured_indices] = False
+    for index_change, rook_offset, new_rook_offset in [(2, 3, 1), (-2, -4, -1)]:
+        is_castling = (pieces == _Settings.KING) & (new_piece_indices - move_piece_indices == index_change)
+        move_tile(
+            rows[is_castling],
+            move_piece_indices[is_castling] + rook_offset,
+            move_piece_indices[is_castling] + new_rook_offset
+        )
+
+    own_kings = new_boards == (move_sides * _Settings.KING)[:, None]
+    has_king = np.any(own_kings, axis=-1)
+    king_indices = np.argmax(own_kings, axis=-1)
+    legal = ~has_king | ~squares_attacked(new_boards, new_destroy, king_indices, -move_sides)
+
+    # shrunk pieces can move but cannot capture
+    is_shrunk = shrink[move_boards, move_piece_indices]
+    captures = (boards[move_boards, new_piece_indices] != 0) | is_en_passant
+    legal &= ~(is_shrunk & captures)
+
+    move_boards = move_boards[legal]
+    move_piece_indices = move_piece_indices[legal]
+    new_piece_indices = new_piece_indices[legal]
+    order = np.lexsort((new_piece_indices, move_piece_indices, move_boards))
+    move_boards = move_boards[order]
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(move_boards, minlength=n_boards))])
+    return move_boards, move_piece_indices[order], new_piece_indices[order], offsets
+
+
+def encode_board_managers(board_managers: list):
+    """
+    this function will stack board managers into the arrays `calculate_batch_legal_moves` takes
+    """
+    return (
+        np.array([board_manager.board_state for board_manager in board_managers], np.int8),
+        np.array([board_manager.board_debuffs.kinds for board_manager in board_managers], np.uint16),
+        np.array([board_manager.en_passant for board_manager in board_managers], np.int64),
+        np.array([board_manager.castling_privileges for board_manager in board_managers], np.bool_).reshape(-1, 4),
+        np.array([board_manager.side_to_move for board_manager in board_managers], np.int64),
+    )
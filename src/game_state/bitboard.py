@@ -0,0 +1,601 @@
+import numpy as np
+
+
+def mask_from_indices(indices) -> int:
+    mask = 0
+    for index in indices:
+        mask |= 1 << int(index)
+    return mask
+
+
+def _mask_from_bools(bools: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bools.astype(np.bool_), bitorder='little').tobytes(), 'little')
+
+
+def indices_from_mask(mask: int) -> list[int]:
+    indices = []
+    while mask:
+        low_bit = mask & -mask
+        indices.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return indices
+
+
+def _build_step_table(offsets: list) -> list[int]:
+    table = []
+    for index in range(64):
+        x, y = index % 8, index // 8
+        table.append(mask_from_indices([
+            (x + dx) + 8 * (y + dy)
+            for dx, dy in offsets
+            if 0 <= x + dx < 8 and 0 <= y + dy < 8
+        ]))
+    return table
+
+
+def _build_ray_table(dx: int, dy: int):
+    """
+    this function will precompute, for every tile, the mask of the ray leaving the
+    tile in the given direction and a lookup of the squares attacked along that ray
+    for every possible subset of blockers on it
+    """
+    ray_masks = []
+    ray_attacks = []
+    for index in range(64):
+        x, y = index % 8, index // 8
+        ray = []
+        while 0 <= x + dx < 8 and 0 <= y + dy < 8:
+            x, y = x + dx, y + dy
+            ray.append(x + 8 * y)
+        ray_masks.append(mask_from_indices(ray))
+
+        attacks = {}
+        for subset in range(1 << len(ray)):
+            blockers = 0
+            attack = 0
+            blocked = False
+            for i, ray_index in enumerate(ray):
+                if not blocked:
+                    attack |= 1 << ray_index
+                if subset >> i & 1:
+                    blockers |= 1 << ray_index
+                    blocked = True
+            attacks[blockers] = attack
+        ray_attacks.append(attacks)
+    return ray_masks, ray_attacks
+
+
+class _Settings:
+    # tile index i of the board maps to bit i of a bitboard
+    FULL_MASK = (1 << 64) - 1
+    FILE_A = mask_from_indices(range(0, 64, 8))
+    FILE_H = mask_from_indices(range(7, 64, 8))
+
+    KING, QUEEN, BISHOP, KNIGHT, ROOK, PAWN = 1, 2, 3, 4, 5, 6
+
+    KING_ATTACKS = _build_step_table([[-1,-1],[0,-1],[1,-1],[-1,0],[1,0],[-1,1],[0,1],[1,1]])
+    KNIGHT_ATTACKS = _build_step_table([[-1,-2],[1,-2],[-2,-1],[2,-1],[-2,1],[2,1],[-1,2],[1,2]])
+    # pawns of side 1 move towards index 0, pawns of side -1 towards index 63
+    PAWN_ATTACKS = {
+        1: _build_step_table([[-1,-1],[1,-1]]),
+        -1: _build_step_table([[1,1],[-1,1]]),
+    }
+
+    ROOK_DIRECTIONS = [[0,-1],[-1,0],[1,0],[0,1]]
+    BISHOP_DIRECTIONS = [[-1,-1],[1,-1],[-1,1],[1,1]]
+    ROOK_RAYS = [_build_ray_table(dx, dy) for dx, dy in ROOK_DIRECTIONS]
+    BISHOP_RAYS = [_build_ray_table(dx, dy) for dx, dy in BISHOP_DIRECTIONS]
+    QUEEN_RAYS = ROOK_RAYS + BISHOP_RAYS
+    # for each ray: its masks, whether it walks towards higher indices, and if it is diagonal
+    PIN_RAYS = [
+        (ray_masks, dx + 8 * dy > 0, dx != 0 and dy != 0)
+        for (ray_masks, _), (dx, dy) in zip(ROOK_RAYS + BISHOP_RAYS, ROOK_DIRECTIONS + BISHOP_DIRECTIONS)
+    ]
+
+    def sliding_attacks(rays: list, index: int, blockers: int) -> int:
+        attacks = 0
+        for ray_masks, ray_attacks in rays:
+            attacks |= ray_attacks[index][blockers & ray_masks[index]]
+        return attacks
+
+    def nearest_tile(mask: int, increasing: bool) -> int:
+        if increasing:
+            return (mask & -mask).bit_length() - 1
+        return mask.bit_length() - 1
+
+    def pawn_attacks(pawns: int, side: int) -> int:
+        if side == 1:
+            return ((pawns & ~_Settings.FILE_A) >> 9) | ((pawns & ~_Settings.FILE_H) >> 7)
+        return (((pawns & ~_Settings.FILE_H) << 9) | ((pawns & ~_Settings.FILE_A) << 7)) & _Settings.FULL_MASK
+
+
+class BitboardPosition:
+    """
+    a bitboard view of a board state and its tile debuffs. every set of tiles
+    (pieces of a side, pieces of a type, tiles with a debuff) is stored as a
+    64 bit integer so that move generation is done with a handful of integer
+    operations instead of walking the board tile by tile
+    """
+    DEBUFF_NAMES = ['destroy', 'stationary', 'control', 'shrink']
+
+    def __init__(self, board_state: np.ndarray, board_debuffs: 'BoardDebuffs'):
+        self.board = [int(piece) for piece in board_state]
+        self.occupancy = {
+            1: _mask_from_bools(board_state > 0),
+            -1: _mask_from_bools(board_state < 0),
+        }
+        abs_board_state = np.abs(board_state)
+        self.pieces = [_mask_from_bools(abs_board_state == piece) for piece in range(7)]
+        self.debuffs = {
+            debuff_name: _mask_from_bools(board_debuffs.debuff_mask(debuff_name))
+            for debuff_name in BitboardPosition.DEBUFF_NAMES
+        }
+
+    def copy(self):
+        new_position = BitboardPosition.__new__(BitboardPosition)
+        new_position.board = self.board.copy()
+        new_position.occupancy = self.occupancy.copy()
+        new_position.pieces = self.pieces.copy()
+        new_position.debuffs = self.debuffs.copy()
+        return new_position
+
+    def piece_moves(
+        self,
+        piece_index: int,
+        side_to_move: int,
+        en_passant: int,
+        castling_privileges: list,
+        captures_only: bool,
+        attack_map = None
+    ) -> int:
+        """
+        this function will calculate the mask of tiles the piece on `piece_index`
+        can move to when it is moved by `side_to_move`. this mirrors the per offset
+        walk in `board._Settings.calculate_piece_move_indices`
+        """
+        piece = abs(self.board[piece_index])
+        destroy = self.debuffs['destroy']
+        blocked = self.occupancy[side_to_move] | destroy
+
+        if piece == _Settings.KNIGHT:
+            return _Settings.KNIGHT_ATTACKS[piece_index] & ~blocked
+        if piece == _Settings.ROOK:
+            blockers = self.occupancy[1] | self.occupancy[-1] | destroy
+            return _Settings.sliding_attacks(_Settings.ROOK_RAYS, piece_index, blockers) & ~blocked
+        if piece == _Settings.BISHOP:
+            blockers = self.occupancy[1] | self.occupancy[-1] | destroy
+            return _Settings.sliding_attacks(_Settings.BISHOP_RAYS, piece_index, blockers) & ~blocked
+        if piece == _Settings.QUEEN:
+            blockers = self.occupancy[1] | self.occupancy[-1] | destroy
+            return _Settings.sliding_attacks(_Settings.QUEEN_RAYS, piece_index, blockers) & ~blocked
+        if piece == _Settings.PAWN:
+            return self._pawn_moves(piece_index, side_to_move, en_passant, captures_only)
+        if piece == _Settings.KING:
+            moves = _Settings.KING_ATTACKS[piece_index] & ~blocked
+            if not captures_only:
+                moves |= self._castling_moves(piece_index, side_to_move, castling_privileges, attack_map)
+            return moves
+        return 0
+
+    def _pawn_moves(self, piece_index: int, side_to_move: int, en_passant: int, captures_only: bool) -> int:
+        destroy = self.debuffs['destroy']
+        moves = 0
+        if not captures_only:
+            # pawn movement
+            empty = ~(self.occupancy[1] | self.occupancy[-1] | destroy)
+            y = piece_index // 8
+            if 0 <= y - side_to_move < 8:
+                new_piece_index = piece_index - side_to_move * 8
+                if empty >> new_piece_index & 1:
+                    moves |= 1 << new_piece_index
+                    if int((y - 3.5) / 2.5) == side_to_move and empty >> (new_piece_index - side_to_move * 8) & 1:
+                        moves |= 1 << (new_piece_index - side_to_move * 8)
+
+        # pawn capture
+        targets = self.occupancy[-side_to_move]
+        if en_passant >= 0:
+            targets |= 1 << en_passant
+        moves |= _Settings.PAWN_ATTACKS[side_to_move][piece_index] & targets & ~destroy
+        return moves
+
+    def _castling_moves(self, piece_index: int, side_to_move: int, castling_privileges: list, attack_map) -> int:
+        x = piece_index % 8
+        blocked = self.occupancy[1] | self.occupancy[-1] | self.debuffs['destroy']
+        moves = 0
+        kingside = castling_privileges[-side_to_move + 1] and x + 3 < 8
+        queenside = castling_privileges[-side_to_move + 2] and x - 4 >= 0
+        if not (kingside or queenside):
+            return moves
+
+        if attack_map is None:
+            attack_map = AttackMap(self)
+        opponent_checked_mask = attack_map.attacked_squares(-side_to_move)
+        if kingside:
+            path = 0b11 << (piece_index + 1)
+            if not path & (blocked | opponent_checked_mask):
+                moves |= 1 << (piece_index + 2)
+        if queenside:
+            path = 0b111 << (piece_index - 3)
+            checked_path = 0b11 << (piece_index - 2)
+            if not (path & blocked or checked_path & opponent_checked_mask):
+                moves |= 1 << (piece_index - 2)
+        return moves
+
+    def _attack_mask(self, side: int, blockers: int, pawn_targets: int) -> int:
+        own = self.occupancy[side]
+        attacked = _Settings.pawn_attacks(self.pieces[_Settings.PAWN] & own, side) & pawn_targets
+        for piece_index in indices_from_mask(self.pieces[_Settings.KNIGHT] & own):
+            attacked |= _Settings.KNIGHT_ATTACKS[piece_index]
+        for piece_index in indices_from_mask(self.pieces[_Settings.KING] & own):
+            attacked |= _Settings.KING_ATTACKS[piece_index]
+        for piece_index in indices_from_mask(self.pieces[_Settings.ROOK] & own):
+            attacked |= _Settings.sliding_attacks(_Settings.ROOK_RAYS, piece_index, blockers)
+        for piece_index in indices_from_mask(self.pieces[_Settings.BISHOP] & own):
+            attacked |= _Settings.sliding_attacks(_Settings.BISHOP_RAYS, piece_index, blockers)
+        for piece_index in indices_from_mask(self.pieces[_Settings.QUEEN] & own):
+            attacked |= _Settings.sliding_attacks(_Settings.QUEEN_RAYS, piece_index, blockers)
+        return attacked
+
+    def attacked_squares(self, side: int) -> int:
+        """
+        this function will calculate the mask of every tile the pieces of `side`
+        can capture on. pawns only count where they can actually capture a piece
+        """
+        destroy = self.debuffs['destroy']
+        blockers = self.occupancy[1] | self.occupancy[-1] | destroy
+        attacked = self._attack_mask(side, blockers, self.occupancy[-side])
+        return attacked & ~self.occupancy[side] & ~destroy
+
+    def king_danger_squares(self, side: int) -> int:
+        """
+        this function will calculate the mask of every tile the king of `-side`
+        cannot step onto. sliding pieces see through the king, since it no longer
+        blocks them once it has moved, and defended pieces count as attacked
+        """
+        destroy = self.debuffs['destroy']
+        king = self.pieces[_Settings.KING] & self.occupancy[-side]
+        blockers = (self.occupancy[1] | self.occupancy[-1] | destroy) & ~king
+        attacked = self._attack_mask(side, blockers, _Settings.FULL_MASK)
+        return attacked & ~destroy
+
+    def is_square_attacked(self, square: int, side: int) -> bool:
+        """
+        this function will check if the pieces of `side` can capture on `square`
+        by looking outwards from the square instead of generating every move
+        """
+        square_mask = 1 << square
+        if square_mask & (self.debuffs['destroy'] | self.occupancy[side]):
+            return False
+
+        own = self.occupancy[side]
+        if _Settings.KNIGHT_ATTACKS[square] & self.pieces[_Settings.KNIGHT] & own:
+            return True
+        if _Settings.KING_ATTACKS[square] & self.pieces[_Settings.KING] & own:
+            return True
+        if (
+            square_mask & self.occupancy[-side] and
+            _Settings.PAWN_ATTACKS[-side][square] & self.pieces[_Settings.PAWN] & own
+        ):
+            return True
+
+        blockers = self.occupancy[1] | self.occupancy[-1] | self.debuffs['destroy']
+        queens = self.pieces[_Settings.QUEEN]
+        if _Settings.sliding_attacks(_Settings.ROOK_RAYS, square, blockers) & (self.pieces[_Settings.ROOK] | queens) & own:
+            return True
+        if _Settings.sliding_attacks(_Settings.BISHOP_RAYS, square, blockers) & (self.pieces[_Settings.BISHOP] | queens) & own:
+            return True
+        return False
+
+    def king_index(self, side: int) -> int:
+        kings = self.pieces[_Settings.KING] & self.occupancy[side]
+        if not kings:
+            return -1
+        return (kings & -kings).bit_length() - 1
+
+    def _move_tile(self, piece_index: int, new_piece_index: int, changed_tiles: list):
+        piece = self.board[piece_index]
+        captured = self.board[new_piece_index]
+        changed_tiles.append((piece_index, piece))
+        changed_tiles.append((new_piece_index, captured))
+        from_mask = 1 << piece_index
+        to_mask = 1 << new_piece_index
+
+        if captured != 0:
+            captured_side = 1 if captured > 0 else -1
+            self.occupancy[captured_side] &= ~to_mask
+            self.pieces[abs(captured)] &= ~to_mask
+        if piece != 0:
+            side = 1 if piece > 0 else -1
+            self.occupancy[side] = (self.occupancy[side] & ~from_mask) | to_mask
+            self.pieces[abs(piece)] = (self.pieces[abs(piece)] & ~from_mask) | to_mask
+        self.board[new_piece_index] = piece
+        self.board[piece_index] = 0
+
+        # debuffs travel with the piece
+        for debuff_name, debuff_mask in self.debuffs.items():
+            if debuff_mask & from_mask:
+                self.debuffs[debuff_name] = (debuff_mask & ~from_mask) | to_mask
+            elif debuff_mask & to_mask:
+                self.debuffs[debuff_name] = debuff_mask & ~to_mask
+
+    def _clear_tile(self, tile_index: int, changed_tiles: list):
+        piece = self.board[tile_index]
+        changed_tiles.append((tile_index, piece))
+        tile_mask = 1 << tile_index
+        if piece != 0:
+            side = 1 if piece > 0 else -1
+            self.occupancy[side] &= ~tile_mask
+            self.pieces[abs(piece)] &= ~tile_mask
+        self.board[tile_index] = 0
+        for debuff_name, debuff_mask in self.debuffs.items():
+            if debuff_mask & tile_mask:
+                self.debuffs[debuff_name] = debuff_mask & ~tile_mask
+
+    def make_move(self, piece_index: int, new_piece_index: int, side_to_move: int, en_passant: int):
+        """
+        this function will play the move on this position in place, following the
+        same rules as `board._Settings.make_move_on_board`. it returns an undo record
+        which can be passed to `unmake_move` to revert the move
+        """
+        changed_tiles = []
+        undo = (
+            self.occupancy[1],
+            self.occupancy[-1],
+            tuple(self.pieces),
+            tuple(self.debuffs.values()),
+            changed_tiles
+        )
+
+        piece = abs(self.board[piece_index])
+        self._move_tile(piece_index, new_piece_index, changed_tiles)
+
+        if piece == _Settings.PAWN and new_piece_index == en_passant:
+            self._clear_tile(en_passant + side_to_move * 8, changed_tiles)
+
+        if piece == _Settings.KING and side_to_move != 0:
+            index_change = new_piece_index - piece_index
+            if index_change == 2: # kingside castling
+                self._move_tile(piece_index + 3, piece_index + 1, changed_tiles)
+            elif index_change == -2: # queenside castling
+                self._move_tile(piece_index - 4, piece_index - 1, changed_tiles)
+
+        return undo
+
+    def unmake_move(self, undo: tuple):
+        white_occupancy, black_occupancy, pieces, debuffs, changed_tiles = undo
+        self.occupancy[1] = white_occupancy
+        self.occupancy[-1] = black_occupancy
+        self.pieces[:] = pieces
+        for debuff_name, debuff_mask in zip(BitboardPosition.DEBUFF_NAMES, debuffs):
+            self.debuffs[debuff_name] = debuff_mask
+        for tile_index, piece in reversed(changed_tiles):
+            self.board[tile_index] = piece
+
+
+class AttackMap:
+    """
+    the tiles attacked by each side in a position. each mask is computed the
+    first time it is needed and kept until the position changes, so checking
+    if a tile is attacked is a single bit test
+    """
+    def __init__(self, position: BitboardPosition):
+        self.position = position
+        self._attacked_squares = {}
+        self._king_danger_squares = {}
+        self._check_info = {}
+
+    def attacked_squares(self, side: int) -> int:
+        if side not in self._attacked_squares:
+            self._attacked_squares[side] = self.position.attacked_squares(side)
+        return self._attacked_squares[side]
+
+    def king_danger_squares(self, side: int) -> int:
+        if side not in self._king_danger_squares:
+            self._king_danger_squares[side] = self.position.king_danger_squares(side)
+        return self._king_danger_squares[side]
+
+    def is_attacked(self, square: int, side: int) -> bool:
+        return bool(self.attacked_squares(side) >> square & 1)
+
+    def in_check(self, side: int) -> bool:
+        king_index = self.position.king_index(side)
+        return king_index != -1 and self.is_attacked(king_index, -side)
+
+    def check_info(self, side: int):
+        if side not in self._check_info:
+            self._check_info[side] = CheckInfo(self.position, side)
+        return self._check_info[side]
+
+
+class CheckInfo:
+    """
+    the pieces giving check to the king of `side`, the tiles which resolve the check,
+    and the pieces pinned to the king along with the tiles they can still move on.
+    with these, the legal moves of most pieces are their moves masked by
+    `evasion_mask` and their pin ray, without playing any of them out
+    """
+    def __init__(self, position: BitboardPosition, side: int):
+        self.king_index = position.king_index(side)
+        self.checkers = 0
+        self.evasion_mask = _Settings.FULL_MASK
+        self.pin_rays = {}
+
+        # the king cannot be attacked on a destroyed tile, and the tile travels with it
+        self.king_is_safe = self.king_index == -1 or bool(position.debuffs['destroy'] >> self.king_index & 1)
+        if self.king_is_safe:
+            return
+
+        king_index = self.king_index
+        opponent = position.occupancy[-side]
+        queens = position.pieces[_Settings.QUEEN]
+        blockers = position.occupancy[1] | position.occupancy[-1] | position.debuffs['destroy']
+
+        # pieces that attack the king directly
+        self.checkers |= _Settings.KNIGHT_ATTACKS[king_index] & position.pieces[_Settings.KNIGHT] & opponent
+        self.checkers |= _Settings.PAWN_ATTACKS[side][king_index] & position.pieces[_Settings.PAWN] & opponent
+        self.checkers |= _Settings.KING_ATTACKS[king_index] & position.pieces[_Settings.KING] & opponent
+
+        between_mask = 0
+        for ray_masks, increasing, diagonal in _Settings.PIN_RAYS:
+            sliders = (position.pieces[_Settings.BISHOP if diagonal else _Settings.ROOK] | queens) & opponent
+            ray = ray_masks[king_index]
+            ray_blockers = blockers & ray
+            if not ray_blockers:
+                continue
+
+            first_blocker = _Settings.nearest_tile(ray_blockers, increasing)
+            if sliders >> first_blocker & 1:
+                self.checkers |= 1 << first_blocker
+                between_mask |= ray & ~ray_masks[first_blocker]
+                continue
+            if position.board[first_blocker] == 0:
+                # an empty destroyed tile blocks the ray for good
+                continue
+
+            ray_blockers &= ray_masks[first_blocker]
+            if not ray_blockers:
+                continue
+            second_blocker = _Settings.nearest_tile(ray_blockers, increasing)
+            if sliders >> second_blocker & 1:
+                self.pin_rays[first_blocker] = ray & ~ray_masks[second_blocker]
+
+        checker_count = bin(self.checkers).count('1')
+        if checker_count == 1:
+            self.evasion_mask = self.checkers | between_mask
+        elif checker_count > 1:
+            self.evasion_mask = 0
+
+
+def calculate_piece_move_indices(
+    position: BitboardPosition,
+    piece_index: int,
+    side_to_move: int,
+    en_passant: int,
+    castling_privileges: list,
+    captures_only: bool
+) -> np.ndarray:
+    return np.array(indices_from_mask(position.piece_moves(
+        piece_index,
+        side_to_move,
+        en_passant,
+        castling_privileges,
+        captures_only
+    )), np.int64)
+
+
+def filter_out_illegal_moves(
+    position: BitboardPosition,
+    piece_index: int,
+    side_to_move: int,
+    en_passant: int,
+    piece_moves: int
+) -> int:
+    legal_moves = 0
+    for new_piece_index in indices_from_mask(piece_moves):
+        undo = position.make_move(piece_index, new_piece_index, side_to_move, en_passant)
+        king_index = position.king_index(side_to_move)
+        if king_index == -1 or not position.is_square_attacked(king_index, -side_to_move):
+            legal_moves |= 1 << new_piece_index
+        position.unmake_move(undo)
+    return legal_moves
+
+
+def calculate_legal_moves(
+    position: BitboardPosition,
+    attack_map: AttackMap,
+    piece_index: int,
+    side_to_move: int,
+    en_passant: int,
+    castling_privileges: list
+) -> int:
+    """
+    this function will calculate the mask of tiles the piece on `piece_index` can
+    legally move to, including the restrictions from tile debuffs
+    """
+    piece_moves = position.piece_moves(piece_index, side_to_move, en_passant, castling_privileges, False, attack_map)
+
+    piece_mask = 1 << piece_index
+    piece = position.board[piece_index]
+    check_info = attack_map.check_info(side_to_move)
+    if check_info.king_is_safe:
+        pass
+    elif piece == side_to_move * _Settings.KING:
+        # the king only has to avoid attacked tiles, castling still has to be played out
+        # since the rook changes which tiles are attacked
+        king_moves = piece_moves & _Settings.KING_ATTACKS[piece_index]
+        castling_moves = piece_moves & ~king_moves
+        piece_moves = king_moves & ~attack_map.king_danger_squares(-side_to_move)
+        piece_moves |= filter_out_illegal_moves(position, piece_index, side_to_move, en_passant, castling_moves)
+    elif piece * side_to_move > 0:
+        # en passant removes two pieces from the board, so it is played out
+        en_passant_moves = 0
+        if abs(piece) == _Settings.PAWN and en_passant >= 0:
+            en_passant_moves = piece_moves & (1 << en_passant)
+        piece_moves &= check_info.evasion_mask & check_info.pin_rays.get(piece_index, _Settings.FULL_MASK)
+        piece_moves &= ~en_passant_moves
+        piece_moves |= filter_out_illegal_moves(position, piece_index, side_to_move, en_passant, en_passant_moves)
+    else:
+        # a controlled opponent piece can expose the king from where it lands
+        piece_moves = filter_out_illegal_moves(position, piece_index, side_to_move, en_passant, piece_moves)
+
+    # shrunk pieces can move but cannot capture
+    if position.debuffs['shrink'] & piece_mask:
+        piece_moves &= ~(position.occupancy[1] | position.occupancy[-1])
+        if abs(position.board[piece_index]) == _Settings.PAWN and en_passant >= 0:
+            piece_moves &= ~(1 << en_passant)
+
+    return piece_moves
+
+
+def calculate_legal_move_indices(
+    position: BitboardPosition,
+    attack_map: AttackMap,
+    piece_index: int,
+    side_to_move: int,
+    en_passant: int,
+    castling_privileges: list
+) -> np.ndarray:
+    return np.array(indices_from_mask(calculate_legal_moves(
+        position,
+        attack_map,
+        piece_index,
+        side_to_move,
+        en_passant,
+        castling_privileges
+    )), np.int64)
+
+
+def calculate_can_pickup(position: BitboardPosition, side_to_move: int) -> int:
+    return (position.occupancy[side_to_move] | position.debuffs['control']) & ~position.debuffs['stationary']
+
+
+def calculate_can_pickup_indices(position: BitboardPosition, side_to_move: int) -> np.ndarray:
+    return np.array(indices_from_mask(calculate_can_pickup(position, side_to_move)), np.int64)
+
+
+def calculate_move_rights(
+    position: BitboardPosition,
+    piece_index: int,
+    new_piece_index: int,
+    side_to_move: int,
+    castling_privileges: list
+):
+    """
+    this function will calculate the en passant index and castling privileges
+    after the move is played, following `board._Settings.make_move_on_board`.
+    it has to be called before the move is made
+    """
+    piece = abs(position.board[piece_index])
+    new_en_passant = -1
+    if piece == _Settings.PAWN and abs(new_piece_index - piece_index) == 16:
+        new_en_passant = piece_index - side_to_move * 8
+
+    new_castling_privileges = castling_privileges
+    if piece == _Settings.KING:
+        new_castling_privileges = list(castling_privileges)
+        new_castling_privileges[-side_to_move + 1] = False
+        new_castling_privileges[-side_to_move + 2] = False
+    elif piece == _Settings.ROOK and piece_index in (0, 7, 56, 63):
+        new_castling_privileges = list(castling_privileges)
+        new_castling_privileges[{0: 3, 7: 2, 56: 1, 63: 0}[piece_index]] = False
+    return new_en_passant, new_castling_privileges
@@ -1,5 +1,31 @@
+import heapq
+
 import numpy as np
 
+from .bitboard import BitboardPosition, AttackMap, calculate_legal_move_indices, calculate_can_pickup_indices
+from .zobrist import hash_position, tile_key, side_key, castling_key, en_passant_key
+from .chance import RandomChooser
+
+
+def _build_n_steps_away_table(max_steps: int) -> list[list[tuple]]:
+    """
+    this function will precompute, for every number of steps and every tile, the
+    tiles a piece can end up on after exactly that many orthogonal steps. stepping
+    back and forth means these are the tiles within that manhattan distance which
+    share its parity
+    """
+    table = []
+    for n_steps in range(max_steps + 1):
+        table.append([])
+        for target_index in range(64):
+            x, y = target_index % 8, target_index // 8
+            table[-1].append(tuple(
+                tile_index for tile_index in range(64)
+                if abs(tile_index % 8 - x) + abs(tile_index // 8 - y) <= n_steps and
+                (n_steps - abs(tile_index % 8 - x) - abs(tile_index // 8 - y)) % 2 == 0
+            ))
+    return table
+
 
 class _Settings:
     PIECE_MAP = {
@@ -35,9 +61,20 @@ class _Settings:
     ]
     PIECE_CAN_SLIDE = [False, False, True, True, False, True, False]
 
+    # every kind of debuff a card can leave on a tile, one bit each. all of the
+    # displace spells share a kind
+    DEBUFF_KINDS = [
+        'death', 'destroy', 'shrink', 'invisible', 'enlarge', 'dangerous1', 'dangerous2',
+        'stationary', 'control', 'repair', 'shield', 'displace', 'none'
+    ]
+    DEBUFF_INDICES = {debuff: i for i, debuff in enumerate(DEBUFF_KINDS)}
+    DEBUFF_BITS = {debuff: 1 << i for i, debuff in enumerate(DEBUFF_KINDS)}
+    DEBUFF_BIT_ARRAY = np.array([1 << i for i in range(len(DEBUFF_KINDS))], np.uint16)
+    debuff_kind = lambda debuff : 'displace' if debuff.startswith('displace') else debuff
+
     def calculate_piece_move_indices(
         board_state: np.ndarray, 
-        board_debuffs: np.ndarray,
+        board_debuffs: 'BoardDebuffs',
         piece_index: int, 
         side_to_move: int, 
         en_passant: int,
@@ -60,7 +97,7 @@ class _Settings:
                     (0 <= y + y_offset * slide_amt and y + y_offset * slide_amt < 8)
                 ):
                     index_offset = (x_offset + 8 * y_offset) * slide_amt
-                    if board_debuffs[piece_index + index_offset].tile_has_debuff('destroy'):
+                    if board_debuffs.tile_has_debuff(piece_index + index_offset, 'destroy'):
                         break
                     elif board_state[piece_index + index_offset] * side_to_move == 0:
                         piece_move_indices.append(piece_index + index_offset)
@@ -78,7 +115,7 @@ class _Settings:
                 index_offset = x_offset + 8 * y_offset
                 if (
                     board_state[piece_index + index_offset] * side_to_move <= 0 and
-                    not board_debuffs[piece_index + index_offset].tile_has_debuff('destroy')
+                    not board_debuffs.tile_has_debuff(piece_index + index_offset, 'destroy')
                 ):
                     piece_move_indices.append(piece_index + index_offset)
 
@@ -88,15 +125,15 @@ class _Settings:
             if not captures_only:
                 index_offset = -side_to_move * 8
                 if (
-                    board_state[piece_index + index_offset] == 0 and
                     (0 <= y - side_to_move and y - side_to_move < 8) and
-                    not board_debuffs[piece_index + index_offset].tile_has_debuff('destroy')
+                    board_state[piece_index + index_offset] == 0 and
+                    not board_debuffs.tile_has_debuff(piece_index + index_offset, 'destroy')
                 ):
                     piece_move_indices.append(piece_index + index_offset)
                     if (
                         int((y - 3.5) / 2.5) == side_to_move and
                         board_state[piece_index + index_offset * 2] == 0 and
-                        not board_debuffs[piece_index + index_offset].tile_has_debuff('destroy')
+                        not board_debuffs.tile_has_debuff(piece_index + index_offset * 2, 'destroy')
                     ):
                         piece_move_indices.append(piece_index + index_offset * 2)
 
@@ -110,7 +147,7 @@ class _Settings:
                     (0 <= y + y_offset and y + y_offset < 8)
                 ):
                     index_offset = x_offset + 8 * y_offset
-                    if board_debuffs[piece_index + index_offset].tile_has_debuff('destroy'):
+                    if board_debuffs.tile_has_debuff(piece_index + index_offset, 'destroy'):
                         continue
                     if board_state[piece_index + index_offset] * side_to_move < 0:
                         piece_move_indices.append(piece_index + index_offset)
@@ -136,8 +173,8 @@ class _Settings:
                 board_state[piece_index + 2] == 0 and 
                 piece_index + 1 not in opponent_checked_indices and
                 piece_index + 2 not in opponent_checked_indices and
-                not board_debuffs[piece_index + 1].tile_has_debuff('destroy') and
-                not board_debuffs[piece_index + 2].tile_has_debuff('destroy')
+                not board_debuffs.tile_has_debuff(piece_index + 1, 'destroy') and
+                not board_debuffs.tile_has_debuff(piece_index + 2, 'destroy')
             ):
                 piece_move_indices.append(piece_index + 2)
             
@@ -148,9 +185,9 @@ class _Settings:
                 board_state[piece_index - 3] == 0 and 
                 piece_index - 1 not in opponent_checked_indices and
                 piece_index - 2 not in opponent_checked_indices and 
-                not board_debuffs[piece_index - 1].tile_has_debuff('destroy') and
-                not board_debuffs[piece_index - 2].tile_has_debuff('destroy') and
-                not board_debuffs[piece_index - 3].tile_has_debuff('destroy')
+                not board_debuffs.tile_has_debuff(piece_index - 1, 'destroy') and
+                not board_debuffs.tile_has_debuff(piece_index - 2, 'destroy') and
+                not board_debuffs.tile_has_debuff(piece_index - 3, 'destroy')
             ):
                 piece_move_indices.append(piece_index - 2)
 
@@ -158,7 +195,7 @@ class _Settings:
 
     def make_move_on_board(
         board_state: np.ndarray,
-        board_debuffs: np.ndarray,
+        board_debuffs: 'BoardDebuffs',
         piece_index: int,
         new_piece_index: int,
         side_to_move: int,
@@ -166,22 +203,21 @@ class _Settings:
         castling_privileges: list
     ):  
         new_board_state = board_state.copy()
-        new_board_debuffs = np.array([debuff.copy() for debuff in board_debuffs])
+        new_board_debuffs = board_debuffs.copy()
         new_castling_privileges = castling_privileges.copy()
         
         piece = new_board_state[piece_index]
         new_board_state[new_piece_index] = piece
         new_board_state[piece_index] = 0
 
-        new_board_debuffs[new_piece_index].copy_from(new_board_debuffs[piece_index])
-        new_board_debuffs[piece_index].clear_debuffs()
+        new_board_debuffs.move_tile(piece_index, new_piece_index)
 
         piece = np.abs(piece)
         if piece == _Settings.PIECE_MAP['p']: 
             # check if capture was en passant
             if new_piece_index == en_passant:
                 new_board_state[en_passant + side_to_move * 8] = 0
-                new_board_debuffs[en_passant + side_to_move * 8].clear_debuffs()
+                new_board_debuffs.clear_tile(en_passant + side_to_move * 8)
 
             # updating enpassant
             index_change = np.abs(new_piece_index - piece_index)
@@ -199,14 +235,12 @@ class _Settings:
                     new_board_state[piece_index + 1] = new_board_state[piece_index + 3]
                     new_board_state[piece_index + 3] = 0
 
-                    new_board_debuffs[piece_index + 1].copy_from(new_board_debuffs[piece_index + 3])
-                    new_board_debuffs[piece_index + 3].clear_debuffs()
+                    new_board_debuffs.move_tile(piece_index + 3, piece_index + 1)
                 elif index_change == -2: # queenside castling
                     new_board_state[piece_index - 1] = new_board_state[piece_index - 4]
                     new_board_state[piece_index - 4] = 0
 
-                    new_board_debuffs[piece_index - 1].copy_from(new_board_debuffs[piece_index - 4])
-                    new_board_debuffs[piece_index - 4].clear_debuffs()
+                    new_board_debuffs.move_tile(piece_index - 4, piece_index - 1)
             
             new_castling_privileges[-side_to_move + 1] = False
             new_castling_privileges[-side_to_move + 2] = False
@@ -223,9 +257,106 @@ class _Settings:
         
         return new_board_state, new_board_debuffs, new_en_passant, new_castling_privileges
 
+    def _move_tile_in_place(
+        board_state: np.ndarray,
+        board_debuffs: 'BoardDebuffs',
+        piece_index: int,
+        new_piece_index: int,
+        undo
+    ):
+        undo.changed_tiles.append((piece_index, board_state[piece_index]))
+        undo.changed_tiles.append((new_piece_index, board_state[new_piece_index]))
+        undo.changed_debuffs.append((piece_index, board_debuffs.get_tile(piece_index)))
+        undo.changed_debuffs.append((new_piece_index, board_debuffs.get_tile(new_piece_index)))
+
+        board_state[new_piece_index] = board_state[piece_index]
+        board_state[piece_index] = 0
+        board_debuffs.move_tile(piece_index, new_piece_index)
+
+    def make_move_in_place(
+        board_state: np.ndarray,
+        board_debuffs: 'BoardDebuffs',
+        piece_index: int,
+        new_piece_index: int,
+        side_to_move: int,
+        en_passant: int,
+        castling_privileges: list
+    ):
+        """
+        this function follows the same rules as `make_move_on_board`, but plays the
+        move directly on the given board state, tile debuffs and castling privileges.
+        it returns the new en passant index and an undo record which can be passed
+        to `unmake_move_in_place` to revert the move
+        """
+        undo = MoveUndo(
+            board_state[new_piece_index],
+            new_piece_index,
+            en_passant,
+            castling_privileges
+        )
+
+        piece = np.abs(board_state[piece_index])
+        _Settings._move_tile_in_place(board_state, board_debuffs, piece_index, new_piece_index, undo)
+
+        new_en_passant = -1
+        if piece == _Settings.PIECE_MAP['p']:
+            # check if capture was en passant
+            if new_piece_index == en_passant:
+                captured_index = en_passant + side_to_move * 8
+                undo.captured_piece = board_state[captured_index]
+                undo.captured_index = captured_index
+                undo.changed_tiles.append((captured_index, board_state[captured_index]))
+                undo.changed_debuffs.append((captured_index, board_debuffs.get_tile(captured_index)))
+                board_state[captured_index] = 0
+                board_debuffs.clear_tile(captured_index)
+
+            # updating enpassant
+            if np.abs(new_piece_index - piece_index) == 16:
+                new_en_passant = piece_index - side_to_move * 8
+
+        if piece == _Settings.PIECE_MAP['k']:
+            if side_to_move != 0:
+                index_change = new_piece_index - piece_index
+                if index_change == 2: # kingside castling
+                    _Settings._move_tile_in_place(board_state, board_debuffs, piece_index + 3, piece_index + 1, undo)
+                elif index_change == -2: # queenside castling
+                    _Settings._move_tile_in_place(board_state, board_debuffs, piece_index - 4, piece_index - 1, undo)
+
+            castling_privileges[-side_to_move + 1] = False
+            castling_privileges[-side_to_move + 2] = False
+
+        if piece == _Settings.PIECE_MAP['r']:
+            if piece_index == 0:
+                castling_privileges[3] = False
+            elif piece_index == 7:
+                castling_privileges[2] = False
+            elif piece_index == 56:
+                castling_privileges[1] = False
+            elif piece_index == 63:
+                castling_privileges[0] = False
+
+        return new_en_passant, undo
+
+    def unmake_move_in_place(
+        board_state: np.ndarray,
+        board_debuffs: 'BoardDebuffs',
+        castling_privileges: list,
+        undo
+    ):
+        """
+        this function reverts a move played by `make_move_in_place` and returns
+        the en passant index from before the move
+        """
+        for tile_index, tile_debuffs in reversed(undo.changed_debuffs):
+            board_debuffs.set_tile(tile_index, tile_debuffs)
+        for tile_index, piece in reversed(undo.changed_tiles):
+            board_state[tile_index] = piece
+        castling_privileges[:] = undo.castling_privileges
+        return undo.en_passant
+
     def filter_out_illegal_moves(
         board_state: np.ndarray, 
-        board_debuffs: np.ndarray,
+        board_debuffs: 'BoardDebuffs',
         piece_index: int, 
         side_to_move: int, 
         en_passant: int,
@@ -243,7 +374,11 @@ class _Settings:
                 en_passant,
                 castling_privileges
             )
-            king_index = np.where(new_board_state * side_to_move == 1)[0][0]
+            king_indices = np.where(new_board_state * side_to_move == 1)[0]
+            opponent_piece_indices = np.where(new_board_state * side_to_move < 0)[0]
+            if king_indices.size == 0 or opponent_piece_indices.size == 0:
+                continue
+            king_index = king_indices[0]
             opponent_checked_indices = np.hstack([
                 _Settings.calculate_piece_move_indices(
                     new_board_state,
@@ -254,7 +389,7 @@ class _Settings:
                     new_castling_privileges,
                     True
                 )
-                for opponent_piece_index in np.where(new_board_state * side_to_move < 0)[0]
+                for opponent_piece_index in opponent_piece_indices
             ])
             mask[i] = king_index not in opponent_checked_indices
         
@@ -262,7 +397,7 @@ class _Settings:
 
     def make_move_on_board_spell(
         board_state: np.ndarray,
-        board_debuffs: np.ndarray,
+        board_debuffs: 'BoardDebuffs',
         piece_index: int,
         new_piece_index: int,
         castling_privileges: list
@@ -280,11 +415,12 @@ class _Settings:
 
     def displace_spell_effect(
         board_state: np.ndarray,
-        board_debuffs: np.ndarray,
+        board_debuffs: 'BoardDebuffs',
         side_to_move: int,
         castling_privileges: list,
         target_index: int, 
-        displace_type: str
+        displace_type: str,
+        chooser: RandomChooser
     ):
         if 'forward' in displace_type:
             displace_strength = int(displace_type[-1])
@@ -296,11 +432,12 @@ class _Settings:
                     board_state[new_piece_index] != 0
                 ):
                     return board_state, board_debuffs, castling_privileges, new_piece_index
+            new_index = target_index - side_to_move * 8 * displace_strength
             new_board_state, new_board_debuffs, new_castling_privileges = _Settings.make_move_on_board_spell(
                 board_state,
                 board_debuffs,
                 target_index,
-                target_index - side_to_move * 8 * displace_strength,
+                new_index,
                 castling_privileges
             )
         elif 'backward' in displace_type:
@@ -323,15 +460,14 @@ class _Settings:
             )
         elif 'random' in displace_type:
             displace_strength = int(displace_type[-1])
-            moves = _Settings.calculate_n_steps_away(target_index, displace_strength)
-            for move in moves:
-                if board_state[move] != 0:
-                    moves.remove(move)
-            moves = list(moves)
+            moves = [
+                move for move in _Settings.calculate_n_steps_away(target_index, displace_strength)
+                if board_state[move] == 0
+            ]
             if len(moves) == 0:
                 new_index = target_index
             else:
-                new_index = np.random.choice(moves)
+                new_index = chooser.choice(moves)
             new_board_state, new_board_debuffs, new_castling_privileges = _Settings.make_move_on_board_spell(
                 board_state,
                 board_debuffs,
@@ -351,90 +487,154 @@ class _Settings:
         
         return new_board_state, new_board_debuffs, new_castling_privileges, new_index
     
-    def calculate_n_steps_away(target_index: int, n_steps: int) -> set[int]:
-        moves = set([target_index])
-        if n_steps == 0:
-            return moves
-        x, y = target_index % 8, target_index // 8
-        possible_moves = [[-1,0],[1,0],[0,-1],[0,1]]
-        moves = set()
-        for possible_move in possible_moves:
-            new_x = x + possible_move[0]
-            new_y = y + possible_move[1]
-            if 0 > new_x or new_x >= 8 or 0 > new_y or new_x >= 8:
-                continue
-            new_tile_index = new_x + new_y * 8
-            moves = moves.union(_Settings.calculate_n_steps_away(new_tile_index, n_steps-1))
-        return moves
-        
-        
-class TileDebuffs:
+    # corner to corner is 14 steps, past that only the parity of the steps matters
+    N_STEPS_AWAY = _build_n_steps_away_table(15)
+
+    def calculate_n_steps_away(target_index: int, n_steps: int) -> tuple[int]:
+        if n_steps > 15:
+            n_steps = 14 + n_steps % 2
+        return _Settings.N_STEPS_AWAY[n_steps][target_index]
+
+
+class MoveUndo:
+    """
+    a record of everything a move changed: the captured piece, the en passant index
+    and castling privileges from before the move, and the tiles and tile debuffs that
+    were overwritten. this is used to revert a move that was played in place
+    """
+    def __init__(self, captured_piece: int, captured_index: int, en_passant: int, castling_privileges: list):
+        self.captured_piece = captured_piece
+        self.captured_index = captured_index
+        self.en_passant = en_passant
+        self.castling_privileges = tuple(castling_privileges)
+        self.changed_tiles = []
+        self.changed_debuffs = []
+        self.zobrist_hash = 0
+
+
+class BoardDebuffs:
+    """
+    the debuffs on every tile of the board, stored as arrays. each tile has a bitmask
+    of the kinds of debuff on it, and each kind has the round it expires on for every
+    tile (-1 lasts for the rest of the game). debuffs travel with pieces. expiries are
+    kept in a heap so that ending a round only touches the debuffs that run out
+    """
     def __init__(self):
-        self.debuffs = []
-    
+        self.kinds = np.zeros(64, np.uint16)
+        self.expiries = np.zeros((len(_Settings.DEBUFF_KINDS), 64), np.int32)
+        self.round = 0
+        self.schedule = []
+        self.scheduled = set()
+
     def copy(self):
-        new_debuffs = TileDebuffs()
-        new_debuffs.debuffs = self.debuffs.copy()
+        new_debuffs = BoardDebuffs.__new__(BoardDebuffs)
+        new_debuffs.kinds = self.kinds.copy()
+        new_debuffs.expiries = self.expiries.copy()
+        new_debuffs.round = self.round
+        new_debuffs.schedule = self.schedule.copy()
+        new_debuffs.scheduled = self.scheduled.copy()
         return new_debuffs
 
-    def update_debuffs(self, debuff: str, debuff_length: int):
-        if debuff_length < 0:
-            self.debuffs.append(dict(debuffs_name=debuff, debuff_length=-1))
-        else:
-            self.debuffs.append(dict(debuff_name=debuff, debuff_length=debuff_length+1))
-    
-    def _get_tile_debuffs(self):
-        return [debuff['debuff_name'] for debuff in self.debuffs]
+    def _schedule(self, expiry: int, kind_index: int):
+        if expiry >= 0 and (expiry, kind_index) not in self.scheduled:
+            self.scheduled.add((expiry, kind_index))
+            heapq.heappush(self.schedule, (expiry, kind_index))
+
+    def update_debuffs(self, tile_index: int, debuff: str, debuff_length: int):
+        kind_index = _Settings.DEBUFF_INDICES[_Settings.debuff_kind(debuff)]
+        expiry = -1 if debuff_length < 0 else self.round + debuff_length + 1
+
+        # stacking a debuff keeps the longest of the two
+        if self.kinds[tile_index] >> kind_index & 1:
+            old_expiry = int(self.expiries[kind_index, tile_index])
+            expiry = -1 if min(old_expiry, expiry) < 0 else max(old_expiry, expiry)
+        self.kinds[tile_index] |= 1 << kind_index
+        self.expiries[kind_index, tile_index] = expiry
+        self._schedule(expiry, kind_index)
+
+    def tile_has_debuff(self, tile_index: int, debuff: str) -> bool:
+        return bool(self.kinds[tile_index] & _Settings.DEBUFF_BITS[debuff])
+
+    def debuff_mask(self, debuff: str) -> np.ndarray:
+        return (self.kinds & _Settings.DEBUFF_BITS[debuff]) != 0
+
+    def has_debuffs(self) -> bool:
+        return bool(self.kinds.any())
+
+    def tiles_with_debuffs(self) -> np.ndarray:
+        return np.flatnonzero(self.kinds)
+
+    def get_tile(self, tile_index: int) -> tuple:
+        """
+        the kinds of debuff on a tile and the number of rounds each one has left
+        """
+        expiries = self.expiries[:, tile_index]
+        lengths = np.where(expiries > 0, expiries - self.round, expiries)
+        return int(self.kinds[tile_index]), tuple(lengths.tolist())
+
+    def set_tile(self, tile_index: int, tile_debuffs: tuple):
+        kinds, lengths = tile_debuffs
+        lengths = np.array(lengths)
+        self.kinds[tile_index] = kinds
+        self.expiries[:, tile_index] = np.where(lengths > 0, lengths + self.round, lengths)
+        for kind_index in np.flatnonzero(lengths > 0):
+            self._schedule(int(lengths[kind_index]) + self.round, int(kind_index))
 
-    def tile_has_debuff(self, debuff: str):
-        return debuff in self._get_tile_debuffs()
+    def move_tile(self, tile_index: int, new_tile_index: int):
+        self.kinds[new_tile_index] = self.kinds[tile_index]
+        self.expiries[:, new_tile_index] = self.expiries[:, tile_index]
+        self.clear_tile(tile_index)
 
-    def resolve_debuffs(self, board_state: np.ndarray, tile_index: int):
+    def clear_tile(self, tile_index: int):
+        self.kinds[tile_index] = 0
+        self.expiries[:, tile_index] = 0
+
+    def resolve_debuffs(self, board_state: np.ndarray, chooser: RandomChooser) -> list[int]:
         destroy_tiles = []
-        for debuff in self.debuffs:
-            if 'death' in debuff['debuff_name']:
+        triggered = _Settings.DEBUFF_BITS['death'] | _Settings.DEBUFF_BITS['dangerous1'] | _Settings.DEBUFF_BITS['dangerous2']
+        for tile_index in np.flatnonzero(self.kinds & triggered):
+            if self.tile_has_debuff(tile_index, 'death'):
                 destroy_tiles.append(tile_index)
-            elif 'dangerous' in debuff['debuff_name']:
-                debuff_strength = int(debuff['debuff_name'][-1])
-                possible_tiles_to_destroy = _Settings.calculate_n_steps_away(tile_index, debuff_strength)
-                possible_tiles_to_destroy.remove(tile_index)
-                for possible_tile_to_destroy in possible_tiles_to_destroy:
-                    if board_state[possible_tile_to_destroy] == 0:
-                        possible_tiles_to_destroy.remove(possible_tile_to_destroy)
-                possible_tiles_to_destroy = list(possible_tiles_to_destroy)
+            for debuff_strength in [1, 2]:
+                if not self.tile_has_debuff(tile_index, f'dangerous{debuff_strength}'):
+                    continue
+                possible_tiles_to_destroy = [
+                    possible_tile_to_destroy
+                    for possible_tile_to_destroy in _Settings.calculate_n_steps_away(tile_index, debuff_strength)
+                    if possible_tile_to_destroy != tile_index and board_state[possible_tile_to_destroy] != 0
+                ]
                 if len(possible_tiles_to_destroy) > 0:
-                    destroy_tiles.append(np.random.choice(possible_tiles_to_destroy))
+                    destroy_tiles.append(chooser.choice(possible_tiles_to_destroy))
         return destroy_tiles
 
-    def clear_debuffs(self):
-        self.debuffs = []
-
-    def copy_from(self, debuff):
-        self.debuffs = debuff.debuffs
-
     def end_round(self):
-        for i, debuff in enumerate(self.debuffs):
-            if debuff['debuff_length'] > 0:
-                self.debuffs[i] = dict(
-                    debuff_name=debuff['debuff_name'],
-                    debuff_length=debuff['debuff_length']-1
-                )
-        
-        self.debuffs = [debuff for debuff in self.debuffs if debuff['debuff_length'] == 0]
+        self.round += 1
+        while self.schedule and self.schedule[0][0] <= self.round:
+            expiry, kind_index = heapq.heappop(self.schedule)
+            self.scheduled.discard((expiry, kind_index))
+            expired = self.expiries[kind_index] == expiry
+            self.kinds[expired] &= ~np.uint16(1 << kind_index)
+            self.expiries[kind_index, expired] = 0
 
 
 class BoardManager:
     def __init__(self):
+        # bitboards, attacked tiles and legal moves, rebuilt whenever the board changes
+        self._position = None
+        self._attack_map = None
+        self._legal_move_table = None
+
+        # debuffs
+        self.board_debuffs = BoardDebuffs()
+
         # board state
         self.board_state = []
         self.prev_board_state = []
         self.castling_privileges = []
         self.side_to_move = 1
         self.en_passant = -1
+        self.zobrist_hash = 0
         self._init_from_string()
-
-        # debuffs
-        self.board_debuffs = np.full(64, TileDebuffs(), object)
     
         # player inputs
         self.picked_piece_index = -1
@@ -442,6 +642,7 @@ class BoardManager:
         self.can_pickup_indices = []
         self.piece_move_indices = []
         self._calculate_can_pickup_indices()
+        self._calculate_legal_move_table()
 
         # card draws
         self.chain_data = {
@@ -449,6 +650,36 @@ class BoardManager:
             -1: []
         }
 
+        # random spell and debuff effects
+        self.chooser = RandomChooser()
+
+    def copy(self):
+        """
+        this function will copy the board manager so that turns can be played out
+        on the copy. the copy gets bitboards of its own, as working out legal moves
+        plays moves on them and copies can be played on from other threads, see
+        `speculation`. the legal move table is shared, as it is replaced rather than
+        changed when the board changes
+        """
+        new_board_manager = BoardManager.__new__(BoardManager)
+        new_board_manager._position = None if self._position is None else self._position.copy()
+        new_board_manager._attack_map = None
+        new_board_manager._legal_move_table = self._legal_move_table
+        new_board_manager.board_debuffs = self.board_debuffs.copy()
+        new_board_manager.board_state = self.board_state.copy()
+        new_board_manager.prev_board_state = self.prev_board_state.copy()
+        new_board_manager.castling_privileges = self.castling_privileges.copy()
+        new_board_manager.side_to_move = self.side_to_move
+        new_board_manager.en_passant = self.en_passant
+        new_board_manager.zobrist_hash = self.zobrist_hash
+        new_board_manager.picked_piece_index = self.picked_piece_index
+        new_board_manager.picked_piece_params = self.picked_piece_params.copy()
+        new_board_manager.can_pickup_indices = self.can_pickup_indices
+        new_board_manager.piece_move_indices = self.piece_move_indices
+        new_board_manager.chain_data = {side: chain.copy() for side, chain in self.chain_data.items()}
+        new_board_manager.chooser = self.chooser
+        return new_board_manager
+
     def _init_from_string(self, position: str = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR 1 1111 -1'):
         """
         this function will initialize the board state given a custom string.
@@ -483,39 +714,111 @@ class BoardManager:
 
         self.side_to_move = int(side_to_move)
 
-        self.castling_privileges = [bool(c) for c in castling_privileges]
+        self.castling_privileges = [c == '1' for c in castling_privileges]
 
-        self.en_passant = en_passant
+        self.en_passant = int(en_passant)
+
+        self._invalidate_position()
+        self.zobrist_hash = hash_position(
+            self.board_state,
+            self.board_debuffs,
+            self.side_to_move,
+            self.castling_privileges,
+            self.en_passant
+        )
+
+    def _hash_tiles(self, tile_indices) -> int:
+        key = 0
+        for tile_index in tile_indices:
+            key ^= tile_key(self.board_state[tile_index], self.board_debuffs.get_tile(tile_index), tile_index)
+        return key
+
+    def get_verdict(self, directory: str = None):
+        """
+        this function will look the position up in the endgame tablebases, see
+        `tablebase.board_verdict`. positions with debuffs, castling privileges or
+        en passant are not in the tablebases, and give None
+        """
+        from .tablebase import board_verdict, _Settings as _TablebaseSettings
+
+        if self.board_debuffs.has_debuffs() or any(self.castling_privileges) or self.en_passant != -1:
+            return None
+        return board_verdict(self.board_state, self.side_to_move, directory or _TablebaseSettings.DIRECTORY)
+
+    def position_key(self) -> bytes:
+        """
+        everything the legal moves depend on, to confirm a position found by its
+        zobrist hash is the same one
+        """
+        return b''.join([
+            self.board_state.astype(np.int8).tobytes(),
+            self.board_debuffs.kinds.tobytes(),
+            np.array([self.side_to_move, self.en_passant, *self.castling_privileges], np.int8).tobytes(),
+        ])
+
+    def _invalidate_position(self):
+        """
+        this function is called whenever the board state or tile debuffs change.
+        the bitboards and attack map will be rebuilt the next time they are needed
+        """
+        self._position = None
+        self._attack_map = None
+        self._legal_move_table = None
+
+    def get_position(self) -> BitboardPosition:
+        if self._position is None:
+            self._position = BitboardPosition(self.board_state, self.board_debuffs)
+        return self._position
+
+    def get_attack_map(self) -> AttackMap:
+        if self._attack_map is None:
+            self._attack_map = AttackMap(self.get_position())
+        return self._attack_map
 
     def _calculate_piece_move_indices(self):
         """
         this function is called whenever a player initates a play.
-        this function will calculate all of the possible indices the player
+        this function will look up all of the possible indices the player
         can move the piece they have picked up
         """
         if self.picked_piece_index == -1:
             return
-        self.piece_move_indices = _Settings.calculate_piece_move_indices(
-            self.board_state,
-            self.board_debuffs,
-            self.picked_piece_index,
-            self.side_to_move,
-            self.en_passant,
-            self.castling_privileges,
-            False
-        )
-        self.piece_move_indices = _Settings.filter_out_illegal_moves(
-            self.board_state,
-            self.board_debuffs,
+        self.piece_move_indices = self.get_legal_move_table().get(
             self.picked_piece_index,
-            self.side_to_move,
-            self.en_passant,
-            self.castling_privileges,
-            self.piece_move_indices
+            np.array([], np.int64)
         )
 
-        if self.board_debuffs[self.picked_piece_index].tile_has_debuff('shrink'):
-            self.piece_move_indices = self.piece_move_indices[self.board_state[self.piece_move_indices] != 0]
+    def _calculate_legal_move_table(self):
+        """
+        this function is called at the start of a player turn.
+        this function will calculate the legal moves of every piece the
+        player can pickup, so that picking up a piece and validating a play
+        are lookups
+        """
+        position = self.get_position()
+        attack_map = self.get_attack_map()
+        self._legal_move_table = {
+            int(piece_index): calculate_legal_move_indices(
+                position,
+                attack_map,
+                int(piece_index),
+                self.side_to_move,
+                self.en_passant,
+                self.castling_privileges
+            )
+            for piece_index in self.can_pickup_indices
+        }
+
+    def get_legal_move_table(self) -> dict[int, np.ndarray]:
+        if self._legal_move_table is None:
+            self._calculate_legal_move_table()
+        return self._legal_move_table
+
+    def has_legal_move(self) -> bool:
+        return any(piece_move_indices.size > 0 for piece_move_indices in self.get_legal_move_table().values())
+
+    def in_check(self) -> bool:
+        return self.get_attack_map().in_check(self.side_to_move)
 
     def _calculate_can_pickup_indices(self):
         """
@@ -524,26 +827,37 @@ class BoardManager:
         a piece the player can pickup (and control)
         """
 
-        # get pieces that are the right colour
-        can_pickup_indices = self.board_state * self.side_to_move > 0
-
-        # get tile debuffs
-        control = np.where([debuff.tile_has_debuff('control') for debuff in self.board_debuffs])[0]
-        stationary = np.where([debuff.tile_has_debuff('stationary') for debuff in self.board_debuffs])[0]
-
-        # restrictions
-        can_pickup_indices[control] = True
-        can_pickup_indices[stationary] = False
-
-        self.can_pickup_indices = np.where(can_pickup_indices)[0]
+        self.can_pickup_indices = calculate_can_pickup_indices(
+            self.get_position(),
+            self.side_to_move
+        )
 
     def _validate_move(self):
-        if self.board_debuffs[self.picked_piece_index].tile_has_debuff('displace'):
+        if self.board_debuffs.tile_has_debuff(self.picked_piece_index, 'displace'):
             return False
         
         self._calculate_piece_move_indices()
         return self.picked_piece_params['move_to_index'] in self.piece_move_indices
 
+    def start_turn(self, precomputed_turns: dict = None):
+        """
+        this function is called once the previous turn has fully resolved.
+        this function will calculate the legal moves of the side to move
+        ahead of their first pickup. slow casts and debuffs resolve after
+        the move, so the pieces that can be picked up are found again first.
+        if this position was already worked out ahead of time, see
+        `speculation.TurnSpeculator`, its tables are used instead
+        """
+        precomputed_turn = None if precomputed_turns is None else precomputed_turns.get(self.zobrist_hash)
+        if precomputed_turn is not None and precomputed_turn['position_key'] == self.position_key():
+            self.can_pickup_indices = precomputed_turn['can_pickup_indices']
+            self._legal_move_table = precomputed_turn['legal_move_table']
+            return
+
+        self._calculate_can_pickup_indices()
+        self._legal_move_table = None
+        self.get_legal_move_table()
+
     def pickup_piece(self, board_index: int):
         """
         this funtion is called whenever a player picks up a piece from the board.
@@ -579,6 +893,55 @@ class BoardManager:
         self.picked_piece_params['move_to_index'] = board_index
         self.piece_move_indices = []
         
+    def make_move(self, piece_index: int, new_piece_index: int):
+        """
+        this function plays a move for the side to move directly on the board.
+        the returned undo record can be passed to `unmake_move` to take the
+        move back, so that moves can be tried without copying the board
+        """
+        self.en_passant, undo = _Settings.make_move_in_place(
+            self.board_state,
+            self.board_debuffs,
+            piece_index,
+            new_piece_index,
+            self.side_to_move,
+            self.en_passant,
+            self.castling_privileges
+        )
+
+        # only the tiles the move touched change the hash
+        old_pieces = {}
+        old_debuffs = {}
+        for tile_index, piece in undo.changed_tiles:
+            old_pieces.setdefault(tile_index, piece)
+        for tile_index, debuffs in undo.changed_debuffs:
+            old_debuffs.setdefault(tile_index, debuffs)
+        undo.zobrist_hash = self.zobrist_hash
+        for tile_index, piece in old_pieces.items():
+            self.zobrist_hash ^= tile_key(piece, old_debuffs[tile_index], tile_index)
+        self.zobrist_hash ^= self._hash_tiles(old_pieces)
+        self.zobrist_hash ^= castling_key(undo.castling_privileges) ^ castling_key(self.castling_privileges)
+        self.zobrist_hash ^= en_passant_key(undo.en_passant) ^ en_passant_key(self.en_passant)
+
+        self._invalidate_position()
+        return undo
+
+    def unmake_move(self, undo: MoveUndo):
+        self.en_passant = _Settings.unmake_move_in_place(
+            self.board_state,
+            self.board_debuffs,
+            self.castling_privileges,
+            undo
+        )
+        self.zobrist_hash = undo.zobrist_hash
+        self._invalidate_position()
+
+    def add_debuff(self, tile_index: int, debuff: str, debuff_length: int):
+        self.zobrist_hash ^= self._hash_tiles([tile_index])
+        self.board_debuffs.update_debuffs(tile_index, debuff, debuff_length)
+        self.zobrist_hash ^= self._hash_tiles([tile_index])
+        self._invalidate_position()
+
     def commit_play(self):
         """
         this function is called when the player inputs the end turn command.
@@ -597,15 +960,7 @@ class BoardManager:
         if self._validate_move():
             move_to_index = self.picked_piece_params['move_to_index']
             self.prev_board_state = self.board_state.copy()
-            self.board_state, self.board_debuffs, self.en_passant, self.castling_privileges = _Settings.make_move_on_board(
-                self.board_state,
-                self.board_debuffs,
-                self.picked_piece_index,
-                move_to_index,
-                self.side_to_move,
-                self.en_passant,
-                self.castling_privileges
-            )
+            self.make_move(self.picked_piece_index, move_to_index)
             animation = ['move_piece', self.picked_piece_index, self.picked_piece_params['move_to_index']]
             chain = self.chain_data[self.side_to_move]
             if chain:
@@ -622,6 +977,7 @@ class BoardManager:
                 self.chain_data[self.side_to_move] = [self.picked_piece_index, move_to_index]
 
         self.side_to_move *= -1
+        self.zobrist_hash ^= side_key(1) ^ side_key(-1)
         self.picked_piece_index = -1
         self.picked_piece_params = {}
         self.piece_move_indices = []
@@ -636,34 +992,54 @@ class BoardManager:
             
             target_index = played_card_params['target_index']
             animations.append(['cast_spell', played_card_params['color'], target_index])
-            debuffs = self.board_debuffs[target_index]
             new_debuffs = played_card_params['debuffs']
             debuff_length = played_card_params['debuff_length']
 
             if 'displace' in new_debuffs:
+                old_board_state, old_board_debuffs = self.board_state, self.board_debuffs
+                old_castling_privileges = self.castling_privileges
                 self.board_state, self.board_debuffs, self.castling_privileges, displace_to = _Settings.displace_spell_effect(
                     self.board_state,
                     self.board_debuffs,
                     self.side_to_move,
                     self.castling_privileges,
                     target_index,
-                    new_debuffs.split(' ')[-1]
+                    new_debuffs.split(' ')[-1],
+                    self.chooser
                 )
                 animations.append(['move_piece', target_index, displace_to])
-            debuffs.update_debuffs(new_debuffs, debuff_length)
+
+                # displacing copies the board, so the old tiles are still there to hash out
+                changed_tiles = [i for i in {target_index, displace_to} if 0 <= i < 64]
+                for tile_index in changed_tiles:
+                    self.zobrist_hash ^= tile_key(
+                        old_board_state[tile_index], old_board_debuffs.get_tile(tile_index), tile_index
+                    )
+                self.zobrist_hash ^= self._hash_tiles(changed_tiles)
+                self.zobrist_hash ^= castling_key(old_castling_privileges) ^ castling_key(self.castling_privileges)
+            self.add_debuff(target_index, new_debuffs, debuff_length)
         
         return animations
 
     def resolve_debuffs(self):
-        destroy_tiles = np.hstack([
-            debuff.resolve_debuffs(self.board_state, i) 
-            for i, debuff in enumerate(self.board_debuffs)
-        ]).astype(int)
+        if not self.board_debuffs.has_debuffs():
+            self.board_debuffs.end_round()
+            return None
+
+        destroy_tiles = np.array(self.board_debuffs.resolve_debuffs(self.board_state, self.chooser), int)
+        # only destroyed tiles and tiles that carry debuffs can change
+        changed_tiles = set(destroy_tiles.tolist()) | set(self.board_debuffs.tiles_with_debuffs().tolist())
+        old_tiles_key = self._hash_tiles(changed_tiles)
+
         destroyed_pieces = self.board_state[destroy_tiles]
         self.board_state[destroy_tiles] = 0
-        [debuff.clear_debuffs() for debuff in self.board_debuffs]
+        # debuffs die with the piece they were on
+        for destroy_tile in destroy_tiles[destroyed_pieces != 0]:
+            self.board_debuffs.clear_tile(destroy_tile)
 
-        [debuff.end_round() for debuff in self.board_debuffs]
+        self.board_debuffs.end_round()
+        self.zobrist_hash ^= old_tiles_key ^ self._hash_tiles(changed_tiles)
+        self._invalidate_position()
         if destroy_tiles.size == 0:
             return None
         return [
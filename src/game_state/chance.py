@@ -0,0 +1,49 @@
+import numpy as np
+
+
+class RandomChooser:
+    """
+    makes every random choice in the game. by default this draws from numpy's
+    global random state, or from the given generator
+    """
+    def __init__(self, rng: np.random.Generator = None):
+        self.rng = rng
+
+    def choice(self, options: list):
+        """
+        picks one of the options, each as likely as the others
+        """
+        if self.rng is None:
+            return np.random.choice(options)
+        return self.rng.choice(options)
+
+    def weighted_choice(self, options: list, probabilities: np.ndarray):
+        rand = np.random.rand() if self.rng is None else self.rng.random()
+        cutoffs = np.cumsum(probabilities)
+        return options[np.min(np.where(cutoffs > rand)[0])]
+
+
+class ReplayChooser:
+    """
+    makes the choices given by index in `prefix`, then the first option of every
+    choice after it. every choice is recorded as the index taken and the chance of
+    each option, so that the choices that were not taken can be replayed
+    """
+    def __init__(self, prefix: list[int]):
+        self.prefix = prefix
+        self.choices = []
+
+    def _choose(self, probabilities: np.ndarray) -> int:
+        depth = len(self.choices)
+        index = self.prefix[depth] if depth < len(self.prefix) else 0
+        self.choices.append((index, probabilities))
+        return index
+
+    def choice(self, options: list):
+        return options[self._choose(np.full(len(options), 1 / len(options)))]
+
+    def weighted_choice(self, options: list, probabilities: np.ndarray):
+        return options[self._choose(np.asarray(probabilities))]
+
+    def probability(self) -> float:
+        return float(np.prod([probabilities[index] for index, probabilities in self.choices]))
@@ -6,17 +6,38 @@ class GameInstance:
     def __init__(self):
         self.board_manager = BoardManager()
         self.hand_manager = HandManager()
+        # counts the changes to the game, so that clients can tell when their copy is out of date
+        self.version = 0
+
+    def copy(self):
+        new_game_instance = GameInstance.__new__(GameInstance)
+        new_game_instance.board_manager = self.board_manager.copy()
+        new_game_instance.hand_manager = self.hand_manager.copy()
+        new_game_instance.version = self.version
+        return new_game_instance
+
+    def set_chooser(self, chooser):
+        """
+        this function will make every random effect of the game go through the given
+        chooser, see `chance.RandomChooser`
+        """
+        self.board_manager.chooser = chooser
+        self.hand_manager.chooser = chooser
 
     def hand_event(self, event_data: dict):
+        self.version += 1
         self.hand_manager.pick_card(event_data)
         self.hand_manager.update_picked_card_params(event_data)  
     
     def board_event(self, board_index: int):
+        self.version += 1
         if self.board_manager.pickup_piece(board_index):
             return
         self.board_manager.update_picked_piece_params(board_index)
 
-    def end_turn(self):
+    def end_turn(self, precomputed_turns: dict = None):
+        self.version += 1
+
         # commit cards
         played_cards = self.hand_manager.commit_play()
 
@@ -50,4 +71,5 @@ class GameInstance:
             animations.append(tile_effects)
         
         self.hand_manager.draw_card(chain_length)
+        self.board_manager.start_turn(precomputed_turns)
         return animations
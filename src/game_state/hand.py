@@ -1,9 +1,57 @@
 import numpy as np
 import pandas as pd
 
+from .chance import RandomChooser
+
+
+def _build_card_play_params(card_data: pd.DataFrame) -> dict:
+    return {
+        card_id: {
+            'speed': card['speed'],
+            'debuffs': card['debuffs'],
+            'debuff_length': card['debuff_length'],
+            'color': np.array([card['r'], card['g'], card['b']])
+        }
+        for card_id, card in card_data.to_dict('index').items()
+    }
+
 
 class _Settings:
     CARD_DATA = pd.read_csv('./assets/cards/card_data.csv', index_col=0)
+    # cards are indexed by their order here, e.g. when serialized or counted, so
+    # card data that replaces this has to keep it
+    CARD_IDS = CARD_DATA.index
+
+    # the columns read on every play, looked up once instead of through pandas
+    CARD_PARAM_NAMES = CARD_DATA['param_names'].str.split().to_dict()
+    CARD_PLAY_PARAMS = _build_card_play_params(CARD_DATA)
+
+    # the cards which can be drawn at each level, filled in as levels are drawn at
+    DRAWS = {}
+
+    def get_draws(level: int):
+        if level not in _Settings.DRAWS:
+            can_draw = _Settings.CARD_DATA['rarity'] <= level
+            weights = _Settings.CARD_DATA.loc[can_draw, 'rarity'].to_numpy()
+            possible_draws = _Settings.CARD_DATA.index[can_draw].to_numpy()
+            probabilities = weights / np.sum(weights) if possible_draws.size > 0 else weights
+            _Settings.DRAWS[level] = possible_draws, probabilities
+        return _Settings.DRAWS[level]
+
+    def check_card_ids(card_data: pd.DataFrame):
+        if not card_data.index.equals(_Settings.CARD_IDS):
+            raise ValueError('card data has to have the cards of card_data.csv, in the same order')
+
+    def set_card_data(card_data: pd.DataFrame):
+        """
+        this function will replace the cards in play, e.g. to try out different
+        rarities or debuffs. the cards have to keep the same ids, in the same order
+        """
+        _Settings.check_card_ids(card_data)
+        _Settings.CARD_DATA = card_data
+        _Settings.CARD_PARAM_NAMES = card_data['param_names'].str.split().to_dict()
+        _Settings.CARD_PLAY_PARAMS = _build_card_play_params(card_data)
+        _Settings.DRAWS = {}
 
 
 class _Hand:
@@ -13,6 +61,14 @@ class _Hand:
         self.picked_card_index = -1
         self.picked_card_params = {}
     
+    def copy(self):
+        new_hand = _Hand.__new__(_Hand)
+        new_hand.cards = self.cards.copy()
+        new_hand.played_cards = self.played_cards.copy()
+        new_hand.picked_card_index = self.picked_card_index
+        new_hand.picked_card_params = self.picked_card_params.copy()
+        return new_hand
+
     def new_card(self, card_id: str):
         self.cards = np.hstack([self.cards, card_id])
 
@@ -44,7 +100,7 @@ class _Hand:
             return
         
         card_id = self.cards[self.picked_card_index]
-        param_names = _Settings.CARD_DATA.loc[card_id, 'param_names'].split()
+        param_names = _Settings.CARD_PARAM_NAMES[card_id]
 
         for param_name in param_names:
             if param_name in self.picked_card_params:
@@ -67,10 +123,8 @@ class _Hand:
         played_cards = {
             played_card_id: {
                 **played_card_params,
-                'speed': _Settings.CARD_DATA.loc[played_card_id, 'speed'],
-                'debuffs': _Settings.CARD_DATA.loc[played_card_id, 'debuffs'],
-                'debuff_length': _Settings.CARD_DATA.loc[played_card_id, 'debuff_length'],
-                'color': _Settings.CARD_DATA.loc[played_card_id, ['r', 'g', 'b']].to_numpy()
+                **_Settings.CARD_PLAY_PARAMS[played_card_id],
+                'color': _Settings.CARD_PLAY_PARAMS[played_card_id]['color'].copy()
             }
             for played_card_id, played_card_params in played_cards.items()
         }
@@ -96,16 +150,21 @@ class HandManager:
             -1: _Hand()
         }
         self.side_to_play = 1
+        self.chooser = RandomChooser()
+
+    def copy(self):
+        new_hand_manager = HandManager.__new__(HandManager)
+        new_hand_manager.hands = {side: hand.copy() for side, hand in self.hands.items()}
+        new_hand_manager.side_to_play = self.side_to_play
+        new_hand_manager.chooser = self.chooser
+        return new_hand_manager
     
     def draw_card(self, level: int):
-        weights = _Settings.CARD_DATA.loc[_Settings.CARD_DATA['rarity'] <= level, 'rarity'].to_numpy()
-        possible_draws = _Settings.CARD_DATA.index[_Settings.CARD_DATA['rarity'] <= level].to_numpy()
+        possible_draws, probabilities = _Settings.get_draws(level)
 
         if possible_draws.size > 0:
-            cutoffs = np.cumsum(weights / np.sum(weights))
-            rand = np.random.rand()
-            index = np.min(np.where(cutoffs > rand)[0])
-            self.hands[-self.side_to_play].new_card(possible_draws[index])
+            card_id = self.chooser.weighted_choice(possible_draws, probabilities)
+            self.hands[-self.side_to_play].new_card(card_id)
 
     def pick_card(self, event_data: dict):
         if event_data['side'] != self.side_to_play:
@@ -0,0 +1,77 @@
+import numpy as np
+
+from .game_instance import GameInstance
+from .chance import RandomChooser, ReplayChooser
+from .serialize import serialize_game
+
+
+class _Settings:
+    MAX_OUTCOMES = 256
+    N_SAMPLES = 256
+
+
+def _add_outcome(outcomes: dict, game_instance: GameInstance, animations: list, probability: float):
+    # different choices can end in the same game, e.g. two dangerous tiles destroying the same piece
+    key = serialize_game(game_instance)
+    if key in outcomes:
+        outcomes[key]['probability'] += probability
+    else:
+        outcomes[key] = dict(game_instance=game_instance, animations=animations, probability=probability)
+
+
+def turn_outcomes(
+    game_instance: GameInstance,
+    max_outcomes: int = _Settings.MAX_OUTCOMES,
+    n_samples: int = _Settings.N_SAMPLES,
+    seed: int = None
+) -> dict:
+    """
+    this function will end the turn that has been input on `game_instance`, on copies
+    of it, for every way the random effects of the turn can go: random displaces,
+    dangerous debuffs and card draws. it returns every resulting game with its
+    animations and the probability of it. if there are more than `max_outcomes`
+    ways the turn can go, the outcomes are instead estimated from `n_samples`
+    random turns, and `exact` is False. `game_instance` and the global random state
+    are left untouched
+    """
+    outcomes = {}
+    exact = True
+
+    # every run replays a choice of options taken, then takes the first option
+    # of every choice after it. the options not taken are queued to be replayed
+    prefixes = [[]]
+    n_runs = 0
+    while prefixes:
+        if n_runs + len(prefixes) > max_outcomes:
+            exact = False
+            break
+        prefix = prefixes.pop()
+        chooser = ReplayChooser(prefix)
+        child = game_instance.copy()
+        child.set_chooser(chooser)
+        animations = child.end_turn()
+        child.set_chooser(RandomChooser())
+        n_runs += 1
+
+        taken = [index for index, _ in chooser.choices]
+        for depth in range(len(prefix), len(chooser.choices)):
+            _, probabilities = chooser.choices[depth]
+            for index in range(1, len(probabilities)):
+                if probabilities[index] > 0:
+                    prefixes.append(taken[:depth] + [index])
+        _add_outcome(outcomes, child, animations, chooser.probability())
+
+    if not exact:
+        outcomes = {}
+        rng = np.random.default_rng(seed)
+        for _ in range(n_samples):
+            child = game_instance.copy()
+            child.set_chooser(RandomChooser(rng))
+            animations = child.end_turn()
+            child.set_chooser(RandomChooser())
+            _add_outcome(outcomes, child, animations, 1 / n_samples)
+
+    return dict(
+        outcomes=sorted(outcomes.values(), key=lambda outcome: -outcome['probability']),
+        exact=exact
+    )
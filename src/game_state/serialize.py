@@ -0,0 +1,123 @@
+import struct
+
+import numpy as np
+
+from .board import BoardManager, BoardDebuffs, _Settings as _BoardSettings
+from .hand import HandManager, _Hand, _Settings as _HandSettings
+from .game_instance import GameInstance
+from .zobrist import hash_position
+from .chance import RandomChooser
+
+
+class _Settings:
+    # side to move, en passant, castling privileges as bits, side to play, tiles with debuffs
+    HEADER = struct.Struct('<bbBbB')
+    CARD_IDS = list(_HandSettings.CARD_DATA.index)
+    CARD_INDICES = {card_id: i for i, card_id in enumerate(CARD_IDS)}
+    N_DEBUFF_KINDS = len(_BoardSettings.DEBUFF_KINDS)
+
+
+def _write_list(values, dtype) -> bytes:
+    return struct.pack('<B', len(values)) + np.asarray(values, dtype).tobytes()
+
+
+def _read_list(data: memoryview, offset: int, dtype):
+    count = data[offset]
+    dtype = np.dtype(dtype)
+    values = np.frombuffer(data, dtype, count, offset + 1)
+    return values, offset + 1 + count * dtype.itemsize
+
+
+def serialize_game(game_instance: GameInstance) -> bytes:
+    """
+    this function will pack a game between turns into the board, the debuffs with
+    the rounds they have left, both hands and the chains used for card draws: 77
+    bytes for the start position, and 29 more for every tile with debuffs. the
+    board before the last move (`prev_board_state`) and the piece and card a
+    player is in the middle of picking are not kept, so a game read back starts
+    its turn from nothing picked, with the previous board the same as the board
+    """
+    board_manager = game_instance.board_manager
+    hand_manager = game_instance.hand_manager
+    board_debuffs = board_manager.board_debuffs
+
+    debuff_tiles = board_debuffs.tiles_with_debuffs()
+    castling_bits = sum(int(bool(privilege)) << i for i, privilege in enumerate(board_manager.castling_privileges))
+    data = [
+        _Settings.HEADER.pack(
+            board_manager.side_to_move,
+            board_manager.en_passant,
+            castling_bits,
+            hand_manager.side_to_play,
+            debuff_tiles.size
+        ),
+        board_manager.board_state.astype(np.int8).tobytes(),
+        debuff_tiles.astype(np.uint8).tobytes(),
+    ]
+    for tile_index in debuff_tiles:
+        kinds, lengths = board_debuffs.get_tile(tile_index)
+        data.append(struct.pack('<H', kinds))
+        data.append(np.array(lengths, np.int16).tobytes())
+    for side in [1, -1]:
+        data.append(_write_list([_Settings.CARD_INDICES[card_id] for card_id in hand_manager.hands[side].cards], np.uint8))
+        data.append(_write_list(board_manager.chain_data[side], np.int8))
+    return b''.join(data)
+
+
+def deserialize_game(data: bytes) -> GameInstance:
+    data = memoryview(data)
+    side_to_move, en_passant, castling_bits, side_to_play, n_debuff_tiles = _Settings.HEADER.unpack_from(data, 0)
+    offset = _Settings.HEADER.size
+
+    board_state = np.frombuffer(data, np.int8, 64, offset).astype(np.int32)
+    offset += 64
+    debuff_tiles = np.frombuffer(data, np.uint8, n_debuff_tiles, offset)
+    offset += n_debuff_tiles
+
+    board_debuffs = BoardDebuffs()
+    for tile_index in debuff_tiles:
+        kinds, = struct.unpack_from('<H', data, offset)
+        lengths = np.frombuffer(data, np.int16, _Settings.N_DEBUFF_KINDS, offset + 2)
+        offset += 2 + lengths.nbytes
+        board_debuffs.set_tile(int(tile_index), (kinds, tuple(lengths.tolist())))
+
+    hand_manager = HandManager.__new__(HandManager)
+    hand_manager.side_to_play = side_to_play
+    hand_manager.chooser = RandomChooser()
+    hand_manager.hands = {}
+    chain_data = {}
+    for side in [1, -1]:
+        card_indices, offset = _read_list(data, offset, np.uint8)
+        chain, offset = _read_list(data, offset, np.int8)
+        hand = _Hand()
+        hand.cards = np.array([_Settings.CARD_IDS[card_index] for card_index in card_indices], object)
+        hand_manager.hands[side] = hand
+        chain_data[side] = [int(tile_index) for tile_index in chain]
+
+    board_manager = BoardManager.__new__(BoardManager)
+    board_manager._invalidate_position()
+    board_manager.board_debuffs = board_debuffs
+    board_manager.board_state = board_state
+    board_manager.prev_board_state = board_state.copy()
+    board_manager.castling_privileges = [bool(castling_bits >> i & 1) for i in range(4)]
+    board_manager.side_to_move = side_to_move
+    board_manager.en_passant = en_passant
+    board_manager.zobrist_hash = hash_position(
+        board_state,
+        board_debuffs,
+        side_to_move,
+        board_manager.castling_privileges,
+        en_passant
+    )
+    board_manager.picked_piece_index = -1
+    board_manager.picked_piece_params = {}
+    board_manager.piece_move_indices = []
+    board_manager.chain_data = chain_data
+    board_manager.chooser = hand_manager.chooser
+    board_manager._calculate_can_pickup_indices()
+
+    game_instance = GameInstance.__new__(GameInstance)
+    game_instance.board_manager = board_manager
+    game_instance.hand_manager = hand_manager
+    game_instance.version = 0
+    return game_instance
@@ -0,0 +1,119 @@
+import threading
+
+import numpy as np
+
+from .game_instance import GameInstance
+from .chance import RandomChooser
+
+
+class _Settings:
+    MEMORY_CAP = 16 << 20
+
+    # a rough size in bytes of the dicts, keys and array headers of a stored turn,
+    # on top of the data in its arrays
+    TURN_OVERHEAD = 2048
+    ARRAY_OVERHEAD = 112
+
+
+def _turn_size(precomputed_turn: dict) -> int:
+    legal_move_table = precomputed_turn['legal_move_table']
+    return (
+        _Settings.TURN_OVERHEAD +
+        len(precomputed_turn['position_key']) +
+        precomputed_turn['can_pickup_indices'].nbytes +
+        sum(_Settings.ARRAY_OVERHEAD + move_indices.nbytes for move_indices in legal_move_table.values())
+    )
+
+
+def precompute_turn(game_instance: GameInstance, piece_index: int, new_piece_index: int) -> tuple:
+    """
+    this function will play a move with no spells on a copy of the game and
+    return the zobrist hash of the position it leads to, with the tables the next
+    player's turn starts from. random effects are drawn from a random state of
+    their own, so the game's random state is left untouched
+    """
+    child = game_instance.copy()
+    child.set_chooser(RandomChooser(np.random.default_rng()))
+    child.board_event(piece_index)
+    child.board_event(new_piece_index)
+    child.end_turn()
+
+    board_manager = child.board_manager
+    return board_manager.zobrist_hash, dict(
+        position_key=board_manager.position_key(),
+        can_pickup_indices=board_manager.can_pickup_indices,
+        legal_move_table=board_manager.get_legal_move_table(),
+    )
+
+
+class TurnSpeculator:
+    """
+    works out, in a background thread, the positions every move of the side to
+    move leads to, and the pickups and legal moves of the player after them, while
+    the side to move is still thinking. the results are passed to
+    `GameInstance.end_turn` so the next turn starts without calculating them.
+    captures are worked out first, and work stops once the results would take up
+    more than `memory_cap` bytes
+    """
+    def __init__(self, memory_cap: int = _Settings.MEMORY_CAP):
+        self.memory_cap = memory_cap
+        self.precomputed_turns = {}
+        self.memory_used = 0
+        self._cancelled = threading.Event()
+        self._thread = None
+
+    def start(self, game_instance: GameInstance):
+        """
+        this function is called at the start of a turn, before the player inputs
+        anything. the game is copied, so it can be played on while the work runs
+        """
+        self.cancel()
+        self.precomputed_turns = {}
+        self.memory_used = 0
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(game_instance.copy(), self._cancelled),
+            daemon=True
+        )
+        self._thread.start()
+
+    def cancel(self):
+        """
+        stops the work, waiting for the move being worked on to finish
+        """
+        self._cancelled.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def take(self) -> dict:
+        """
+        this function is called when the turn ends. the work is cancelled, and
+        what has been worked out so far is handed over
+        """
+        self.cancel()
+        precomputed_turns = self.precomputed_turns
+        self.precomputed_turns = {}
+        self.memory_used = 0
+        return precomputed_turns
+
+    def _moves(self, game_instance: GameInstance) -> list[tuple]:
+        board_state = game_instance.board_manager.board_state
+        moves = [
+            (piece_index, int(new_piece_index))
+            for piece_index, piece_move_indices in game_instance.board_manager.get_legal_move_table().items()
+            for new_piece_index in piece_move_indices
+        ]
+        return sorted(moves, key=lambda move: board_state[move[1]] == 0)
+
+    def _run(self, game_instance: GameInstance, cancelled: threading.Event):
+        for piece_index, new_piece_index in self._moves(game_instance):
+            if cancelled.is_set():
+                return
+            zobrist_hash, precomputed_turn = precompute_turn(game_instance, piece_index, new_piece_index)
+            turn_size = _turn_size(precomputed_turn)
+            if self.memory_used + turn_size > self.memory_cap:
+                return
+            self.precomputed_turns[zobrist_hash] = precomputed_turn
+            self.memory_used += turn_size
@@ -0,0 +1,153 @@
+import os
+import struct
+
+import numpy as np
+
+from .board import _Settings as _BoardSettings
+
+
+class _Settings:
+    DIRECTORY = './assets/tablebases'
+    EXTENSION = '.wctb'
+
+    # magic, version, number of pieces, then up to 8 piece codes from `PIECE_MAP`
+    # signed by side, padded to 16 bytes. the win/draw/loss table (int8) follows,
+    # then the distance to mate table (uint16)
+    HEADER = struct.Struct('<4sBB8b2x')
+    MAGIC = b'WCTB'
+    VERSION = 1
+    MAX_PIECES = 8
+
+    # results from the side to move's point of view. positions that cannot come up
+    # (two pieces on one tile, or the side that just moved left in check) are invalid
+    WIN, DRAW, LOSS, INVALID = 1, 0, -1, -2
+    RESULT_NAMES = {WIN: 'win', DRAW: 'draw', LOSS: 'loss'}
+
+    PIECE_LETTERS = {piece: letter for letter, piece in _BoardSettings.PIECE_MAP.items()}
+
+    # tablebases opened so far, by path. they are memory mapped, so processes
+    # reading the same file share its pages
+    OPEN_TABLEBASES = {}
+
+
+def canonical_pieces(pieces) -> tuple:
+    """
+    the order pieces are indexed in: white then black, each from king to pawn as
+    in `PIECE_MAP`
+    """
+    return tuple(sorted(pieces, key=lambda piece: (piece < 0, abs(piece))))
+
+
+def signature_name(pieces) -> str:
+    """
+    the name of the tablebase for a set of pieces, e.g. `KQvK`
+    """
+    pieces = canonical_pieces(pieces)
+    return 'v'.join(
+        ''.join(_Settings.PIECE_LETTERS[abs(piece)].upper() for piece in pieces if piece * side > 0)
+        for side in [1, -1]
+    )
+
+
+def parse_signature(name: str) -> tuple:
+    white, black = name.split('v')
+    return canonical_pieces(
+        [_BoardSettings.PIECE_MAP[letter.lower()] for letter in white] +
+        [-_BoardSettings.PIECE_MAP[letter.lower()] for letter in black]
+    )
+
+
+def table_size(n_pieces: int) -> int:
+    return 2 * 64 ** n_pieces
+
+
+def position_indices(squares: np.ndarray, sides: np.ndarray) -> np.ndarray:
+    """
+    this function will index positions given as the (N, pieces) tiles of the
+    pieces in canonical order and the (N,) sides to move
+    """
+    squares = np.asarray(squares, np.int64)
+    n_pieces = squares.shape[-1]
+    weights = 64 ** np.arange(n_pieces - 1, -1, -1, dtype=np.int64)
+    return (np.asarray(sides) == -1) * 64 ** n_pieces + squares @ weights
+
+
+def index_positions(indices: np.ndarray, n_pieces: int):
+    """
+    the inverse of `position_indices`
+    """
+    indices = np.asarray(indices, np.int64)
+    sides = np.where(indices >= 64 ** n_pieces, -1, 1)
+    indices = indices % 64 ** n_pieces
+    weights = 64 ** np.arange(n_pieces - 1, -1, -1, dtype=np.int64)
+    squares = (indices[:, None] // weights) % 64
+    return squares, sides
+
+
+def tablebase_path(pieces, directory: str = _Settings.DIRECTORY) -> str:
+    return os.path.join(directory, signature_name(pieces) + _Settings.EXTENSION)
+
+
+def write_tablebase(path: str, pieces, results: np.ndarray, plies: np.ndarray):
+    pieces = canonical_pieces(pieces)
+    padded_pieces = list(pieces) + [0] * (_Settings.MAX_PIECES - len(pieces))
+    with open(path, 'wb') as file:
+        file.write(_Settings.HEADER.pack(_Settings.MAGIC, _Settings.VERSION, len(pieces), *padded_pieces))
+        file.write(np.asarray(results, np.int8).tobytes())
+        file.write(np.asarray(plies, '<u2').tobytes())
+
+
+class Tablebase:
+    """
+    the results and distances to mate of every position with a set of pieces and
+    no debuffs, castling privileges or en passant, read from a file through
+    `numpy.memmap`. only the pages that are looked up are read from disk
+    """
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            magic, version, n_pieces, *pieces = _Settings.HEADER.unpack(file.read(_Settings.HEADER.size))
+        if magic != _Settings.MAGIC or version != _Settings.VERSION:
+            raise ValueError(f'{path} is not a version {_Settings.VERSION} tablebase')
+
+        self.path = path
+        self.pieces = tuple(pieces[:n_pieces])
+        size = table_size(n_pieces)
+        self.results = np.memmap(path, np.int8, 'r', _Settings.HEADER.size, (size,))
+        self.plies = np.memmap(path, '<u2', 'r', _Settings.HEADER.size + size, (size,))
+
+    def probe(self, squares: np.ndarray, sides: np.ndarray):
+        indices = position_indices(squares, sides)
+        return np.asarray(self.results[indices]), np.asarray(self.plies[indices])
+
+
+def open_tablebase(path: str) -> Tablebase:
+    if path not in _Settings.OPEN_TABLEBASES:
+        _Settings.OPEN_TABLEBASES[path] = Tablebase(path)
+    return _Settings.OPEN_TABLEBASES[path]
+
+
+def board_verdict(board_state: np.ndarray, side_to_move: int, directory: str = _Settings.DIRECTORY):
+    """
+    this function will look a position up in the tablebases and return its result
+    for the side to move and the number of plies to mate, or None if there is no
+    tablebase for its pieces. positions with black's pieces on a tablebase's white
+    side are looked up with the board flipped
+    """
+    board_state = np.asarray(board_state)
+    tile_indices = np.flatnonzero(board_state)
+    if tile_indices.size > _Settings.MAX_PIECES:
+        return None
+
+    for flip in [1, -1]:
+        pieces = board_state[tile_indices] * flip
+        squares = tile_indices if flip == 1 else tile_indices ^ 56
+        path = tablebase_path(pieces, directory)
+        if not os.path.exists(path):
+            continue
+        order = sorted(range(pieces.size), key=lambda i: (pieces[i] < 0, abs(pieces[i])))
+        results, plies = open_tablebase(path).probe(squares[order][None], np.array([side_to_move * flip]))
+        result = int(results[0])
+        if result == _Settings.INVALID:
+            return None
+        return dict(result=_Settings.RESULT_NAMES[result], plies=int(plies[0]))
+    return None
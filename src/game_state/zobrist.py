@@ -0,0 +1,106 @@
+import zlib
+from collections import Counter
+
+import numpy as np
+
+
+class _Settings:
+    # fixed seed so hashes agree between processes and between runs
+    SEED = 0x5A0B1157
+
+    _rng = np.random.default_rng(SEED)
+    _max_key = np.iinfo(np.uint64).max
+
+    # piece codes run from -6 to 6, offset by 6 to index the table
+    PIECE_KEYS = _rng.integers(0, _max_key, size=(13, 64), dtype=np.uint64, endpoint=True).tolist()
+    SIDE_KEY = int(_rng.integers(0, _max_key, dtype=np.uint64, endpoint=True))
+    CASTLING_KEYS = _rng.integers(0, _max_key, size=4, dtype=np.uint64, endpoint=True).tolist()
+    EN_PASSANT_KEYS = _rng.integers(0, _max_key, size=64, dtype=np.uint64, endpoint=True).tolist()
+
+    # debuffs and hands have too many combinations for a table, so their keys are
+    # worked out from their parts, each mixed with splitmix64
+    MASK = (1 << 64) - 1
+    DEBUFF_TAG, LENGTH_TAG, CARD_TAG = 1 << 60, 2 << 60, 3 << 60
+
+
+def _mix(value: int) -> int:
+    value = (value + _Settings.SEED + 0x9E3779B97F4A7C15) & _Settings.MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _Settings.MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _Settings.MASK
+    return value ^ (value >> 31)
+
+
+def piece_key(piece: int, tile_index: int) -> int:
+    if piece == 0:
+        return 0
+    return _Settings.PIECE_KEYS[int(piece) + 6][tile_index]
+
+
+def debuff_key(tile_debuffs: tuple, tile_index: int) -> int:
+    """
+    the key of the debuffs on a tile together with their remaining durations, given
+    as `BoardDebuffs.get_tile`. the whole tile is hashed at once
+    """
+    kinds, lengths = tile_debuffs
+    if not kinds:
+        return 0
+    # numpy integers would overflow when shifted
+    kinds, tile_index = int(kinds), int(tile_index)
+    key = _mix(_Settings.DEBUFF_TAG | tile_index << 32 | kinds)
+    for kind, length in enumerate(lengths):
+        if length:
+            key ^= _mix(_Settings.LENGTH_TAG | kind << 40 | tile_index << 32 | (int(length) & 0xffffffff))
+    return key
+
+
+def hand_key(cards: list, side: int) -> int:
+    """
+    the key of the cards in a side's hand, in any order
+    """
+    key = 0
+    # a card held twice is keyed with its count, so the two do not cancel out
+    for card_id, count in Counter(cards).items():
+        key ^= _mix(_Settings.CARD_TAG | int(side == 1) << 56 | count << 40 | zlib.crc32(str(card_id).encode()))
+    return key
+
+
+def tile_key(piece: int, tile_debuffs: tuple, tile_index: int) -> int:
+    return piece_key(piece, tile_index) ^ debuff_key(tile_debuffs, tile_index)
+
+
+def side_key(side_to_move: int) -> int:
+    return _Settings.SIDE_KEY if side_to_move == -1 else 0
+
+
+def castling_key(castling_privileges: list) -> int:
+    key = 0
+    for privilege_key, castling_privilege in zip(_Settings.CASTLING_KEYS, castling_privileges):
+        if castling_privilege:
+            key ^= privilege_key
+    return key
+
+
+def en_passant_key(en_passant: int) -> int:
+    if en_passant < 0:
+        return 0
+    return _Settings.EN_PASSANT_KEYS[en_passant]
+
+
+def hash_position(
+    board_state: np.ndarray,
+    board_debuffs: 'BoardDebuffs',
+    side_to_move: int,
+    castling_privileges: list,
+    en_passant: int
+) -> int:
+    """
+    this function will hash a position from scratch. the board manager keeps its
+    hash up to date as the position changes, this is used to initialize it and
+    to check it
+    """
+    key = side_key(side_to_move) ^ castling_key(castling_privileges) ^ en_passant_key(en_passant)
+    for tile_index in range(64):
+        key ^= piece_key(board_state[tile_index], tile_index)
+    for tile_index in board_debuffs.tiles_with_debuffs():
+        key ^= debuff_key(board_debuffs.get_tile(tile_index), tile_index)
+    return key
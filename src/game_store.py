@@ -0,0 +1,237 @@
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .game_state import GameInstance
+from .game_state.serialize import serialize_game, deserialize_game
+
+
+class _Settings:
+    DIRECTORY = './hibernated'
+    EXTENSION = '.game'
+    # the game's version comes first, so clients that saw it before it was
+    # hibernated still see it change
+    HEADER = struct.Struct('<Q')
+
+    # games kept in memory at once. they are all much the same size, a few tens of
+    # kilobytes with their tables, so this is the memory budget
+    MAX_GAMES = 1024
+    IDLE_TIMEOUT = 10 * 60
+    # hibernated games nobody has come back to are deleted after this long. the
+    # folder is only looked through for them every so often
+    HIBERNATED_TIMEOUT = 24 * 60 * 60
+    SWEEP_INTERVAL = 60
+
+
+class GameStore:
+    """
+    the games a server is hosting, by lobby code. at most `max_games` are kept in
+    memory: when there are more, the least recently used is hibernated, and games
+    nobody has touched for `idle_timeout` seconds are hibernated when `evict_idle`
+    is called. hibernating writes a game to disk with `serialize_game`, and it is
+    read back the next time its code is used. pieces and cards a player was in the
+    middle of picking are dropped. games are never hibernated while they are in
+    use, see `using`. `on_hibernate(code)` is called after a game is hibernated, so
+    whatever is kept alongside it can be dropped too.
+
+    the store is used from worker threads. its lock is only held to look things
+    up, never while reading or writing files
+    """
+    def __init__(
+        self,
+        directory: str = _Settings.DIRECTORY,
+        max_games: int = _Settings.MAX_GAMES,
+        idle_timeout: float = _Settings.IDLE_TIMEOUT,
+        hibernated_timeout: float = _Settings.HIBERNATED_TIMEOUT,
+        on_hibernate=None
+    ):
+        self.directory = directory
+        self.max_games = max_games
+        self.idle_timeout = idle_timeout
+        self.hibernated_timeout = hibernated_timeout
+        self.on_hibernate = on_hibernate
+        # least recently used first
+        self.games: OrderedDict[str, GameInstance] = OrderedDict()
+        self.last_used: dict[str, float] = {}
+        # games being written to disk, which are still handed out until they are
+        self.hibernating: dict[str, GameInstance] = {}
+        # the number of requests using each game
+        self.users: dict[str, int] = {}
+        self.last_sweep = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _path(self, code: str) -> str:
+        # codes are typed in by players, so they are not trusted as file names
+        return os.path.join(self.directory, code.encode().hex() + _Settings.EXTENSION)
+
+    def __len__(self):
+        return len(self.games)
+
+    def __contains__(self, code: str):
+        if self.is_resident(code):
+            return True
+        return os.path.exists(self._path(code))
+
+    def is_resident(self, code: str) -> bool:
+        """
+        whether a game can be handed out without reading it from disk
+        """
+        with self.lock:
+            return code in self.games or code in self.hibernating
+
+    @contextmanager
+    def using(self, code: str):
+        """
+        keeps a game from being hibernated while a request is using it
+        """
+        with self.lock:
+            self.users[code] = self.users.get(code, 0) + 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.users[code] -= 1
+                if not self.users[code]:
+                    del self.users[code]
+
+    def _touch(self, code: str, game_instance: GameInstance):
+        self.games[code] = game_instance
+        self.games.move_to_end(code)
+        self.last_used[code] = time.monotonic()
+
+    def __getitem__(self, code: str) -> GameInstance:
+        with self.lock:
+            game_instance = self.games.get(code, self.hibernating.get(code))
+            if game_instance is not None:
+                self._touch(code, game_instance)
+                return game_instance
+
+        try:
+            with open(self._path(code), 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            # another thread may have read it back, and removed the file, first
+            with self.lock:
+                game_instance = self.games.get(code, self.hibernating.get(code))
+                if game_instance is None:
+                    raise KeyError(code)
+                self._touch(code, game_instance)
+                return game_instance
+        version, = _Settings.HEADER.unpack_from(data, 0)
+        game_instance = deserialize_game(data[_Settings.HEADER.size:])
+        # anything picked was dropped, so this counts as a change
+        game_instance.version = version + 1
+
+        with self.lock:
+            # another thread may have read it back first
+            game_instance = self.games.get(code, game_instance)
+            self._touch(code, game_instance)
+        self._remove_file(code)
+        self._evict_over_budget()
+        return game_instance
+
+    def create(self, code: str) -> GameInstance:
+        """
+        starts a new game, replacing any game the code had before
+        """
+        game_instance = GameInstance()
+        with self.lock:
+            self.hibernating.pop(code, None)
+            self._touch(code, game_instance)
+        self._remove_file(code)
+        self._evict_over_budget()
+        return game_instance
+
+    def remove(self, code: str):
+        with self.lock:
+            self.games.pop(code, None)
+            self.last_used.pop(code, None)
+            self.hibernating.pop(code, None)
+        self._remove_file(code)
+
+    def _remove_file(self, code: str):
+        try:
+            os.remove(self._path(code))
+        except FileNotFoundError:
+            pass
+
+    def _evict_over_budget(self):
+        while True:
+            with self.lock:
+                if len(self.games) <= self.max_games:
+                    return
+                code = next((code for code in self.games if code not in self.users), None)
+            # every game is in use, so the budget is let go over until one is not
+            if code is None or not self.hibernate(code):
+                return
+
+    def hibernate(self, code: str) -> bool:
+        """
+        writes a game to disk and drops it from memory, unless it is in use. this
+        function will return whether it was hibernated
+        """
+        with self.lock:
+            if code in self.users or code not in self.games or code in self.hibernating:
+                return False
+            game_instance = self.games.pop(code)
+            del self.last_used[code]
+            self.hibernating[code] = game_instance
+
+        path = self._path(code)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path + '.tmp', 'wb') as file:
+            file.write(_Settings.HEADER.pack(game_instance.version))
+            file.write(serialize_game(game_instance))
+        os.replace(path + '.tmp', path)
+
+        with self.lock:
+            # the game may have been used, replaced or removed while it was written
+            current = self.hibernating.pop(code, None)
+            hibernated = current is game_instance and code not in self.games
+        if not hibernated:
+            # what was written is out of date
+            self._remove_file(code)
+            return False
+        if self.on_hibernate is not None:
+            self.on_hibernate(code)
+        return True
+
+    def evict_idle(self, now: float = None) -> list[str]:
+        """
+        this function will hibernate every game that has been idle for longer than
+        `idle_timeout`, then games over the budget that were in use when it was
+        reached, and every so often delete the hibernated games that are older than
+        `hibernated_timeout`. it returns the codes hibernated for being idle
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            idle_codes = []
+            # games are in the order they were used, so only the idle ones are looked at
+            for code in self.games:
+                if now - self.last_used[code] <= self.idle_timeout:
+                    break
+                idle_codes.append(code)
+            sweep = now - self.last_sweep > _Settings.SWEEP_INTERVAL
+            if sweep:
+                self.last_sweep = now
+
+        hibernated = [code for code in idle_codes if self.hibernate(code)]
+        self._evict_over_budget()
+        if sweep:
+            self._delete_expired()
+        return hibernated
+
+    def _delete_expired(self):
+        if not os.path.isdir(self.directory):
+            return
+        expired_before = time.time() - self.hibernated_timeout
+        for entry in os.scandir(self.directory):
+            # games are read back, and their files removed, by other threads
+            try:
+                if entry.name.endswith(_Settings.EXTENSION) and entry.stat().st_mtime < expired_before:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                continue
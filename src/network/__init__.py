@@ -0,0 +1,3 @@
+from .protocol import *
+from .client import *
+from .server import GameServer
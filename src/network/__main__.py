@@ -0,0 +1,4 @@
+from .server import main
+
+
+main()
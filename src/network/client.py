@@ -0,0 +1,157 @@
+import asyncio
+import itertools
+import threading
+
+from ..server import apply_snapshot_diff, render_data_from_snapshot
+from .protocol import ProtocolError, encode_message, read_message, request_message
+
+
+class _Settings:
+    TIMEOUT = 5.0
+
+
+class RemoteError(Exception):
+    pass
+
+
+class GameConnection:
+    """
+    a connection to a `GameServer` for asyncio code. requests can be sent without
+    waiting for earlier ones to be answered, and are answered in order
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.request_ids = itertools.count()
+        self.pending: dict[int, asyncio.Future] = {}
+        self.receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def open(cls, host: str, port: int):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        error = ConnectionError('connection closed')
+        try:
+            while True:
+                message = await read_message(self.reader)
+                if message is None:
+                    break
+                future = self.pending.pop(message.get('id'), None)
+                if future is None or future.done():
+                    continue
+                if 'error' in message:
+                    future.set_exception(RemoteError(message['error']))
+                else:
+                    future.set_result(message.get('result'))
+        except (ProtocolError, ConnectionError) as receive_error:
+            error = receive_error
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.pending.clear()
+
+    def send(self, message_type: str, **args) -> asyncio.Future:
+        """
+        sends a request and returns a future of its result
+        """
+        request_id = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write(encode_message(request_message(request_id, message_type, args)))
+        return future
+
+    async def request(self, message_type: str, **args):
+        return await self.send(message_type, **args)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        await self.receiver
+
+
+class RemoteServer:
+    """
+    stands in for `Server` in the client when playing over the network. the
+    connection runs on a thread of its own, so the game loop never waits on the
+    network: events are sent without waiting for a reply, the render data is the
+    latest received (an update is asked for every time it is read), and
+    `end_turn` returns a list which the animations are added to once they arrive.
+    only `validate_code` waits, once, before the game starts. render data is kept
+    up to date with `Server.get_render_update`, so while nothing changes only
+    small `unchanged` replies are sent, and is built here from the snapshot it
+    keeps. the animations of every turn that ended, including the other player's,
+    are collected in `animations`. each lobby has a connection of its own, as a
+    sharded server hosts every lobby on the process its code hashes to
+    """
+    def __init__(self, host: str, port: int, timeout: float = _Settings.TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.connections: dict[str, GameConnection] = {}
+        self.snapshots = {}
+        self.render_data = {}
+        self.versions = {}
+        self.render_requests = {}
+        self.animations = {}
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def _send(self, message_type: str, code: str, **args):
+        return self._run(self.connections[code].request(message_type, code=code, **args))
+
+    def validate_code(self, code: str, lobby_type: str):
+        if code not in self.connections:
+            self.connections[code] = self._run(GameConnection.open(self.host, self.port)).result(self.timeout)
+        valid = self._send('validate_code', code=code, lobby_type=lobby_type).result(self.timeout)
+        if valid:
+            self.versions[code] = -1
+            self.animations[code] = []
+            self._apply_update(code, self._send('get_render_update', code=code, version=-1).result(self.timeout))
+        return valid
+
+    def _apply_update(self, code: str, update: dict):
+        if update['version'] <= self.versions[code] or update.get('unchanged'):
+            return
+        if 'full' in update:
+            self.snapshots[code] = update['full']
+        else:
+            self.snapshots[code] = apply_snapshot_diff(self.snapshots[code], update['diff'])
+        self.render_data[code] = render_data_from_snapshot(self.snapshots[code])
+        self.versions[code] = update['version']
+        self.animations[code].extend(update['animations'])
+
+    def hand_event(self, code: str, event_data: dict):
+        self._send('hand_event', code=code, event_data=event_data)
+
+    def board_event(self, code: str, board_index: int):
+        self._send('board_event', code=code, board_index=int(board_index))
+
+    def end_turn(self, code: str):
+        animations = []
+        self._send('end_turn', code=code).add_done_callback(
+            lambda future: animations.extend(future.result()) if future.exception() is None else None
+        )
+        return animations
+
+    def get_render_data(self, code: str):
+        request = self.render_requests.get(code)
+        if request is not None and request.done():
+            if request.exception() is None:
+                self._apply_update(code, request.result())
+            request = None
+        if request is None:
+            self.render_requests[code] = self._send('get_render_update', code=code, version=self.versions[code])
+        return self.render_data.get(code)
+
+    def close(self):
+        for connection in self.connections.values():
+            self._run(connection.close()).result(self.timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
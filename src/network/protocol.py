@@ -0,0 +1,112 @@
+import asyncio
+import zlib
+
+from .wire import WireError, encode_frame, decode_frame, _Settings as _WireSettings
+
+
+class _Settings:
+    # every message is a binary frame, see `wire`
+    LENGTH = _WireSettings.LENGTH
+    MAX_MESSAGE_SIZE = _WireSettings.MAX_FRAME_SIZE
+
+    # the calls a client can make on a lobby, with the arguments each one takes
+    MESSAGE_TYPES = {
+        'validate_code': ('code', 'lobby_type'),
+        'hand_event': ('code', 'event_data'),
+        'board_event': ('code', 'board_index'),
+        'end_turn': ('code',),
+        'get_render_data': ('code',),
+        'get_render_update': ('code', 'version'),
+    }
+    HAND_EVENT_FIELDS = ('card_index', 'board_index')
+    N_TILES = 64
+    SIDES = (-1, 0, 1)
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_message(message: dict) -> bytes:
+    try:
+        return encode_frame(message)
+    except WireError as error:
+        raise ProtocolError(str(error))
+
+
+def decode_message(data) -> dict:
+    try:
+        return decode_frame(data)
+    except WireError as error:
+        raise ProtocolError(str(error))
+
+
+async def read_message(reader: asyncio.StreamReader):
+    """
+    this function will read the next message, or return None once the other end
+    has closed the connection
+    """
+    try:
+        header = await reader.readexactly(_Settings.LENGTH.size)
+    except asyncio.IncompleteReadError as error:
+        if error.partial:
+            raise ProtocolError('connection closed in the middle of a message')
+        return None
+    length, = _Settings.LENGTH.unpack(header)
+    if length > _Settings.MAX_MESSAGE_SIZE:
+        raise ProtocolError(f'message of {length} bytes is too long')
+    return decode_message(await reader.readexactly(length))
+
+
+def request_message(request_id: int, message_type: str, args: dict) -> dict:
+    if message_type not in _Settings.MESSAGE_TYPES:
+        raise ProtocolError(f'unknown message type {message_type}')
+    return dict(id=request_id, type=message_type, args=args)
+
+
+def validate_request(message: dict):
+    """
+    this function will check a request from a client and return its id, type and
+    arguments, raising `ProtocolError` if it is not a call a client can make
+    """
+    request_id, message_type, args = message.get('id'), message.get('type'), message.get('args')
+    if not isinstance(request_id, int) or message_type not in _Settings.MESSAGE_TYPES or not isinstance(args, dict):
+        raise ProtocolError('a request needs an integer id, a known type and arguments')
+    if set(args) != set(_Settings.MESSAGE_TYPES[message_type]):
+        raise ProtocolError(f'{message_type} takes {", ".join(_Settings.MESSAGE_TYPES[message_type])}')
+    if message_type == 'board_event':
+        _check_tile(args['board_index'])
+    elif message_type == 'hand_event':
+        _check_hand_event(args['event_data'])
+    return request_id, message_type, args
+
+
+def _check_tile(tile_index):
+    # the game indexes its boards with these without checking them
+    if not isinstance(tile_index, int) or not 0 <= tile_index < _Settings.N_TILES:
+        raise ProtocolError(f'{tile_index} is not a tile')
+
+
+def _check_hand_event(event_data):
+    """
+    a hand event is a side and either the index of a card in that side's hand or
+    the tile the picked card targets. the card index can only be checked against
+    the hand, see `GameServer`
+    """
+    if not isinstance(event_data, dict) or event_data.get('side') not in _Settings.SIDES:
+        raise ProtocolError('a hand event needs a side')
+    fields = [field for field in _Settings.HAND_EVENT_FIELDS if field in event_data]
+    if len(fields) != 1 or len(event_data) != 2:
+        raise ProtocolError(f'a hand event has one of {", ".join(_Settings.HAND_EVENT_FIELDS)}')
+    if 'board_index' in event_data:
+        _check_tile(event_data['board_index'])
+    elif not isinstance(event_data['card_index'], int) or event_data['card_index'] < 0:
+        raise ProtocolError(f'{event_data["card_index"]} is not a card index')
+
+
+def shard_index(code: str, n_shards: int) -> int:
+    """
+    the shard a lobby is hosted on when lobbies are spread across processes. this
+    has to be the same in every process, so python's salted `hash` is not used
+    """
+    return zlib.crc32(code.encode()) % n_shards
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import functools
+import logging
+import os
+import weakref
+
+from ..server import Server
+from .protocol import ProtocolError, encode_message, decode_message, read_message, validate_request, shard_index
+
+
+class _Settings:
+    HOST = '0.0.0.0'
+    PORT = 7777
+
+    # calls that play out game logic, which run on worker threads so the event loop
+    # keeps serving other lobbies while they do
+    OFFLOADED = {'validate_code', 'end_turn'}
+    # calls answered by a different method of `Server` than their name. render data
+    # is sent as the snapshot it is built from, and built by the client
+    METHODS = {'get_render_data': 'get_render_snapshot'}
+
+    LOGGER = logging.getLogger(__name__)
+
+
+class GameServer:
+    """
+    hosts lobbies for clients connecting over tcp, see `protocol`. each
+    connection's requests are answered in the order they were sent, and requests
+    to the same lobby never run at the same time. when lobbies are spread across
+    processes, `shard` is this process's (index, number of shards), and only
+    lobbies hashed to it are hosted, see `sharding`
+    """
+    def __init__(self, server: Server = None, shard: tuple = None):
+        self.server = Server(speculate=False, create_on_join=False) if server is None else server
+        self.shard = shard
+        # a lock only lives as long as requests are using it, so they do not pile up
+        self.lobby_locks = weakref.WeakValueDictionary()
+        self.n_connections = 0
+        self.sockets = []
+
+    async def handle_request(self, message: dict) -> dict:
+        try:
+            request_id, message_type, args = validate_request(message)
+        except ProtocolError as error:
+            return dict(id=message.get('id'), type=message.get('type'), error=str(error))
+
+        code = args['code']
+        if self.shard is not None and shard_index(code, self.shard[1]) != self.shard[0]:
+            return dict(id=request_id, type=message_type, error=f'lobby {code} is hosted on another shard')
+        if message_type != 'validate_code' and code not in self.server.games:
+            return dict(id=request_id, type=message_type, error=f'no lobby {code}')
+
+        call = functools.partial(self._call, message_type, args)
+        lock = self.lobby_locks.setdefault(code, asyncio.Lock())
+        try:
+            # the lobby is not hibernated while the request waits for it or runs
+            with self.server.games.using(code):
+                async with lock:
+                    # reading a hibernated game back from disk is kept off the event loop too
+                    if message_type in _Settings.OFFLOADED or not self.server.games.is_resident(code):
+                        result = await asyncio.get_running_loop().run_in_executor(None, call)
+                    else:
+                        result = call()
+        except ProtocolError as error:
+            return dict(id=request_id, type=message_type, error=str(error))
+        except (KeyError, IndexError, TypeError, ValueError) as error:
+            return dict(id=request_id, type=message_type, error=f'{type(error).__name__}: {error}')
+        except Exception as error:
+            # one bad request must not take the connection, or the server, down with it
+            _Settings.LOGGER.exception('%s on lobby %s failed', message_type, code)
+            return dict(id=request_id, type=message_type, error=f'internal error: {type(error).__name__}')
+        return dict(id=request_id, type=message_type, result=result)
+
+    def _call(self, message_type: str, args: dict):
+        if message_type == 'hand_event' and 'card_index' in args['event_data']:
+            # card indices are checked here, against the hand, before the game sees them
+            event_data = args['event_data']
+            hands = self.server.games[args['code']].hand_manager.hands
+            if event_data['side'] in hands and event_data['card_index'] >= len(hands[event_data['side']].cards):
+                raise ProtocolError(f'side {event_data["side"]} has no card {event_data["card_index"]}')
+        method = _Settings.METHODS.get(message_type, message_type)
+        return getattr(self.server, method)(**args)
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, first_frame: bytes = None
+    ):
+        """
+        answers a connection's requests until it closes. a connection handed over
+        from another process comes with the frame that was read from it there
+        """
+        self.n_connections += 1
+        try:
+            if first_frame is not None:
+                writer.write(encode_message(await self.handle_request(decode_message(first_frame))))
+                await writer.drain()
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                writer.write(encode_message(await self.handle_request(message)))
+                await writer.drain()
+        except (ProtocolError, ConnectionError):
+            pass
+        finally:
+            self.n_connections -= 1
+            writer.close()
+
+    async def serve(self, host: str = _Settings.HOST, port: int = _Settings.PORT, started: asyncio.Event = None):
+        tcp_server = await asyncio.start_server(self.handle_connection, host, port)
+        self.sockets = tcp_server.sockets
+        if started is not None:
+            started.set()
+        async with tcp_server:
+            await tcp_server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='host wizard chess lobbies over tcp')
+    parser.add_argument('--host', default=_Settings.HOST)
+    parser.add_argument('--port', type=int, default=_Settings.PORT)
+    parser.add_argument('--speculate', action='store_true', help='work out the next turn while players think')
+    parser.add_argument(
+        '--shards', type=int, default=1,
+        help=f'number of processes to spread lobbies across (unix only), e.g. {os.cpu_count()} for one per cpu'
+    )
+    args = parser.parse_args()
+
+    n_shards = args.shards
+    if n_shards > 1:
+        from .sharding import sharding_supported, serve_sharded
+        if not sharding_supported():
+            print('warning: sharding needs unix sockets that can pass file descriptors, serving from one process')
+            n_shards = 1
+
+    print(f'serving on {args.host}:{args.port} with {n_shards} shard(s)')
+    try:
+        if n_shards > 1:
+            serve_sharded(args.host, args.port, n_shards, args.speculate)
+        else:
+            asyncio.run(GameServer(Server(speculate=args.speculate, create_on_join=False)).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
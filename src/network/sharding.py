@@ -0,0 +1,162 @@
+import asyncio
+import multiprocessing
+import socket
+
+from ..server import Server
+from .protocol import ProtocolError, decode_message, shard_index, _Settings as _ProtocolSettings
+from .server import GameServer
+
+
+class _Settings:
+    # the first frame of a connection is read by the router to find its lobby, so it
+    # has to be a request, which are small, and arrive soon after connecting
+    MAX_FIRST_FRAME = 1024
+    FIRST_FRAME_TIMEOUT = 10.0
+    BACKLOG = 1024
+
+
+def sharding_supported() -> bool:
+    """
+    handing sockets between processes needs unix sockets that carry file
+    descriptors, which windows does not have
+    """
+    return all(hasattr(socket, name) for name in ['AF_UNIX', 'SOCK_SEQPACKET', 'send_fds', 'recv_fds'])
+
+
+async def _read_exactly(loop: asyncio.AbstractEventLoop, client_socket: socket.socket, size: int) -> bytes:
+    # reads straight from the socket rather than through a stream, so nothing past
+    # the first frame is read before the socket is handed over
+    data = bytearray()
+    while len(data) < size:
+        chunk = await loop.sock_recv(client_socket, size - len(data))
+        if not chunk:
+            raise ConnectionError('connection closed before its first request')
+        data += chunk
+    return bytes(data)
+
+
+class LobbyRouter:
+    """
+    accepts connections for a set of shard processes. the first request of each
+    connection is read to find its lobby code, and the connection is handed to the
+    shard the code hashes to, with `socket.send_fds`, along with that request. the
+    router never sees the rest of the connection, so it does not proxy any bytes.
+    a connection stays on one shard, so clients open one per lobby
+    """
+    def __init__(self, handoff_sockets: list[socket.socket]):
+        self.handoff_sockets = handoff_sockets
+        self.sockets = []
+
+    async def read_first_frame(self, client_socket: socket.socket) -> tuple[str, bytes]:
+        loop = asyncio.get_running_loop()
+        length, = _ProtocolSettings.LENGTH.unpack(
+            await _read_exactly(loop, client_socket, _ProtocolSettings.LENGTH.size)
+        )
+        if length > _Settings.MAX_FIRST_FRAME:
+            raise ProtocolError(f'first frame of {length} bytes is too long')
+        frame = await _read_exactly(loop, client_socket, length)
+        message = decode_message(frame)
+        if 'args' not in message:
+            raise ProtocolError('a connection has to start with a request')
+        return message['args']['code'], frame
+
+    async def route(self, client_socket: socket.socket):
+        try:
+            code, frame = await asyncio.wait_for(self.read_first_frame(client_socket), _Settings.FIRST_FRAME_TIMEOUT)
+            handoff_socket = self.handoff_sockets[shard_index(code, len(self.handoff_sockets))]
+            socket.send_fds(handoff_socket, [frame], [client_socket.fileno()])
+        except (ProtocolError, ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            # the shard has its own copy of the socket once it is sent
+            client_socket.close()
+
+    async def serve(self, host: str, port: int, started: asyncio.Event = None):
+        loop = asyncio.get_running_loop()
+        listener = socket.create_server((host, port), backlog=_Settings.BACKLOG)
+        listener.setblocking(False)
+        self.sockets = [listener]
+        if started is not None:
+            started.set()
+        tasks = set()
+        with listener:
+            while True:
+                client_socket, _ = await loop.sock_accept(listener)
+                client_socket.setblocking(False)
+                task = asyncio.ensure_future(self.route(client_socket))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+
+async def _serve_shard(game_server: GameServer, handoff_socket: socket.socket):
+    loop = asyncio.get_running_loop()
+    handoff_socket.setblocking(False)
+    router_closed = asyncio.Event()
+    tasks = set()
+
+    async def adopt(client_socket: socket.socket, first_frame: bytes):
+        reader, writer = await asyncio.open_connection(sock=client_socket)
+        await game_server.handle_connection(reader, writer, first_frame)
+
+    def receive():
+        try:
+            first_frame, fds, _, _ = socket.recv_fds(handoff_socket, _Settings.MAX_FIRST_FRAME, 1)
+        except BlockingIOError:
+            return
+        if not first_frame and not fds:
+            # the router has gone, so no more connections will come
+            router_closed.set()
+            return
+        for fd in fds:
+            task = asyncio.ensure_future(adopt(socket.socket(fileno=fd), first_frame))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    loop.add_reader(handoff_socket.fileno(), receive)
+    await router_closed.wait()
+    loop.remove_reader(handoff_socket.fileno())
+
+
+def _run_shard(handoff_socket: socket.socket, router_sockets: list, shard: int, n_shards: int, speculate: bool):
+    # a forked shard has copies of the router's ends of the handoff sockets, which
+    # would keep it from seeing the router close
+    for router_socket in router_sockets:
+        router_socket.close()
+    game_server = GameServer(Server(speculate=speculate, create_on_join=False), shard=(shard, n_shards))
+    try:
+        asyncio.run(_serve_shard(game_server, handoff_socket))
+    except KeyboardInterrupt:
+        pass
+
+
+def start_shards(n_shards: int, speculate: bool = False) -> tuple[list, list]:
+    """
+    this function will start a process for every shard, each with a `GameServer`
+    hosting the lobbies hashed to it, and return them with the sockets that
+    connections are handed to them through
+    """
+    processes, handoff_sockets = [], []
+    for shard in range(n_shards):
+        router_end, shard_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        handoff_sockets.append(router_end)
+        process = multiprocessing.Process(
+            target=_run_shard, args=(shard_end, list(handoff_sockets), shard, n_shards, speculate), daemon=True
+        )
+        process.start()
+        shard_end.close()
+        processes.append(process)
+    return processes, handoff_sockets
+
+
+def serve_sharded(host: str, port: int, n_shards: int, speculate: bool = False):
+    """
+    hosts lobbies across `n_shards` processes behind one port, so the number of
+    lobbies a machine can host grows with its cores rather than being held to one
+    by the gil
+    """
+    processes, handoff_sockets = start_shards(n_shards, speculate)
+    try:
+        asyncio.run(LobbyRouter(handoff_sockets).serve(host, port))
+    finally:
+        for process in processes:
+            process.terminate()
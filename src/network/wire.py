@@ -0,0 +1,334 @@
+import struct
+
+import numpy as np
+
+
+class _Settings:
+    # every frame is a little endian uint32 length and then that many bytes: the
+    # message type, its kind and the request id, then a payload laid out for the type
+    LENGTH = struct.Struct('<I')
+    HEADER = struct.Struct('<BBI')
+    MAX_FRAME_SIZE = 1 << 20
+
+    REQUEST, RESULT, ERROR = 0, 1, 2
+    UNKNOWN_TYPE = 0xff
+
+    # the order of these is the type byte of a frame
+    MESSAGE_TYPES = [
+        'validate_code', 'hand_event', 'board_event', 'end_turn', 'get_render_data', 'get_render_update'
+    ]
+    LOBBY_TYPES = ['create', 'join']
+    HAND_FIELDS = ['card_index', 'board_index']
+    ANIMATION_TYPES = ['move_piece', 'cast_spell', 'tile_effects']
+    # how a render update is sent, see `Server.get_render_update`
+    UPDATE_KINDS = ['unchanged', 'diff', 'full']
+
+    # a snapshot starts with the boards before and after the last move as piece
+    # codes and the debuffs of every tile as bitmasks, then its lists
+    SNAPSHOT_TILES = np.dtype([('prev_board', 'i1', 64), ('board', 'i1', 64), ('debuffs', '<u2', 64)])
+    TILE_DTYPES = {'prev_board': np.dtype('i1'), 'board': np.dtype('i1'), 'debuffs': np.dtype('<u2')}
+    LIST_DTYPES = {'move_indices': np.dtype('u1'), 'cards': np.dtype('u1'), 'played': np.dtype('i1')}
+    # the lists of a diff that are there are flagged by a bit each, in this order
+    DIFF_LISTS = [('move_indices', None), ('cards', 1), ('cards', -1), ('played', 1), ('played', -1)]
+
+
+class WireError(Exception):
+    pass
+
+
+class _Writer:
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, format: str, *values):
+        self.parts.append(struct.pack(format, *values))
+
+    def array(self, values, dtype: np.dtype):
+        self.parts.append(np.asarray(values).astype(dtype, copy=False).tobytes())
+
+    def counted_array(self, values, dtype: np.dtype):
+        values = np.asarray(values)
+        if values.size > 0xff:
+            raise WireError(f'a list of {values.size} items is too long to send')
+        self.pack('<B', values.size)
+        self.array(values, dtype)
+
+    def string(self, value: str):
+        data = value.encode()
+        if len(data) > 0xffff:
+            raise WireError(f'a string of {len(data)} bytes is too long to send')
+        self.pack('<H', len(data))
+        self.parts.append(data)
+
+    def getvalue(self) -> bytes:
+        return b''.join(self.parts)
+
+
+class _Reader:
+    """
+    reads a payload in place. arrays are views of the frame's bytes, so they are
+    read only
+    """
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def _take(self, size: int) -> int:
+        offset = self.offset
+        if offset + size > len(self.data):
+            raise WireError('frame ended in the middle of its payload')
+        self.offset += size
+        return offset
+
+    def unpack(self, format: str):
+        offset = self._take(struct.calcsize(format))
+        values = struct.unpack_from(format, self.data, offset)
+        return values[0] if len(values) == 1 else values
+
+    def array(self, dtype: np.dtype, count: int) -> np.ndarray:
+        offset = self._take(dtype.itemsize * count)
+        return np.frombuffer(self.data, dtype, count, offset)
+
+    def counted_array(self, dtype: np.dtype) -> np.ndarray:
+        return self.array(dtype, self.unpack('<B'))
+
+    def string(self) -> str:
+        size = self.unpack('<H')
+        offset = self._take(size)
+        return bytes(self.data[offset:offset + size]).decode()
+
+    def finish(self):
+        if self.offset != len(self.data):
+            raise WireError(f'{len(self.data) - self.offset} bytes left over after the payload')
+
+
+def _encode_code(writer: _Writer, code: str):
+    data = code.encode('ascii')
+    if len(data) > 0xff:
+        raise WireError('lobby codes are at most 255 characters')
+    writer.pack('<B', len(data))
+    writer.parts.append(data)
+
+
+def _decode_code(reader: _Reader) -> str:
+    size = reader.unpack('<B')
+    offset = reader._take(size)
+    return bytes(reader.data[offset:offset + size]).decode('ascii')
+
+
+def _encode_request(writer: _Writer, message_type: str, args: dict):
+    _encode_code(writer, args['code'])
+    if message_type == 'validate_code':
+        writer.pack('<B', _Settings.LOBBY_TYPES.index(args['lobby_type']))
+    elif message_type == 'hand_event':
+        event_data = args['event_data']
+        field, = [field for field in _Settings.HAND_FIELDS if field in event_data]
+        writer.pack('<bBb', event_data['side'], _Settings.HAND_FIELDS.index(field), event_data[field])
+    elif message_type == 'board_event':
+        writer.pack('<B', args['board_index'])
+    elif message_type == 'get_render_update':
+        writer.pack('<i', args['version'])
+
+
+def _decode_request(reader: _Reader, message_type: str) -> dict:
+    args = dict(code=_decode_code(reader))
+    if message_type == 'validate_code':
+        args['lobby_type'] = _Settings.LOBBY_TYPES[reader.unpack('<B')]
+    elif message_type == 'hand_event':
+        side, field, value = reader.unpack('<bBb')
+        args['event_data'] = {'side': side, _Settings.HAND_FIELDS[field]: value}
+    elif message_type == 'board_event':
+        args['board_index'] = reader.unpack('<B')
+    elif message_type == 'get_render_update':
+        args['version'] = reader.unpack('<i')
+    return args
+
+
+def encode_animations(writer: _Writer, animations: list):
+    """
+    animations are `['move_piece', from, to]`, `['cast_spell', colour, target,
+    side]` and `['tile_effects', destroyed tiles]`. slow casts add the side to
+    every animation they make, so a move can have one too, sent as 0 when it does not
+    """
+    writer.pack('<B', len(animations))
+    for animation_type, *params in animations:
+        writer.pack('<B', _Settings.ANIMATION_TYPES.index(animation_type))
+        if animation_type == 'move_piece':
+            old_index, new_index, *side = params
+            writer.pack('<bbb', old_index, new_index, side[0] if side else 0)
+        elif animation_type == 'cast_spell':
+            color, target_index, side = params
+            writer.array(color, np.uint8)
+            writer.pack('<bb', target_index, side)
+        else:
+            destroy_tiles, = params
+            writer.counted_array(destroy_tiles, np.uint8)
+
+
+def decode_animations(reader: _Reader) -> list:
+    animations = []
+    for _ in range(reader.unpack('<B')):
+        animation_type = _Settings.ANIMATION_TYPES[reader.unpack('<B')]
+        if animation_type == 'move_piece':
+            old_index, new_index, side = reader.unpack('<bbb')
+            animations.append([animation_type, old_index, new_index] + ([side] if side else []))
+        elif animation_type == 'cast_spell':
+            color = reader.array(np.dtype(np.uint8), 3)
+            target_index, side = reader.unpack('<bb')
+            animations.append([animation_type, color, target_index, side])
+        else:
+            animations.append([animation_type, reader.counted_array(np.dtype(np.uint8))])
+    return animations
+
+
+def encode_snapshot(writer: _Writer, snapshot: dict):
+    """
+    a snapshot, see `server.render_snapshot`, is 256 bytes of tiles and then the
+    picked piece's moves, the cards in each hand and the cards each side played,
+    as a count and a byte each
+    """
+    for field, dtype in _Settings.TILE_DTYPES.items():
+        writer.array(snapshot[field], dtype)
+    writer.counted_array(snapshot['move_indices'], _Settings.LIST_DTYPES['move_indices'])
+    for field in ['cards', 'played']:
+        for side in [1, -1]:
+            writer.counted_array(snapshot[field][side], _Settings.LIST_DTYPES[field])
+
+
+def decode_snapshot(reader: _Reader) -> dict:
+    tiles = reader.array(_Settings.SNAPSHOT_TILES, 1)[0]
+    snapshot = {field: tiles[field] for field in _Settings.TILE_DTYPES}
+    snapshot['move_indices'] = reader.counted_array(_Settings.LIST_DTYPES['move_indices'])
+    for field in ['cards', 'played']:
+        snapshot[field] = {side: reader.counted_array(_Settings.LIST_DTYPES[field]) for side in [1, -1]}
+    return snapshot
+
+
+def encode_snapshot_diff(writer: _Writer, diff: dict):
+    """
+    a diff, see `server.snapshot_diff`, is the tiles that changed in each of the
+    tile fields as a count, their indices and their new values, then a byte
+    flagging which lists changed, followed by those lists
+    """
+    for field, dtype in _Settings.TILE_DTYPES.items():
+        tile_indices, values = diff.get(field, ([], []))
+        writer.counted_array(tile_indices, np.uint8)
+        writer.array(values, dtype)
+    lists = [
+        (field, side) for field, side in _Settings.DIFF_LISTS
+        if field in diff and (side is None or side in diff[field])
+    ]
+    writer.pack('<B', sum(1 << _Settings.DIFF_LISTS.index(key) for key in lists))
+    for field, side in lists:
+        writer.counted_array(diff[field] if side is None else diff[field][side], _Settings.LIST_DTYPES[field])
+
+
+def decode_snapshot_diff(reader: _Reader) -> dict:
+    diff = {}
+    for field, dtype in _Settings.TILE_DTYPES.items():
+        tile_indices = reader.counted_array(np.dtype(np.uint8))
+        values = reader.array(dtype, tile_indices.size)
+        if tile_indices.size:
+            diff[field] = (tile_indices, values)
+    flags = reader.unpack('<B')
+    for bit, (field, side) in enumerate(_Settings.DIFF_LISTS):
+        if flags & (1 << bit):
+            values = reader.counted_array(_Settings.LIST_DTYPES[field])
+            if side is None:
+                diff[field] = values
+            else:
+                diff.setdefault(field, {})[side] = values
+    return diff
+
+
+def _encode_result(writer: _Writer, message_type: str, result):
+    if message_type == 'validate_code':
+        writer.pack('<?', result)
+    elif message_type == 'end_turn':
+        encode_animations(writer, result)
+    elif message_type == 'get_render_data':
+        encode_snapshot(writer, result)
+    elif message_type == 'get_render_update':
+        kind, = [kind for kind in _Settings.UPDATE_KINDS if kind in result]
+        writer.pack('<iB', result['version'], _Settings.UPDATE_KINDS.index(kind))
+        if kind == 'unchanged':
+            return
+        if kind == 'diff':
+            encode_snapshot_diff(writer, result['diff'])
+        else:
+            encode_snapshot(writer, result['full'])
+        encode_animations(writer, result['animations'])
+
+
+def _decode_result(reader: _Reader, message_type: str):
+    if message_type == 'validate_code':
+        return reader.unpack('<?')
+    if message_type == 'end_turn':
+        return decode_animations(reader)
+    if message_type == 'get_render_data':
+        return decode_snapshot(reader)
+    if message_type == 'get_render_update':
+        version, kind = reader.unpack('<iB')
+        kind = _Settings.UPDATE_KINDS[kind]
+        if kind == 'unchanged':
+            return dict(version=version, unchanged=True)
+        result = dict(version=version)
+        result[kind] = decode_snapshot_diff(reader) if kind == 'diff' else decode_snapshot(reader)
+        result['animations'] = decode_animations(reader)
+        return result
+    return None
+
+
+def encode_frame(message: dict) -> bytes:
+    """
+    this function will encode a request (`id`, `type`, `args`), a result (`id`,
+    `type`, `result`) or an error (`id`, `type`, `error`) as a frame
+    """
+    message_type = message.get('type')
+    type_index = _Settings.MESSAGE_TYPES.index(message_type) if message_type in _Settings.MESSAGE_TYPES else _Settings.UNKNOWN_TYPE
+    writer = _Writer()
+    try:
+        if 'error' in message:
+            kind = _Settings.ERROR
+            writer.string(message['error'])
+        elif 'result' in message:
+            kind = _Settings.RESULT
+            _encode_result(writer, message_type, message['result'])
+        else:
+            kind = _Settings.REQUEST
+            _encode_request(writer, message_type, message['args'])
+    except (KeyError, IndexError, ValueError, TypeError, struct.error) as error:
+        raise WireError(f'cannot encode {message_type}: {error}')
+
+    payload = writer.getvalue()
+    size = _Settings.HEADER.size + len(payload)
+    if size > _Settings.MAX_FRAME_SIZE:
+        raise WireError(f'frame of {size} bytes is too long')
+    header = _Settings.HEADER.pack(type_index, kind, message.get('id') or 0)
+    return _Settings.LENGTH.pack(size) + header + payload
+
+
+def decode_frame(data) -> dict:
+    """
+    the inverse of `encode_frame`, given a frame without its length. the arrays in
+    the message are views of `data`
+    """
+    reader = _Reader(data)
+    try:
+        type_index, kind, request_id = reader.unpack(_Settings.HEADER.format)
+        message_type = _Settings.MESSAGE_TYPES[type_index] if type_index != _Settings.UNKNOWN_TYPE else None
+        message = dict(id=request_id, type=message_type)
+        if kind == _Settings.ERROR:
+            message['error'] = reader.string()
+        elif message_type is None:
+            raise WireError(f'unknown message type {type_index}')
+        elif kind == _Settings.RESULT:
+            message['result'] = _decode_result(reader, message_type)
+        elif kind == _Settings.REQUEST:
+            message['args'] = _decode_request(reader, message_type)
+        else:
+            raise WireError(f'unknown frame kind {kind}')
+        reader.finish()
+    except (IndexError, UnicodeDecodeError, struct.error) as error:
+        raise WireError(f'malformed frame: {error}')
+    return message
@@ -1,28 +1,220 @@
+from collections import OrderedDict, deque
+
+import numpy as np
+
 from .game_state import *
+from .game_state.board import _Settings as _BoardSettings
+from .game_state.hand import _Settings as _HandSettings
+from .game_state.speculation import TurnSpeculator
+from .game_store import GameStore
+
+
+class _Settings:
+    # the snapshots of the last few versions of each game are kept to diff against
+    RENDER_HISTORY = 8
+    ANIMATION_HISTORY = 8
+
+    # the parts of a snapshot that have a value per tile, and are diffed tile by tile.
+    # the rest are lists, sent whole when they change
+    TILE_FIELDS = ['prev_board', 'board', 'debuffs']
+
+    PIECE_KEYS = _BoardSettings.PIECE_KEYS
+    PIECE_COLOURS = _BoardSettings.PIECE_COLOURS
+    CARD_IDS = np.array(_HandSettings.CARD_DATA.index, object)
+    CARD_INDICES = {card_id: i for i, card_id in enumerate(CARD_IDS)}
+
+
+def render_snapshot(game_instance: GameInstance) -> dict:
+    """
+    this function will return everything the client draws as numbers: the board
+    before and after the last move as piece codes, the debuffs on every tile as
+    bitmasks, the tiles the picked piece can move to, each side's cards as indices
+    into the card table and the indices of the cards each side has played or picked
+    """
+    board_manager = game_instance.board_manager
+    hands = game_instance.hand_manager.hands
+    return dict(
+        prev_board=board_manager.prev_board_state.astype(np.int8),
+        board=board_manager.board_state.astype(np.int8),
+        debuffs=board_manager.board_debuffs.kinds.copy(),
+        move_indices=np.asarray(board_manager.piece_move_indices, np.uint8),
+        cards={
+            side: np.array([_Settings.CARD_INDICES[card_id] for card_id in hands[side].cards], np.uint8)
+            for side in [1, -1]
+        },
+        played={
+            side: np.array(list(hands[side].played_cards.keys()) + [hands[side].picked_card_index], np.int8)
+            for side in [1, -1]
+        },
+    )
+
+
+def render_data_from_snapshot(snapshot: dict) -> dict:
+    """
+    the render data the menus draw from, see `BoardManager.get_render_data` and
+    `HandManager.get_render_data`
+    """
+    return dict(
+        board=dict(
+            old_keys=_Settings.PIECE_KEYS[np.abs(snapshot['prev_board'])],
+            old_colors=_Settings.PIECE_COLOURS(snapshot['prev_board']),
+            new_keys=_Settings.PIECE_KEYS[np.abs(snapshot['board'])],
+            new_colors=_Settings.PIECE_COLOURS(snapshot['board']),
+            move_indices=snapshot['move_indices'].astype(np.int64)
+        ),
+        hand=(
+            {side: _Settings.CARD_IDS[snapshot['cards'][side]] for side in [1, -1]},
+            {side: snapshot['played'][side].tolist() for side in [1, -1]}
+        )
+    )
+
+
+def snapshot_diff(old_snapshot: dict, snapshot: dict) -> dict:
+    """
+    this function will return what changed between two snapshots: the tiles that
+    changed, and the lists that changed
+    """
+    diff = {}
+    for field in _Settings.TILE_FIELDS:
+        changed = np.flatnonzero(old_snapshot[field] != snapshot[field])
+        if changed.size:
+            diff[field] = (changed.astype(np.uint8), snapshot[field][changed])
+    if not np.array_equal(old_snapshot['move_indices'], snapshot['move_indices']):
+        diff['move_indices'] = snapshot['move_indices']
+    for field in ['cards', 'played']:
+        for side in [1, -1]:
+            if not np.array_equal(old_snapshot[field][side], snapshot[field][side]):
+                diff.setdefault(field, {})[side] = snapshot[field][side]
+    return diff
+
+
+def apply_snapshot_diff(snapshot: dict, diff: dict) -> dict:
+    """
+    the inverse of `snapshot_diff`, returning a new snapshot rather than changing it
+    """
+    snapshot = dict(snapshot)
+    for field, change in diff.items():
+        if field in _Settings.TILE_FIELDS:
+            tile_indices, values = change
+            snapshot[field] = snapshot[field].copy()
+            snapshot[field][tile_indices] = values
+        elif field == 'move_indices':
+            snapshot[field] = change
+        else:
+            snapshot[field] = {**snapshot[field], **change}
+    return snapshot
+
 
 class Server:
-    def __init__(self):
-        self.games : dict[str, GameInstance] = {}
-    
+    def __init__(self, speculate: bool = True, game_store: GameStore = None, create_on_join: bool = True):
+        # games that have been idle for a while are hibernated to disk, see `GameStore`
+        self.games = GameStore() if game_store is None else game_store
+        self.games.on_hibernate = self._drop_lobby
+        # speculation uses a thread per lobby, so servers hosting many lobbies turn it off
+        self.speculate = speculate
+        # a server inside the client only hosts its own player's lobbies, so joining
+        # a code with no game starts one. servers hosting other players turn this off,
+        # so that joining a code nobody created fails
+        self.create_on_join = create_on_join
+        self.speculators : dict[str, TurnSpeculator] = {}
+        self.render_history : dict[str, OrderedDict] = {}
+        self.render_data : dict[str, tuple] = {}
+        self.animation_history : dict[str, deque] = {}
+
+    def _drop_lobby(self, code: str):
+        # everything kept alongside a game is rebuilt once it is used again
+        if code in self.speculators:
+            self.speculators.pop(code).cancel()
+        self.render_history.pop(code, None)
+        self.render_data.pop(code, None)
+        self.animation_history.pop(code, None)
+
     def validate_code(self, code: str, lobby_type: str):
+        self.games.evict_idle()
         if lobby_type == 'create':
-            ...
-        else:
-            ...
-        self.games[code] = GameInstance()
+            # a code already in use has to be joined instead
+            if code in self.games:
+                return False
+            self._drop_lobby(code)
+            self.games.create(code)
+        elif code not in self.games:
+            if not self.create_on_join:
+                return False
+            self._drop_lobby(code)
+            self.games.create(code)
+        self._start_speculating(code)
         return True
 
+    def _start_speculating(self, code: str):
+        if self.speculate:
+            speculator = self.speculators.setdefault(code, TurnSpeculator())
+            speculator.start(self.games[code])
+
     def hand_event(self, code: str, event_data: dict):
         self.games[code].hand_event(event_data)
-    
+
     def board_event(self, code: str, board_index: int):
         self.games[code].board_event(board_index)
 
     def end_turn(self, code: str):
-        return self.games[code].end_turn()
-    
+        # the next player's tables are swapped in if the move played was worked out ahead of time
+        speculator = self.speculators.get(code)
+        precomputed_turns = None if speculator is None else speculator.take()
+        game_instance = self.games[code]
+        # a turn that fails part way through is undone, so the hands and the board
+        # never get out of step
+        backup = game_instance.copy()
+        try:
+            animations = game_instance.end_turn(precomputed_turns)
+        except Exception:
+            game_instance.board_manager = backup.board_manager
+            game_instance.hand_manager = backup.hand_manager
+            game_instance.version = backup.version
+            self._start_speculating(code)
+            raise
+        self._start_speculating(code)
+        animation_history = self.animation_history.setdefault(code, deque(maxlen=_Settings.ANIMATION_HISTORY))
+        animation_history.append((game_instance.version, animations))
+        return animations
+
+    def get_render_snapshot(self, code: str):
+        # snapshots are only rebuilt when the game has changed since one was last asked for
+        game_instance = self.games[code]
+        render_history = self.render_history.setdefault(code, OrderedDict())
+        if game_instance.version not in render_history:
+            render_history[game_instance.version] = render_snapshot(game_instance)
+            while len(render_history) > _Settings.RENDER_HISTORY:
+                render_history.popitem(last=False)
+        return render_history[game_instance.version]
+
     def get_render_data(self, code: str):
-        return dict(
-            board=self.games[code].board_manager.get_render_data(),
-            hand=self.games[code].hand_manager.get_render_data()
-        )
+        version = self.games[code].version
+        cached_version, render_data = self.render_data.get(code, (None, None))
+        if cached_version != version:
+            render_data = render_data_from_snapshot(self.get_render_snapshot(code))
+            self.render_data[code] = (version, render_data)
+        return render_data
+
+    def get_render_update(self, code: str, version: int = -1):
+        """
+        this function will bring a client's snapshot from the version it last saw
+        up to date. it returns the game's version and either `unchanged`, a `diff`
+        (see `snapshot_diff`) or the `full` snapshot when the client's version is
+        too old to diff against, together with the animations of the turns that
+        ended since
+        """
+        snapshot = self.get_render_snapshot(code)
+        current_version = self.games[code].version
+        if version == current_version:
+            return dict(version=current_version, unchanged=True)
+
+        animations = [
+            animation
+            for animation_version, turn_animations in self.animation_history.get(code, ())
+            if version >= 0 and animation_version > version
+            for animation in turn_animations
+        ]
+        old_snapshot = self.render_history.get(code, {}).get(version)
+        if old_snapshot is None:
+            return dict(version=current_version, full=snapshot, animations=animations)
+        return dict(version=current_version, diff=snapshot_diff(old_snapshot, snapshot), animations=animations)
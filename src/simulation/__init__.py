@@ -0,0 +1 @@
+from .selfplay import *
@@ -0,0 +1,4 @@
+from .selfplay import main
+
+
+main()
@@ -0,0 +1,308 @@
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from ..game_state.board import _Settings as _BoardSettings
+from ..game_state.hand import _Settings as _HandSettings
+from .selfplay import play_games, chunk_ranges, _Settings as _SelfPlaySettings
+
+
+class _Settings:
+    CHUNK_SIZE = 256
+    # chunks queued per worker, which bounds the memory used by results waiting to be merged
+    PENDING_PER_WORKER = 4
+
+    # the columns that can be overridden, and how to read them from the command line
+    OVERRIDE_COLUMNS = dict(rarity=int, speed=int, debuffs=str, debuff_length=int)
+    # displace debuffs also say which way and how far, see `displace_spell_effect`
+    DISPLACE = re.compile(r'displace (forward|backward|random)\d|displace anywhere')
+
+    # z score of the confidence intervals
+    Z = 1.96
+
+
+def apply_overrides(card_data: pd.DataFrame, overrides: dict) -> pd.DataFrame:
+    """
+    this function will return a copy of the card data with some of its columns
+    changed, given as {card id: {column: value}}
+    """
+    card_data = card_data.copy()
+    for card_id, columns in overrides.items():
+        if card_id not in card_data.index:
+            raise ValueError(f'unknown card {card_id}')
+        for column, value in columns.items():
+            if column not in _Settings.OVERRIDE_COLUMNS:
+                raise ValueError(f'{column} cannot be overridden, only {", ".join(_Settings.OVERRIDE_COLUMNS)}')
+            value = _Settings.OVERRIDE_COLUMNS[column](value)
+            if column == 'debuffs':
+                _check_debuff(value)
+            card_data.loc[card_id, column] = value
+    return card_data
+
+
+def _check_debuff(debuff: str):
+    kind = _BoardSettings.debuff_kind(debuff)
+    if kind not in _BoardSettings.DEBUFF_KINDS or (kind == 'displace' and not _Settings.DISPLACE.fullmatch(debuff)):
+        raise ValueError(
+            f'unknown debuff {debuff}, only {", ".join(_BoardSettings.DEBUFF_KINDS)}, '
+            f'with displace given as e.g. `displace forward1` or `displace anywhere`'
+        )
+
+
+def parse_overrides(overrides: list[str]) -> dict:
+    """
+    parses overrides given as `card:column=value`, e.g. `accio:rarity=5`
+    """
+    parsed = {}
+    for override in overrides:
+        card_id, assignment = override.split(':', 1)
+        column, value = assignment.split('=', 1)
+        parsed.setdefault(card_id.strip(), {})[column.strip()] = value.strip()
+    return parsed
+
+
+class BalanceCounters:
+    """
+    running totals over games, enough to get means and confidence intervals
+    without keeping the games. counters from different workers are merged by
+    adding them together. a side scores 1 for a win, 0.5 for a draw and 0 for a
+    loss, and a card counts as played by a side if it was played at least once
+    """
+    COUNTERS = ['games', 'white_score', 'white_score_sq', 'turns', 'turns_sq', 'reasons']
+    CARD_COUNTERS = [
+        'plays', 'played_sides', 'played_score', 'played_score_sq',
+        'played_games', 'played_turns', 'played_turns_sq'
+    ]
+
+    def __init__(self, n_cards: int):
+        for name in BalanceCounters.COUNTERS:
+            setattr(self, name, 0.0)
+        self.reasons = np.zeros(len(_SelfPlaySettings.REASONS))
+        for name in BalanceCounters.CARD_COUNTERS:
+            setattr(self, name, np.zeros(n_cards))
+
+    def add_results(self, results: np.ndarray):
+        """
+        this function will add the results of games played by `selfplay.play_games`
+        """
+        turns = results['turns'].astype(np.float64)
+        # scores of white then black, as (games, 2)
+        scores = np.stack([
+            np.where(results['winner'] == 0, 0.5, results['winner'] == side)
+            for side in [1, -1]
+        ], axis=1)
+        cards_played = results['cards_played'].astype(np.float64)
+        played = cards_played > 0
+
+        self.games += results.size
+        self.white_score += np.sum(scores[:, 0])
+        self.white_score_sq += np.sum(scores[:, 0] ** 2)
+        self.turns += np.sum(turns)
+        self.turns_sq += np.sum(turns ** 2)
+        self.reasons += np.bincount(results['reason'], minlength=self.reasons.size)
+
+        self.plays += np.sum(cards_played, axis=(0, 1))
+        self.played_sides += np.sum(played, axis=(0, 1))
+        self.played_score += np.einsum('gs,gsc->c', scores, played)
+        self.played_score_sq += np.einsum('gs,gsc->c', scores ** 2, played)
+        played_games = np.any(played, axis=1)
+        self.played_games += np.sum(played_games, axis=0)
+        self.played_turns += turns @ played_games
+        self.played_turns_sq += turns ** 2 @ played_games
+
+    def merge(self, other: 'BalanceCounters'):
+        for name in BalanceCounters.COUNTERS + BalanceCounters.CARD_COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+def _mean_interval(total, total_sq, count):
+    """
+    the mean and the half width of its confidence interval from running sums
+    """
+    count = np.asarray(count, np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(count > 0, total / count, np.nan)
+        variance = np.where(count > 1, (total_sq - count * mean ** 2) / (count - 1), np.nan)
+        half_width = _Settings.Z * np.sqrt(np.maximum(variance, 0) / count)
+    return mean, half_width
+
+
+def report(counters: BalanceCounters, card_ids: list) -> dict:
+    """
+    this function will turn counters into statistics per card: the share of sides
+    that played it, how often it is played per game, the score of sides that
+    played it against sides that did not, and the length of games it was played in
+    """
+    sides = 2 * counters.games
+    # every game hands out exactly one point between the two sides
+    total_score, total_score_sq = counters.games, counters.white_score_sq + (
+        counters.games - 2 * counters.white_score + counters.white_score_sq
+    )
+
+    play_rate = counters.played_sides / max(sides, 1)
+    play_rate_interval = _Settings.Z * np.sqrt(play_rate * (1 - play_rate) / max(sides, 1))
+    score, score_interval = _mean_interval(counters.played_score, counters.played_score_sq, counters.played_sides)
+    other_score, other_score_interval = _mean_interval(
+        total_score - counters.played_score,
+        total_score_sq - counters.played_score_sq,
+        sides - counters.played_sides
+    )
+    turns, turns_interval = _mean_interval(counters.played_turns, counters.played_turns_sq, counters.played_games)
+    mean_turns, mean_turns_interval = _mean_interval(counters.turns, counters.turns_sq, counters.games)
+    white_score, white_score_interval = _mean_interval(counters.white_score, counters.white_score_sq, counters.games)
+
+    def interval(mean, half_width):
+        return [float(mean), float(half_width)]
+
+    cards = {
+        card_id: dict(
+            play_rate=interval(play_rate[i], play_rate_interval[i]),
+            plays_per_game=float(counters.plays[i] / max(counters.games, 1)),
+            score=interval(score[i], score_interval[i]),
+            score_contribution=interval(
+                score[i] - other_score[i],
+                np.hypot(score_interval[i], other_score_interval[i])
+            ),
+            mean_turns=interval(turns[i], turns_interval[i]),
+        )
+        for i, card_id in enumerate(card_ids)
+    }
+    return dict(
+        games=int(counters.games),
+        white_score=interval(white_score, white_score_interval),
+        mean_turns=interval(mean_turns, mean_turns_interval),
+        reasons={reason: int(count) for reason, count in zip(_SelfPlaySettings.REASONS, counters.reasons)},
+        cards=cards,
+    )
+
+
+def _without_nan(value):
+    """
+    json has no nan, so statistics of cards that were never played are written as null
+    """
+    if isinstance(value, dict):
+        return {key: _without_nan(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_without_nan(item) for item in value]
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _init_worker(card_data: pd.DataFrame):
+    _HandSettings.set_card_data(card_data)
+
+
+def _play_chunk(game_indices: range, max_turns: int, seed: int, cast_probability: float) -> BalanceCounters:
+    player = ('random', dict(cast_probability=cast_probability))
+    counters = BalanceCounters(len(_HandSettings.CARD_DATA))
+    counters.add_results(play_games(game_indices, player, player, max_turns, seed))
+    return counters
+
+
+def run_balance(
+    n_games: int,
+    overrides: dict = None,
+    card_data: pd.DataFrame = None,
+    max_turns: int = _SelfPlaySettings.MAX_TURNS,
+    cast_probability: float = _SelfPlaySettings.CAST_PROBABILITY,
+    max_workers: int = None,
+    seed: int = 0,
+    chunk_size: int = _Settings.CHUNK_SIZE,
+    progress=None
+) -> dict:
+    """
+    this function will play `n_games` games between random players across a pool
+    of processes, with the given card data and overrides, and report statistics
+    per card, see `report`. workers send back counters for each chunk of games
+    rather than the games, and only a few chunks are queued at a time, so the
+    memory used does not grow with the number of games
+    """
+    card_data = _HandSettings.CARD_DATA if card_data is None else card_data
+    _HandSettings.check_card_ids(card_data)
+    card_data = apply_overrides(card_data, overrides or {})
+    counters = BalanceCounters(len(card_data))
+    chunks = iter(chunk_ranges(n_games, chunk_size))
+
+    max_workers = max_workers or os.cpu_count()
+    max_pending = _Settings.PENDING_PER_WORKER * max_workers
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(card_data,)) as executor:
+        pending = set()
+        while True:
+            for chunk in chunks:
+                pending.add(executor.submit(_play_chunk, chunk, max_turns, seed, cast_probability))
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                counters.merge(future.result())
+            if progress is not None:
+                progress(int(counters.games), n_games)
+
+    return report(counters, list(card_data.index))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='play random games to measure how each card affects the result')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--cards', default='./assets/cards/card_data.csv', help='the card data to play with')
+    parser.add_argument(
+        '--override', action='append', default=[],
+        help=f'change a card, e.g. `accio:rarity=5`. columns: {", ".join(_Settings.OVERRIDE_COLUMNS)}'
+    )
+    parser.add_argument('--max-turns', type=int, default=_SelfPlaySettings.MAX_TURNS)
+    parser.add_argument('--cast-probability', type=float, default=_SelfPlaySettings.CAST_PROBABILITY)
+    parser.add_argument('--workers', type=int, help='number of processes, defaults to the number of cpus')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write the report to this file, `-` for stdout')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        results = run_balance(
+            args.games,
+            parse_overrides(args.override),
+            pd.read_csv(args.cards, index_col=0),
+            args.max_turns,
+            args.cast_probability,
+            args.workers,
+            args.seed,
+            progress=lambda done, total: print(f'\r{done}/{total} games', end='', flush=True)
+        )
+    except ValueError as error:
+        parser.error(str(error))
+    seconds = time.perf_counter() - start
+    print()
+
+    if args.json == '-':
+        print(json.dumps(_without_nan(results), indent=2, allow_nan=False))
+        return
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(_without_nan(results), file, indent=2, allow_nan=False)
+
+    print(f'{results["games"]} games in {seconds:.1f}s')
+    print(f'white score {results["white_score"][0]:.3f} ±{results["white_score"][1]:.3f}  '
+          f'mean turns {results["mean_turns"][0]:.1f} ±{results["mean_turns"][1]:.1f}')
+    print(f'{"card":<24}{"play rate":>18}{"plays/game":>12}{"score":>18}{"contribution":>18}{"turns":>16}')
+    for card_id, card in sorted(results['cards'].items(), key=lambda item: -np.nan_to_num(item[1]['score_contribution'][0])):
+        print(
+            f'{card_id:<24}'
+            f'{card["play_rate"][0]:>10.3f} ±{card["play_rate"][1]:.3f}'
+            f'{card["plays_per_game"]:>12.2f}'
+            f'{card["score"][0]:>10.3f} ±{card["score"][1]:.3f}'
+            f'{card["score_contribution"][0]:>+10.3f} ±{card["score_contribution"][1]:.3f}'
+            f'{card["mean_turns"][0]:>9.1f} ±{card["mean_turns"][1]:.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
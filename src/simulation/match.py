@@ -0,0 +1,365 @@
+import argparse
+import ast
+import itertools
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+
+import numpy as np
+
+from ..game_state import GameInstance
+from .selfplay import make_player, game_result, game_seeds, _Settings as _SelfPlaySettings
+
+
+class _Settings:
+    MAX_TURNS = _SelfPlaySettings.MAX_TURNS
+    GAMES_PER_PAIR = 10
+
+    # z score of the error bars
+    Z = 1.96
+    ELO_SCALE = 400 / np.log(10)
+    # iterations of the rating fit, and the scores a rating is clipped to so that
+    # a player who won or lost every game has a finite one
+    FIT_ITERATIONS = 200
+    MIN_SCORE = 1e-3
+
+    # how often the parent checks its workers are still alive while it waits for
+    # a result
+    POLL_INTERVAL = 5.0
+
+
+def turn_events(side: int, turn: tuple) -> list:
+    """
+    this function will turn a (piece index, new piece index, card index, target
+    index) turn into the events a player would input for it, see `apply_events`
+    """
+    piece_index, new_piece_index, card_index, target_index = turn
+    events = []
+    if card_index != -1:
+        events.append(('hand', {'side': side, 'card_index': card_index}))
+        events.append(('hand', {'side': side, 'board_index': target_index}))
+    if piece_index != -1:
+        events.append(('board', piece_index))
+        events.append(('board', new_piece_index))
+    return events
+
+
+def apply_events(game_instance: GameInstance, events: list):
+    """
+    inputs events, given as ('hand', hand event data) or ('board', board index),
+    the same way the client would
+    """
+    for event_type, event_data in events:
+        if event_type == 'hand':
+            game_instance.hand_event(event_data)
+        elif event_type == 'board':
+            game_instance.board_event(event_data)
+        else:
+            raise ValueError(f'unknown event type {event_type}')
+
+
+class PlayerPolicy:
+    """
+    a policy that plays the turns chosen by a player, such as `SearchAI` or
+    `selfplay.RandomPlayer`
+    """
+    def __init__(self, player):
+        self.player = player
+
+    def __call__(self, game_instance: GameInstance) -> list:
+        side = game_instance.hand_manager.side_to_play
+        return turn_events(side, self.player.choose_turn(game_instance))
+
+
+def make_policy(entrant, rng: np.random.Generator):
+    """
+    builds a policy from a player given the same way as to `selfplay.make_player`.
+    anything else is taken to be a policy already: a callable that takes a game
+    and returns the events of its turn. policies are sent to worker processes, so
+    they have to be picklable
+    """
+    if isinstance(entrant, (str, tuple)):
+        return PlayerPolicy(make_player(entrant, rng))
+    return entrant
+
+
+def play_match_game(white_policy, black_policy, seed: int, max_turns: int = _Settings.MAX_TURNS) -> dict:
+    """
+    this function will play one game between two policies and return the winning
+    side (0 for a draw), how the game ended, the number of turns and the time each
+    side spent choosing its turns
+    """
+    np.random.seed(seed)
+    policies = {1: white_policy, -1: black_policy}
+    seconds = {1: 0.0, -1: 0.0}
+    game_instance = GameInstance()
+    winner, reason = 0, 'max_turns'
+    turns = 0
+    while True:
+        ended = game_result(game_instance)
+        if ended is not None:
+            winner, reason = ended
+            break
+        if turns == max_turns:
+            break
+        side = game_instance.board_manager.side_to_move
+        start = time.perf_counter()
+        events = policies[side](game_instance)
+        seconds[side] += time.perf_counter() - start
+        apply_events(game_instance, events)
+        game_instance.end_turn()
+        turns += 1
+    return dict(winner=winner, reason=reason, turns=turns, seconds=seconds)
+
+
+def round_robin(names: list, games_per_pair: int = _Settings.GAMES_PER_PAIR) -> list[tuple]:
+    """
+    every entrant plays every other, with colours alternating between games
+    """
+    return [
+        (white, black) if game % 2 == 0 else (black, white)
+        for white, black in itertools.combinations(names, 2)
+        for game in range(games_per_pair)
+    ]
+
+
+def gauntlet(challenger, opponents: list, games_per_pair: int = _Settings.GAMES_PER_PAIR) -> list[tuple]:
+    """
+    the challenger plays every opponent, with colours alternating between games
+    """
+    return [
+        (challenger, opponent) if game % 2 == 0 else (opponent, challenger)
+        for opponent in opponents
+        for game in range(games_per_pair)
+    ]
+
+
+def _worker(entrants: dict, tasks, results, max_turns: int):
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        game_index, white, black, seed = task
+        try:
+            white_policy = make_policy(entrants[white], np.random.default_rng([seed, 0]))
+            black_policy = make_policy(entrants[black], np.random.default_rng([seed, 1]))
+            result = play_match_game(white_policy, black_policy, seed, max_turns)
+        except Exception:
+            # policies are plugged in, so one that raises is sent back to be raised
+            # by the parent rather than leaving it waiting for the result
+            results.put(dict(game=game_index, white=white, black=black, error=traceback.format_exc()))
+            continue
+        results.put(dict(game=game_index, white=white, black=black, **result))
+
+
+def _get_result(results, workers: list) -> dict:
+    while True:
+        try:
+            result = results.get(timeout=_Settings.POLL_INTERVAL)
+        except queue.Empty:
+            # a worker that crashed, e.g. was killed, never sends its result
+            exitcodes = [worker.exitcode for worker in workers if not worker.is_alive()]
+            if any(exitcodes) or len(exitcodes) == len(workers):
+                raise RuntimeError(f'match workers stopped before sending every result, exit codes {exitcodes}')
+            continue
+        if 'error' in result:
+            raise RuntimeError(f'game {result["game"]}, {result["white"]} against {result["black"]}, failed:\n{result["error"]}')
+        return result
+
+
+class MatchTable:
+    """
+    the results of a match so far, kept as the points and games of every pair of
+    entrants. ratings are refitted from them whenever they are asked for
+    """
+    def __init__(self, names: list):
+        self.names = list(names)
+        self.indices = {name: i for i, name in enumerate(self.names)}
+        n_names = len(self.names)
+        # points[i, j] is what i scored against j, points_sq the sum of their squares
+        self.points = np.zeros((n_names, n_names))
+        self.points_sq = np.zeros((n_names, n_names))
+        self.games = np.zeros((n_names, n_names))
+        self.seconds = np.zeros(n_names)
+        self.turns = np.zeros(n_names)
+
+    def add_result(self, result: dict):
+        white, black = self.indices[result['white']], self.indices[result['black']]
+        white_score = 0.5 if result['winner'] == 0 else float(result['winner'] == 1)
+        for i, j, score in [(white, black, white_score), (black, white, 1 - white_score)]:
+            self.points[i, j] += score
+            self.points_sq[i, j] += score ** 2
+            self.games[i, j] += 1
+        # white moves on the even turns
+        self.turns[white] += (result['turns'] + 1) // 2
+        self.turns[black] += result['turns'] // 2
+        self.seconds[white] += result['seconds'][1]
+        self.seconds[black] += result['seconds'][-1]
+
+    def ratings(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        this function will fit elo ratings to every game played so far, counting
+        draws as half a win each (a bradley terry fit), and return them with their
+        error bars. ratings average to 0
+        """
+        n_names = len(self.names)
+        games = self.games.sum(axis=1)
+        points = np.clip(self.points.sum(axis=1), _Settings.MIN_SCORE, games - _Settings.MIN_SCORE)
+        strengths = np.ones(n_names)
+        for _ in range(_Settings.FIT_ITERATIONS):
+            denominators = (self.games / (strengths[:, None] + strengths[None, :])).sum(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                strengths = np.where(denominators > 0, points / denominators, strengths)
+            strengths /= np.exp(np.mean(np.log(strengths)))
+        ratings = _Settings.ELO_SCALE * np.log(strengths)
+
+        expected = strengths[:, None] / (strengths[:, None] + strengths[None, :])
+        information = (self.games * expected * (1 - expected)).sum(axis=1) / _Settings.ELO_SCALE ** 2
+        with np.errstate(divide='ignore'):
+            errors = _Settings.Z / np.sqrt(information)
+        return ratings, errors
+
+    def pair(self, first, second) -> dict:
+        """
+        the score of the first entrant against the second, and the elo difference
+        it implies, with error bars
+        """
+        i, j = self.indices[first], self.indices[second]
+        games = self.games[i, j]
+        if games == 0:
+            return dict(games=0, score=[np.nan, np.nan], elo=[np.nan, np.nan, np.nan])
+        score = self.points[i, j] / games
+        variance = self.points_sq[i, j] / games - score ** 2
+        error = _Settings.Z * np.sqrt(variance / games)
+        elo = [_elo_difference(score - error), _elo_difference(score), _elo_difference(score + error)]
+        return dict(games=int(games), score=[float(score), float(error)], elo=elo)
+
+    def standings(self) -> list[dict]:
+        ratings, errors = self.ratings()
+        games = self.games.sum(axis=1)
+        return sorted([
+            dict(
+                name=name,
+                elo=float(ratings[i]),
+                error=float(errors[i]),
+                games=int(games[i]),
+                score=float(self.points[i].sum() / games[i]) if games[i] else np.nan,
+                seconds_per_turn=float(self.seconds[i] / self.turns[i]) if self.turns[i] else np.nan,
+            )
+            for i, name in enumerate(self.names)
+        ], key=lambda standing: -standing['elo'])
+
+
+def _elo_difference(score: float) -> float:
+    score = np.clip(score, _Settings.MIN_SCORE, 1 - _Settings.MIN_SCORE)
+    return float(-400 * np.log10(1 / score - 1))
+
+
+def run_matches(
+    entrants: dict,
+    schedule: list[tuple],
+    max_workers: int = None,
+    seed: int = 0,
+    max_turns: int = _Settings.MAX_TURNS,
+    progress=None
+) -> MatchTable:
+    """
+    this function will play the games of a schedule, given as (white, black) pairs
+    of entrant names, across worker processes. entrants map names to policies, see
+    `make_policy`. the games are put on a queue that every worker takes from, and
+    results are added to the table as they come in, calling `progress(table,
+    result)` after each one. a game whose policy raises, or a worker that dies,
+    raises a `RuntimeError`
+    """
+    table = MatchTable(entrants)
+    seeds = game_seeds(range(len(schedule)), seed)
+    tasks = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    for game_index, (white, black) in enumerate(schedule):
+        tasks.put((game_index, white, black, int(seeds[game_index])))
+
+    max_workers = min(max_workers or os.cpu_count(), max(len(schedule), 1))
+    for _ in range(max_workers):
+        tasks.put(None)
+    workers = [
+        multiprocessing.Process(target=_worker, args=(entrants, tasks, results, max_turns), daemon=True)
+        for _ in range(max_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for _ in range(len(schedule)):
+            result = _get_result(results, workers)
+            table.add_result(result)
+            if progress is not None:
+                progress(table, result)
+    finally:
+        for worker in workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+    return table
+
+
+def parse_entrant(entrant: str):
+    """
+    parses an entrant given as `name=player:key=value,key=value`, e.g.
+    `fast=search:time_budget=0.1,max_depth=4`
+    """
+    name, player = entrant.split('=', 1)
+    player, _, arguments = player.partition(':')
+    kwargs = {}
+    for argument in filter(None, arguments.split(',')):
+        key, value = argument.split('=', 1)
+        kwargs[key.strip()] = ast.literal_eval(value.strip())
+    return name.strip(), (player.strip(), kwargs)
+
+
+def _print_standings(table: MatchTable):
+    print(f'{"name":<16}{"elo":>16}{"games":>8}{"score":>8}{"s/turn":>10}')
+    for standing in table.standings():
+        print(
+            f'{standing["name"]:<16}{standing["elo"]:>8.0f} ±{standing["error"]:<6.0f}'
+            f'{standing["games"]:>8}{standing["score"]:>8.3f}{standing["seconds_per_turn"]:>10.3f}'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='play matches between computer players and rate them')
+    parser.add_argument(
+        '--entrant', action='append', required=True,
+        help='a player as `name=player:key=value,...`, e.g. `fast=search:time_budget=0.1`'
+    )
+    parser.add_argument('--gauntlet', help='the entrant to play everyone else, instead of a round robin')
+    parser.add_argument('--games', type=int, default=_Settings.GAMES_PER_PAIR, help='games per pair of entrants')
+    parser.add_argument('--max-turns', type=int, default=_Settings.MAX_TURNS)
+    parser.add_argument('--workers', type=int, help='number of processes, defaults to the number of cpus')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    entrants = dict(parse_entrant(entrant) for entrant in args.entrant)
+    if args.gauntlet:
+        schedule = gauntlet(args.gauntlet, [name for name in entrants if name != args.gauntlet], args.games)
+    else:
+        schedule = round_robin(list(entrants), args.games)
+
+    def progress(table, result):
+        games = int(table.games.sum() // 2)
+        standings = '  '.join(
+            f'{standing["name"]} {standing["elo"]:+.0f} ±{standing["error"]:.0f}' for standing in table.standings()
+        )
+        print(f'{games}/{len(schedule)} games  {standings}', flush=True)
+
+    table = run_matches(entrants, schedule, args.workers, args.seed, args.max_turns, progress)
+    _print_standings(table)
+    for first, second in itertools.combinations(entrants, 2):
+        pair = table.pair(first, second)
+        if pair['games']:
+            low, elo, high = pair['elo']
+            print(f'{first} vs {second}: {pair["score"][0]:.3f} ±{pair["score"][1]:.3f} ({elo:+.0f}, {low:+.0f} to {high:+.0f} elo)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ..game_state import GameInstance
+from ..game_state.board import _Settings as _BoardSettings
+from ..game_state.hand import _Settings as _HandSettings
+from ..ai.search import SearchAI, apply_turn, _cast_targets
+
+
+class _Settings:
+    MAX_TURNS = 200
+    CHUNK_SIZE = 64
+
+    # the chance a random player casts a spell on a turn it has one to cast
+    CAST_PROBABILITY = 0.5
+
+    CARD_IDS = list(_HandSettings.CARD_DATA.index)
+    CARD_INDICES = {card_id: i for i, card_id in enumerate(CARD_IDS)}
+
+    # how a game ended. a game still going after the turn limit is a draw
+    REASONS = ['max_turns', 'king_captured', 'checkmate', 'stalemate']
+
+    # one row per game. cards played are counted per card for white then black
+    RESULT_DTYPE = np.dtype([
+        ('game', '<u4'),
+        ('seed', '<u4'),
+        ('winner', 'i1'),
+        ('reason', 'u1'),
+        ('turns', '<u2'),
+        ('cards_played', '<u2', (2, len(CARD_IDS))),
+    ])
+
+
+class RandomPlayer:
+    """
+    plays a uniformly random legal move, and sometimes casts a random spell from
+    its hand on one of the targets the search would consider for it
+    """
+    def __init__(self, rng: np.random.Generator = None, cast_probability: float = _Settings.CAST_PROBABILITY):
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.cast_probability = cast_probability
+
+    def choose_turn(self, game_instance: GameInstance) -> tuple:
+        board_manager = game_instance.board_manager
+        side = board_manager.side_to_move
+
+        moves = [
+            (piece_index, int(new_piece_index))
+            for piece_index, piece_move_indices in board_manager.get_legal_move_table().items()
+            for new_piece_index in piece_move_indices
+        ]
+        move = moves[self.rng.integers(len(moves))] if moves else (-1, -1)
+
+        cards = game_instance.hand_manager.hands[side].cards
+        if len(cards) and self.rng.random() < self.cast_probability:
+            card_index = int(self.rng.integers(len(cards)))
+            debuffs = _HandSettings.CARD_PLAY_PARAMS[cards[card_index]]['debuffs']
+            target_indices = _cast_targets(board_manager.board_state, side, debuffs)
+            if target_indices.size:
+                return (*move, card_index, int(target_indices[self.rng.integers(target_indices.size)]))
+        return (*move, -1, -1)
+
+
+# players are given to `simulate` by name, with keyword arguments for their constructor
+PLAYERS = {
+    'random': lambda rng, **kwargs: RandomPlayer(rng, **kwargs),
+    'search': lambda rng, **kwargs: SearchAI(**kwargs),
+}
+
+
+def make_player(player, rng: np.random.Generator):
+    """
+    builds a player from its name, or from a (name, keyword arguments) pair
+    """
+    name, kwargs = (player, {}) if isinstance(player, str) else player
+    return PLAYERS[name](rng, **kwargs)
+
+
+def game_result(game_instance: GameInstance):
+    """
+    the winning side (0 for a draw) and the reason the game ended, or None if the
+    game is still going
+    """
+    board_manager = game_instance.board_manager
+    side = board_manager.side_to_move
+    king = _BoardSettings.PIECE_MAP['k']
+    if not np.any(board_manager.board_state == side * king):
+        return -side, 'king_captured'
+    if not np.any(board_manager.board_state == -side * king):
+        return side, 'king_captured'
+    if not board_manager.has_legal_move():
+        if board_manager.in_check():
+            return -side, 'checkmate'
+        return 0, 'stalemate'
+    return None
+
+
+def play_game(white, black, seed: int, max_turns: int = _Settings.MAX_TURNS) -> np.void:
+    """
+    this function will play one game between two players with no graphics and
+    return its result as a row of `RESULT_DTYPE`. the seed decides both the
+    players' choices and the game's random effects, which go through numpy's
+    global random state
+    """
+    np.random.seed(seed)
+    rng = np.random.default_rng(seed)
+    players = {1: make_player(white, rng), -1: make_player(black, rng)}
+
+    result = np.zeros((), _Settings.RESULT_DTYPE)
+    result['seed'] = seed
+    game_instance = GameInstance()
+    winner, reason = 0, 'max_turns'
+    for turn_number in range(max_turns):
+        ended = game_result(game_instance)
+        if ended is not None:
+            winner, reason = ended
+            break
+        side = game_instance.board_manager.side_to_move
+        turn = players[side].choose_turn(game_instance)
+        _, _, card_index, _ = turn
+        if card_index != -1:
+            card_id = game_instance.hand_manager.hands[side].cards[card_index]
+            result['cards_played'][0 if side == 1 else 1, _Settings.CARD_INDICES[card_id]] += 1
+        apply_turn(game_instance, turn)
+        game_instance.end_turn()
+        result['turns'] = turn_number + 1
+    else:
+        ended = game_result(game_instance)
+        if ended is not None:
+            winner, reason = ended
+
+    result['winner'] = winner
+    result['reason'] = _Settings.REASONS.index(reason)
+    return result
+
+
+def game_seeds(game_indices, seed: int = 0) -> np.ndarray:
+    """
+    the seed of every game, which only depends on the seed given and the game's
+    index, not on how the games are split between workers
+    """
+    return np.array([
+        np.random.SeedSequence([seed, game_index]).generate_state(1)[0]
+        for game_index in game_indices
+    ], np.uint32)
+
+
+def play_games(game_indices, white, black, max_turns: int = _Settings.MAX_TURNS, seed: int = 0) -> np.ndarray:
+    results = np.zeros(len(game_indices), _Settings.RESULT_DTYPE)
+    for i, (game_index, game_seed) in enumerate(zip(game_indices, game_seeds(game_indices, seed))):
+        results[i] = play_game(white, black, int(game_seed), max_turns)
+        results[i]['game'] = game_index
+    return results
+
+
+def chunk_ranges(n_games: int, chunk_size: int) -> list[range]:
+    return [range(start, min(start + chunk_size, n_games)) for start in range(0, n_games, chunk_size)]
+
+
+def simulate(
+    n_games: int,
+    white='random',
+    black='random',
+    max_turns: int = _Settings.MAX_TURNS,
+    max_workers: int = None,
+    seed: int = 0,
+    chunk_size: int = _Settings.CHUNK_SIZE
+) -> np.ndarray:
+    """
+    this function will play `n_games` games across a pool of processes and return
+    one row of `RESULT_DTYPE` per game, in order. games are sent to workers in
+    chunks so that the cost of starting a task is shared between many games
+    """
+    chunks = chunk_ranges(n_games, chunk_size)
+    if max_workers == 1:
+        results = [play_games(chunk, white, black, max_turns, seed) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = [executor.submit(play_games, chunk, white, black, max_turns, seed) for chunk in chunks]
+            results = [future.result() for future in futures]
+    return np.concatenate(results or [np.zeros(0, _Settings.RESULT_DTYPE)])
+
+
+def summarize(results: np.ndarray) -> dict:
+    n_games = max(results.size, 1)
+    return dict(
+        games=int(results.size),
+        white_wins=int(np.sum(results['winner'] == 1)) / n_games,
+        black_wins=int(np.sum(results['winner'] == -1)) / n_games,
+        draws=int(np.sum(results['winner'] == 0)) / n_games,
+        mean_turns=float(np.mean(results['turns'])) if results.size else 0.0,
+        reasons={
+            reason: int(np.sum(results['reason'] == i))
+            for i, reason in enumerate(_Settings.REASONS)
+        },
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='play games between computer players with no graphics')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--white', default='random', choices=list(PLAYERS))
+    parser.add_argument('--black', default='random', choices=list(PLAYERS))
+    parser.add_argument('--time-budget', type=float, default=0.1, help='seconds per turn for search players')
+    parser.add_argument(
+        '--max-depth', type=int,
+        help='search players search to this depth with no time budget, so their games can be reproduced'
+    )
+    parser.add_argument('--max-turns', type=int, default=_Settings.MAX_TURNS)
+    parser.add_argument('--workers', type=int, help='number of processes, defaults to the number of cpus')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results to this `.npy` file')
+    args = parser.parse_args()
+
+    # a time budget stops the search at a depth that depends on how busy the machine is
+    search_kwargs = (
+        dict(time_budget=np.inf, max_depth=args.max_depth) if args.max_depth else dict(time_budget=args.time_budget)
+    )
+    players = [(name, search_kwargs) if name == 'search' else name for name in [args.white, args.black]]
+    start = time.perf_counter()
+    results = simulate(args.games, *players, args.max_turns, args.workers, args.seed)
+    seconds = time.perf_counter() - start
+
+    if args.output:
+        np.save(args.output, results)
+    summary = summarize(results)
+    print(f'{summary["games"]} games in {seconds:.1f}s ({summary["games"] / seconds:.1f} games/s)')
+    print(
+        f'white {summary["white_wins"]:.1%}  black {summary["black_wins"]:.1%}  '
+        f'draw {summary["draws"]:.1%}  mean turns {summary["mean_turns"]:.1f}'
+    )
+    print(', '.join(f'{reason} {count}' for reason, count in summary['reasons'].items()))
+
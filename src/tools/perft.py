@@ -0,0 +1,244 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from ..game_state.board import BoardManager, _Settings as _BoardSettings
+from ..game_state.bitboard import (
+    AttackMap, BitboardPosition,
+    calculate_can_pickup, calculate_legal_moves, calculate_move_rights,
+    indices_from_mask
+)
+
+
+class _Settings:
+    KIWIPETE = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R 1 1111 -1'
+
+    # positions are given in `BoardManager._init_from_string` notation. debuffs are
+    # permanent and given as debuff name to the tiles they are on
+    POSITIONS = [
+        dict(name='start', position='rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR 1 1111 -1', debuffs={}),
+        dict(name='kiwipete', position=KIWIPETE, debuffs={}),
+        dict(name='endgame', position='8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 1 0000 -1', debuffs={}),
+        dict(name='en_passant', position='4k3/8/8/8/2pP4/8/8/4K2R -1 1000 43', debuffs={}),
+        dict(name='destroy', position=KIWIPETE, debuffs=dict(destroy=[18, 29, 38, 44])),
+        dict(name='shrink', position=KIWIPETE, debuffs=dict(shrink=[28, 45])),
+        dict(name='stationary', position=KIWIPETE, debuffs=dict(stationary=[12, 28])),
+        dict(name='control', position=KIWIPETE, debuffs=dict(control=[14, 21])),
+        dict(name='mixed', position=KIWIPETE, debuffs=dict(
+            destroy=[18, 44], shrink=[45], stationary=[12], control=[14]
+        )),
+    ]
+
+
+def load_position(position: str, debuffs: dict) -> BoardManager:
+    board_manager = BoardManager()
+    board_manager._init_from_string(position)
+    for debuff_name, tile_indices in debuffs.items():
+        for tile_index in tile_indices:
+            board_manager.add_debuff(tile_index, debuff_name, -1)
+    return board_manager
+
+
+def parse_debuffs(debuffs: str) -> dict:
+    """
+    parses debuffs given as `name:index,index;name:index`, e.g. `destroy:19,20;shrink:52`
+    """
+    parsed = {}
+    for entry in filter(None, debuffs.split(';')):
+        debuff_name, tile_indices = entry.split(':')
+        parsed[debuff_name.strip()] = [int(tile_index) for tile_index in tile_indices.split(',')]
+    return parsed
+
+
+def _reference_legal_moves(
+    board_state: np.ndarray,
+    board_debuffs: 'BoardDebuffs',
+    piece_index: int,
+    side_to_move: int,
+    en_passant: int,
+    castling_privileges: list
+):
+    piece_move_indices = _BoardSettings.calculate_piece_move_indices(
+        board_state, board_debuffs, piece_index, side_to_move, en_passant, castling_privileges, False
+    ).astype(int)
+    piece_move_indices = _BoardSettings.filter_out_illegal_moves(
+        board_state, board_debuffs, piece_index, side_to_move, en_passant, castling_privileges, piece_move_indices
+    )
+    if board_debuffs.tile_has_debuff(piece_index, 'shrink'):
+        piece_move_indices = piece_move_indices[board_state[piece_move_indices] == 0]
+        if np.abs(board_state[piece_index]) == _BoardSettings.PIECE_MAP['p']:
+            piece_move_indices = piece_move_indices[piece_move_indices != en_passant]
+    return piece_move_indices
+
+
+def reference_perft(
+    board_state: np.ndarray,
+    board_debuffs: 'BoardDebuffs',
+    side_to_move: int,
+    en_passant: int,
+    castling_privileges: list,
+    depth: int
+) -> int:
+    """
+    counts leaf nodes with the original per offset move generation in `board._Settings`,
+    copying the board for every move. every other engine is checked against this one
+    """
+    if depth == 0:
+        return 1
+
+    can_pickup = board_state * side_to_move > 0
+    can_pickup[board_debuffs.debuff_mask('control')] = True
+    can_pickup[board_debuffs.debuff_mask('stationary')] = False
+
+    nodes = 0
+    for piece_index in np.where(can_pickup)[0]:
+        piece_move_indices = _reference_legal_moves(
+            board_state, board_debuffs, piece_index, side_to_move, en_passant, castling_privileges
+        )
+        if depth == 1:
+            nodes += piece_move_indices.size
+            continue
+        for new_piece_index in piece_move_indices:
+            new_board_state, new_board_debuffs, new_en_passant, new_castling_privileges = _BoardSettings.make_move_on_board(
+                board_state, board_debuffs, piece_index, new_piece_index, side_to_move, en_passant, castling_privileges
+            )
+            nodes += reference_perft(
+                new_board_state, new_board_debuffs, -side_to_move,
+                new_en_passant, new_castling_privileges, depth - 1
+            )
+    return nodes
+
+
+def bitboard_perft(
+    position: BitboardPosition,
+    side_to_move: int,
+    en_passant: int,
+    castling_privileges: list,
+    depth: int
+) -> int:
+    """
+    counts leaf nodes with the bitboard move generator, playing and taking back
+    moves on a single position
+    """
+    if depth == 0:
+        return 1
+
+    attack_map = AttackMap(position)
+    nodes = 0
+    for piece_index in indices_from_mask(calculate_can_pickup(position, side_to_move)):
+        piece_moves = calculate_legal_moves(
+            position, attack_map, piece_index, side_to_move, en_passant, castling_privileges
+        )
+        if depth == 1:
+            nodes += bin(piece_moves).count('1')
+            continue
+        for new_piece_index in indices_from_mask(piece_moves):
+            new_en_passant, new_castling_privileges = calculate_move_rights(
+                position, piece_index, new_piece_index, side_to_move, castling_privileges
+            )
+            undo = position.make_move(piece_index, new_piece_index, side_to_move, en_passant)
+            nodes += bitboard_perft(position, -side_to_move, new_en_passant, new_castling_privileges, depth - 1)
+            position.unmake_move(undo)
+    return nodes
+
+
+def _run_reference(board_manager: BoardManager, depth: int) -> int:
+    return reference_perft(
+        board_manager.board_state,
+        board_manager.board_debuffs,
+        board_manager.side_to_move,
+        board_manager.en_passant,
+        board_manager.castling_privileges,
+        depth
+    )
+
+
+def _run_bitboard(board_manager: BoardManager, depth: int) -> int:
+    return bitboard_perft(
+        BitboardPosition(board_manager.board_state, board_manager.board_debuffs),
+        board_manager.side_to_move,
+        board_manager.en_passant,
+        board_manager.castling_privileges,
+        depth
+    )
+
+
+ENGINES = dict(
+    reference=_run_reference,
+    bitboard=_run_bitboard,
+)
+
+
+def run_perft(name: str, position: str, debuffs: dict, depth: int, engines: list[str]) -> list[dict]:
+    results = []
+    for engine in engines:
+        board_manager = load_position(position, debuffs)
+        start = time.perf_counter()
+        nodes = ENGINES[engine](board_manager, depth)
+        seconds = time.perf_counter() - start
+        results.append(dict(
+            position=name,
+            debuffs=debuffs,
+            engine=engine,
+            depth=depth,
+            nodes=nodes,
+            seconds=seconds,
+            nodes_per_second=nodes / seconds if seconds > 0 else float('inf')
+        ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='count leaf nodes of the move tree to measure and check move generation')
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--engine', action='append', choices=list(ENGINES), help='engines to run, defaults to all of them')
+    parser.add_argument('--suite', action='append', help='names of the built in positions to run, defaults to all of them')
+    parser.add_argument('--position', help='a custom position in `_init_from_string` notation')
+    parser.add_argument('--debuffs', default='', help='debuffs for the custom position, e.g. `destroy:19,20;shrink:52`')
+    parser.add_argument('--compare', action='store_true', help='exit with an error if any engine disagrees with the reference')
+    parser.add_argument('--json', help='write the results to this file, `-` for stdout')
+    args = parser.parse_args()
+
+    engines = args.engine or list(ENGINES)
+    if args.compare and 'reference' not in engines:
+        engines = ['reference'] + engines
+
+    if args.position:
+        positions = [dict(name='custom', position=args.position, debuffs=parse_debuffs(args.debuffs))]
+    else:
+        positions = [
+            position for position in _Settings.POSITIONS
+            if args.suite is None or position['name'] in args.suite
+        ]
+
+    results = []
+    mismatches = []
+    for position in positions:
+        position_results = run_perft(position['name'], position['position'], position['debuffs'], args.depth, engines)
+        results.extend(position_results)
+        expected_nodes = position_results[0]['nodes']
+        for result in position_results:
+            if args.json != '-':
+                print(
+                    f"{result['position']:>12} {result['engine']:>10} depth {result['depth']} "
+                    f"{result['nodes']:>10} nodes {result['seconds']:>9.3f}s {result['nodes_per_second']:>12.0f} nps"
+                )
+            if args.compare and result['nodes'] != expected_nodes:
+                mismatches.append(result)
+
+    if args.json:
+        output = json.dumps(dict(results=results, mismatches=mismatches), indent=2)
+        if args.json == '-':
+            print(output)
+        else:
+            with open(args.json, 'w') as f:
+                f.write(output)
+
+    if mismatches:
+        raise SystemExit(f'{len(mismatches)} results disagree with the reference engine')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from ..game_state.batch import calculate_batch_legal_moves, squares_attacked
+from ..game_state.tablebase import (
+    canonical_pieces, signature_name, parse_signature, table_size,
+    position_indices, index_positions, tablebase_path, write_tablebase, open_tablebase,
+    _Settings as _TablebaseSettings
+)
+
+
+class _Settings:
+    CHUNK_SIZE = 1 << 14
+    KING = 1
+
+    WIN, DRAW, LOSS, INVALID = (
+        _TablebaseSettings.WIN, _TablebaseSettings.DRAW, _TablebaseSettings.LOSS, _TablebaseSettings.INVALID
+    )
+
+
+class _MoveGraph:
+    """
+    every valid position of a tablebase with the positions its moves lead to.
+    moves that stay in the tablebase point at a position index, captures point at
+    another tablebase, whose result is already known
+    """
+    def __init__(self, n_positions: int):
+        self.valid = np.zeros(n_positions, np.bool_)
+        self.in_check = np.zeros(n_positions, np.bool_)
+        self.positions = []
+        self.move_counts = []
+        self.children = []
+        self.known_results = []
+        self.known_plies = []
+
+    def finish(self):
+        self.positions = np.concatenate(self.positions)
+        self.move_counts = np.concatenate(self.move_counts)
+        self.children = np.concatenate(self.children)
+        self.known_results = np.concatenate(self.known_results)
+        self.known_plies = np.concatenate(self.known_plies)
+
+
+def _sub_tablebase(pieces: tuple, captured_slot: int, directory: str, log):
+    sub_pieces = pieces[:captured_slot] + pieces[captured_slot + 1:]
+    path = tablebase_path(sub_pieces, directory)
+    if not os.path.exists(path):
+        generate_tablebase(sub_pieces, directory, log)
+    return open_tablebase(path)
+
+
+def _build_move_graph(pieces: tuple, directory: str, log) -> _MoveGraph:
+    n_pieces = len(pieces)
+    pieces_array = np.array(pieces, np.int8)
+    king_slots = {side: pieces.index(side * _Settings.KING) for side in [1, -1]}
+    sub_tablebases = {
+        slot: _sub_tablebase(pieces, slot, directory, log)
+        for slot in range(n_pieces) if abs(pieces[slot]) != _Settings.KING
+    }
+
+    graph = _MoveGraph(table_size(n_pieces))
+    for start in range(0, table_size(n_pieces), _Settings.CHUNK_SIZE):
+        indices = np.arange(start, min(start + _Settings.CHUNK_SIZE, table_size(n_pieces)))
+        squares, sides = index_positions(indices, n_pieces)
+
+        # no two pieces on one tile
+        sorted_squares = np.sort(squares, axis=1)
+        valid = np.all(np.diff(sorted_squares, axis=1) > 0, axis=1)
+        indices, squares, sides = indices[valid], squares[valid], sides[valid]
+        rows = np.arange(indices.size)
+
+        boards = np.zeros((indices.size, 64), np.int8)
+        boards[rows[:, None], squares] = pieces_array
+        no_debuffs = np.zeros(boards.shape, np.bool_)
+        own_kings = np.where(sides == 1, squares[:, king_slots[1]], squares[:, king_slots[-1]])
+        opponent_kings = np.where(sides == 1, squares[:, king_slots[-1]], squares[:, king_slots[1]])
+
+        # the side that just moved cannot have left its king in check
+        valid = ~squares_attacked(boards, no_debuffs, opponent_kings, sides)
+        indices, squares, sides, boards = indices[valid], squares[valid], sides[valid], boards[valid]
+        own_kings = own_kings[valid]
+        graph.valid[indices] = True
+        graph.in_check[indices] = squares_attacked(boards, no_debuffs[valid], own_kings, -sides)
+
+        move_boards, piece_indices, new_piece_indices, offsets = calculate_batch_legal_moves(
+            boards,
+            np.zeros(boards.shape, np.uint16),
+            np.full(indices.size, -1),
+            np.zeros((indices.size, 4), np.bool_),
+            sides
+        )
+        move_squares = squares[move_boards]
+        child_squares = np.where(move_squares == piece_indices[:, None], new_piece_indices[:, None], move_squares)
+        captured = move_squares == new_piece_indices[:, None]
+        is_capture = np.any(captured, axis=1)
+        child_sides = -sides[move_boards]
+
+        children = np.where(is_capture, -1, position_indices(child_squares, child_sides))
+        known_results = np.full(move_boards.size, _Settings.DRAW, np.int8)
+        known_plies = np.zeros(move_boards.size, np.uint16)
+        for slot, sub_tablebase in sub_tablebases.items():
+            is_slot = captured[:, slot]
+            if np.any(is_slot):
+                sub_squares = np.delete(child_squares[is_slot], slot, axis=1)
+                known_results[is_slot], known_plies[is_slot] = sub_tablebase.probe(sub_squares, child_sides[is_slot])
+
+        graph.positions.append(indices)
+        graph.move_counts.append(np.diff(offsets))
+        graph.children.append(children)
+        graph.known_results.append(known_results)
+        graph.known_plies.append(known_plies)
+    graph.finish()
+    return graph
+
+
+def solve_move_graph(graph: _MoveGraph, n_positions: int):
+    """
+    this function will work out the result of every position backwards from the
+    positions with no moves. a position is won in n plies once one of its moves
+    leads to a position lost in n - 1, and lost in n once every move leads to a
+    won position, the longest of them won in n - 1. positions that are never
+    decided are draws
+    """
+    results = np.full(n_positions, _Settings.INVALID, np.int8)
+    plies = np.zeros(n_positions, np.uint16)
+    results[graph.valid] = _Settings.DRAW
+
+    no_moves = graph.move_counts == 0
+    checkmated = graph.positions[no_moves & graph.in_check[graph.positions]]
+    results[checkmated] = _Settings.LOSS
+    unresolved = ~no_moves
+
+    owners = np.repeat(np.arange(graph.positions.size), graph.move_counts)
+    starts = (np.cumsum(graph.move_counts) - graph.move_counts)[~no_moves]
+    is_internal = graph.children >= 0
+    internal_children = np.where(is_internal, graph.children, 0)
+    last_known_ply = int(graph.known_plies.max(initial=0))
+
+    ply = 1
+    while True:
+        child_results = np.where(is_internal, results[internal_children], graph.known_results)
+        child_plies = np.where(is_internal, plies[internal_children], graph.known_plies)
+
+        wins = np.bincount(owners, (child_results == _Settings.LOSS) & (child_plies == ply - 1), graph.positions.size) > 0
+        won_children = np.bincount(owners, child_results == _Settings.WIN, graph.positions.size)
+        longest = np.zeros(graph.positions.size, np.int64)
+        longest[~no_moves] = np.maximum.reduceat(np.where(child_results == _Settings.WIN, child_plies, 0), starts)
+        losses = (won_children == graph.move_counts) & (longest <= ply - 1)
+
+        new_wins = unresolved & wins
+        new_losses = unresolved & ~wins & losses
+        results[graph.positions[new_wins]] = _Settings.WIN
+        results[graph.positions[new_losses]] = _Settings.LOSS
+        plies[graph.positions[new_wins | new_losses]] = ply
+        unresolved &= ~(new_wins | new_losses)
+
+        if not np.any(new_wins | new_losses) and ply > last_known_ply + 1:
+            break
+        ply += 1
+    return results, plies
+
+
+def generate_tablebase(pieces, directory: str = _TablebaseSettings.DIRECTORY, log=print) -> str:
+    """
+    this function will generate the tablebase for a set of pieces, and first the
+    tablebases for every set of pieces a capture can lead to, and write them to
+    the directory. positions have no debuffs, castling privileges or en passant,
+    and en passant is not played in them
+    """
+    pieces = canonical_pieces(pieces)
+    if [abs(piece) for piece in pieces].count(_Settings.KING) != 2 or pieces.count(_Settings.KING) != 1:
+        raise ValueError('a tablebase needs exactly one king on each side')
+    os.makedirs(directory, exist_ok=True)
+
+    start = time.perf_counter()
+    n_positions = table_size(len(pieces))
+    graph = _build_move_graph(pieces, directory, log)
+    results, plies = solve_move_graph(graph, n_positions)
+    path = tablebase_path(pieces, directory)
+    write_tablebase(path, pieces, results, plies)
+
+    if log is not None:
+        counts = {name: int(np.sum(results == result)) for result, name in _TablebaseSettings.RESULT_NAMES.items()}
+        log(
+            f'{signature_name(pieces)}: {int(graph.valid.sum())} positions, '
+            f'{counts["win"]} won, {counts["draw"]} drawn, {counts["loss"]} lost, '
+            f'longest mate {int(plies.max())} plies, {time.perf_counter() - start:.1f}s'
+        )
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='generate endgame tablebases by retrograde analysis')
+    parser.add_argument('signatures', nargs='+', help='the pieces of each tablebase, e.g. `KQvK`')
+    parser.add_argument('--directory', default=_TablebaseSettings.DIRECTORY)
+    args = parser.parse_args()
+
+    for signature in args.signatures:
+        generate_tablebase(parse_signature(signature), args.directory)
+
+
+if __name__ == '__main__':
+    main()
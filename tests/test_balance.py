@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from src.game_state.hand import _Settings as _HandSettings
+from src.simulation.balance import apply_overrides, run_balance, _without_nan
+
+
+def test_card_data_has_to_keep_the_card_order():
+    with pytest.raises(ValueError):
+        run_balance(10, card_data=_HandSettings.CARD_DATA.iloc[::-1], max_workers=1)
+    with pytest.raises(ValueError):
+        _HandSettings.set_card_data(_HandSettings.CARD_DATA.iloc[::-1])
+
+
+def test_unknown_debuffs_are_rejected():
+    with pytest.raises(ValueError):
+        apply_overrides(_HandSettings.CARD_DATA, {'accio': {'debuffs': 'stunn'}})
+    with pytest.raises(ValueError):
+        apply_overrides(_HandSettings.CARD_DATA, {'accio': {'debuffs': 'displace sideways1'}})
+    card_data = apply_overrides(_HandSettings.CARD_DATA, {'accio': {'debuffs': 'displace random2'}})
+    assert card_data.loc['accio', 'debuffs'] == 'displace random2'
+
+
+def test_report_is_valid_json():
+    results = run_balance(4, max_workers=1, max_turns=4)
+    data = json.loads(json.dumps(_without_nan(results), allow_nan=False))
+    assert data['games'] == 4
@@ -0,0 +1,20 @@
+import numpy as np
+
+from src.ai.evaluation import evaluate_batch, encode_hand
+from src.game_state.hand import _Settings as _HandSettings
+
+
+def test_card_values_follow_the_card_data():
+    boards = np.zeros((1, 64), np.int8)
+    hands = np.array([[encode_hand(['accio']), encode_hand([])]])
+    card_data = _HandSettings.CARD_DATA
+    before = evaluate_batch(boards, hands=hands)[0]
+    rarer = card_data.copy()
+    rarer.loc['accio', 'rarity'] = 1
+    try:
+        _HandSettings.set_card_data(rarer)
+        after = evaluate_batch(boards, hands=hands)[0]
+    finally:
+        _HandSettings.set_card_data(card_data)
+    assert after > before
+    assert evaluate_batch(boards, hands=hands)[0] == before
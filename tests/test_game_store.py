@@ -0,0 +1,74 @@
+import os
+
+from src.game_store import GameStore, _Settings
+from src.game_state.serialize import serialize_game
+from src.server import Server
+
+
+def test_games_in_use_are_not_hibernated(tmp_path):
+    store = GameStore(str(tmp_path), max_games=1)
+    store.create('aaaaaa')
+    with store.using('aaaaaa'):
+        store.create('bbbbbb')
+        assert store.is_resident('aaaaaa')
+        assert not store.hibernate('aaaaaa')
+    store.create('cccccc')
+    assert not store.is_resident('aaaaaa')
+    assert 'aaaaaa' in store
+
+
+def test_hibernated_game_comes_back(tmp_path):
+    store = GameStore(str(tmp_path))
+    game_instance = store.create('aaaaaa')
+    game_instance.board_event(52)
+    game_instance.board_event(36)
+    game_instance.end_turn()
+    data, version = serialize_game(game_instance), game_instance.version
+
+    assert store.hibernate('aaaaaa')
+    assert not store.is_resident('aaaaaa')
+    restored = store['aaaaaa']
+    assert serialize_game(restored) == data
+    assert restored.version > version
+    assert not list(tmp_path.iterdir())
+
+
+def test_join_needs_a_game_unless_hosted_in_the_client(tmp_path):
+    shared = Server(speculate=False, game_store=GameStore(str(tmp_path / 'shared')), create_on_join=False)
+    assert not shared.validate_code('aaaaaa', 'join')
+    assert shared.validate_code('aaaaaa', 'create')
+    assert not shared.validate_code('aaaaaa', 'create')
+    assert shared.validate_code('aaaaaa', 'join')
+
+    in_client = Server(speculate=False, game_store=GameStore(str(tmp_path / 'client')))
+    assert in_client.validate_code('aaaaaa', 'join')
+
+
+def test_game_read_back_by_another_thread_is_found(tmp_path, monkeypatch):
+    store = GameStore(str(tmp_path))
+    store.create('aaaaaa')
+    assert store.hibernate('aaaaaa')
+
+    def racing_open(path, mode):
+        # another thread reads the game back, and removes its file, first
+        monkeypatch.undo()
+        store['aaaaaa']
+        return open(path, mode)
+
+    monkeypatch.setattr('src.game_store.open', racing_open, raising=False)
+    assert store['aaaaaa'] is store.games['aaaaaa']
+
+
+def test_sweep_skips_files_removed_under_it(tmp_path, monkeypatch):
+    store = GameStore(str(tmp_path), hibernated_timeout=-1)
+    store.create('aaaaaa')
+    assert store.hibernate('aaaaaa')
+    remove = os.remove
+
+    def racing_remove(path):
+        remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, 'remove', racing_remove)
+    store.evict_idle(now=store.last_sweep + 2 * _Settings.SWEEP_INTERVAL)
+    assert not list(tmp_path.iterdir())
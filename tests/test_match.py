@@ -0,0 +1,23 @@
+import pytest
+
+from src.simulation.match import run_matches
+
+
+class RaisingPolicy:
+    def __call__(self, game_instance):
+        raise RuntimeError('policy failed')
+
+
+def test_policy_that_raises_fails_the_match():
+    with pytest.raises(RuntimeError, match='policy failed'):
+        run_matches({'a': RaisingPolicy(), 'b': 'random'}, [('a', 'b'), ('b', 'a')], max_workers=1)
+
+
+def test_results_stream_into_the_table():
+    seen = []
+    table = run_matches(
+        {'a': 'random', 'b': 'random'}, [('a', 'b'), ('b', 'a')], max_workers=2, max_turns=10,
+        progress=lambda table, result: seen.append(result['game'])
+    )
+    assert sorted(seen) == [0, 1]
+    assert [standing['games'] for standing in table.standings()] == [2, 2]
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from src.game_store import GameStore
+from src.network.protocol import ProtocolError, validate_request
+from src.network.server import GameServer
+from src.server import Server
+
+
+@pytest.fixture
+def game_server(tmp_path):
+    game_server = GameServer(Server(speculate=False, game_store=GameStore(str(tmp_path))))
+    game_server.server.validate_code('abcdef', 'create')
+    return game_server
+
+
+def request(game_server, message_type, **args):
+    message = dict(id=1, type=message_type, args=dict(code='abcdef', **args))
+    return asyncio.run(game_server.handle_request(message))
+
+
+def in_step(game_instance):
+    return game_instance.hand_manager.side_to_play == game_instance.board_manager.side_to_move
+
+
+@pytest.mark.parametrize('message_type, args', [
+    ('board_event', dict(board_index=64)),
+    ('board_event', dict(board_index=-1)),
+    ('hand_event', dict(event_data={'side': 1, 'board_index': 100})),
+    ('hand_event', dict(event_data={'side': 1, 'card_index': -1})),
+    ('hand_event', dict(event_data={'side': 2, 'card_index': 0})),
+])
+def test_out_of_range_indices_are_rejected(message_type, args):
+    with pytest.raises(ProtocolError):
+        validate_request(dict(id=1, type=message_type, args=dict(code='abcdef', **args)))
+
+
+def test_out_of_range_target_leaves_game_playable(game_server):
+    game_instance = game_server.server.games['abcdef']
+    assert 'result' in request(game_server, 'hand_event', event_data={'side': 1, 'card_index': 0})
+    assert 'error' in request(game_server, 'hand_event', event_data={'side': 1, 'board_index': 100})
+    request(game_server, 'board_event', board_index=52)
+    request(game_server, 'board_event', board_index=36)
+    assert 'result' in request(game_server, 'end_turn')
+    assert in_step(game_instance)
+
+
+def test_card_index_is_checked_against_hand(game_server):
+    n_cards = len(game_server.server.games['abcdef'].hand_manager.hands[1].cards)
+    response = request(game_server, 'hand_event', event_data={'side': 1, 'card_index': n_cards})
+    assert 'error' in response
+
+
+def test_failed_end_turn_changes_nothing(game_server):
+    server = game_server.server
+    game_instance = server.games['abcdef']
+    # straight to the server, past the request checks
+    server.hand_event('abcdef', {'side': 1, 'card_index': 0})
+    server.hand_event('abcdef', {'side': 1, 'board_index': 100})
+    cards = game_instance.hand_manager.hands[1].cards.copy()
+    version = game_instance.version
+
+    with pytest.raises(IndexError):
+        server.end_turn('abcdef')
+    assert in_step(game_instance)
+    assert list(game_instance.hand_manager.hands[1].cards) == list(cards)
+    assert game_instance.version == version
+
+
+def test_unexpected_errors_are_answered(game_server, monkeypatch):
+    def fail(code):
+        raise RuntimeError('broken')
+    monkeypatch.setattr(game_server.server, 'get_render_snapshot', fail)
+    assert request(game_server, 'get_render_data')['error'] == 'internal error: RuntimeError'